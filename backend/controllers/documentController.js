@@ -1522,6 +1522,19 @@ function isStudyDesignTitle(normalizedTitle) {
   return false;
 }
 
+/**
+ * 客户端在响应发出前断开时触发的 AbortSignal（用于取消排队中/运行中的PDF worker任务）
+ * @param {Object} res - Express响应对象
+ * @returns {AbortSignal} - 断开连接时abort的信号
+ */
+function clientDisconnectSignal(res) {
+  const controller = new AbortController();
+  res.on('close', () => {
+    if (!res.writableFinished) controller.abort();
+  });
+  return controller.signal;
+}
+
 
 // 上传文档处理函数（Study-level with file slots）
 async function uploadDocument(req, res) {
@@ -1563,7 +1576,7 @@ async function uploadDocument(req, res) {
       
                 if (req.file.mimetype === 'application/pdf') {
         console.log('📄 Starting PDF processing...');
-            const pypdfResult = await processPdfWithPypdf(req.file.buffer);
+            const pypdfResult = await processPdfWithPypdf(req.file.buffer, { signal: clientDisconnectSignal(res) });
         
         if (isProtocol) {
           // Protocol使用完整解析（包含AI）
@@ -3125,13 +3138,20 @@ async function uploadCrfFile(req, res) {
     try {
       if (req.file.mimetype === 'application/pdf') {
         // console.log('📄 开始解析CRF PDF文件...');
-        const pypdfResult = await processPdfWithPypdf(req.file.buffer);
+        // 🔥 文本、表格与词位置在同一次pdfplumber解析中提取
+        // 行分组在Python端随词位置一起完成（3.5pt的Y坐标容差）
+        const CRF_ROW_Y_TOLERANCE = 3.5;
+        const uploadSignal = clientDisconnectSignal(res);
+        const pypdfResult = await processPdfWithPypdf(req.file.buffer, { includeWords: true, rowTolerance: CRF_ROW_Y_TOLERANCE, signal: uploadSignal });
         crfParseResult = await formatResultForCrfSap(pypdfResult); // 🔥 使用CRF专用解析
         
         // 🔥 新增：提取CRF PDF的词位置信息（简化版）
         try {
           // console.log('🔍 开始提取CRF词位置信息...');
-          const wordsResult = await extractCrfWordsOnly(req.file.buffer, id);
+          // 合并解析没有成功的词位置结果（缺失或 success=false）时回退到单独的词位置提取
+          const wordsResult = pypdfResult.words?.success
+            ? pypdfResult.words
+            : await extractCrfWordsOnly(req.file.buffer, id, { rowTolerance: CRF_ROW_Y_TOLERANCE, signal: uploadSignal });
           // console.log(`✅ CRF词位置提取完成`);
           // console.log(`📊 CRF统计: ${wordsResult.metadata?.total_words || 0} 词, ${wordsResult.metadata?.total_pages || 0} 页`);
           
@@ -3142,7 +3162,7 @@ async function uploadCrfFile(req, res) {
             // 🔥 新增：将词位置转换为行位置
             try {
               // console.log('🔄 开始将词位置转换为行位置...');
-              const rowsResult = processWordsToRows(wordsResult, 3.5); // 使用3.5pt的Y坐标容差
+              const rowsResult = processWordsToRows(wordsResult, CRF_ROW_Y_TOLERANCE); // 复用Python端已分好的行
               // console.log(`✅ 行位置转换完成: ${rowsResult.metadata?.total_rows || 0} 行, ${rowsResult.metadata?.total_words || 0} 词`);
               
               if (rowsResult.success) {
@@ -3327,7 +3347,7 @@ async function uploadSapFile(req, res) {
     try {
       if (req.file.mimetype === 'application/pdf') {
         console.log('📄 开始解析SAP PDF文件...');
-        const pypdfResult = await processPdfWithPypdf(req.file.buffer);
+        const pypdfResult = await processPdfWithPypdf(req.file.buffer, { signal: clientDisconnectSignal(res) });
         sapParseResult = await formatResultForCrfSap(pypdfResult); // 🔥 使用SAP专用解析
       } else if (req.file.mimetype === 'application/vnd.openxmlformats-officedocument.wordprocessingml.document') {
         console.log('📝 开始解析SAP Word文档...');
@@ -4170,215 +4190,85 @@ function generateAnnotatedPdfPath(sourcePath) {
 
 // 🎨 **辅助函数**: 调用Python脚本（可配置超时）
 async function callPdfAnnotationScriptWithTimeout(sourcePath, rectsByPage, outputPath, timeoutMs) {
-  const { spawn } = require('child_process');
-  const path = require('path');
+  const { pdfWorkerPool } = require('../services/pdfWorkerPool');
+  const { writeRectsFile, removeRectsFile } = require('../services/crf_analysis/annotationRectsFile');
 
-  const scriptPath = path.join(__dirname, '../services/pdf_annotate.py');
+  // console.log('🐍 [Batch] 提交注解任务到Python worker...');
+  // console.log('📄 源PDF:', sourcePath);
+  // console.log('📊 本批矩形页数:', Object.keys(rectsByPage || {}).length);
 
-  return new Promise((resolve, reject) => {
-    // console.log('🐍 [Batch] 启动Python进程...');
-    // console.log('📝 脚本路径:', scriptPath);
-    // console.log('📄 源PDF:', sourcePath);
-    // console.log('📊 本批矩形页数:', Object.keys(rectsByPage || {}).length);
-
-    const rectsJson = JSON.stringify(rectsByPage || {});
-
-    const pythonProcess = spawn('python3', [
-      scriptPath,
-      sourcePath,
-      rectsJson,
-      outputPath
-    ], {
-      stdio: ['pipe', 'pipe', 'pipe']
-    });
-
-    let stdout = '';
-    let stderr = '';
-
-    pythonProcess.stdout.on('data', (data) => {
-      const output = data.toString();
-      stdout += output;
-      console.log(output.trim()); // 直接输出Python的打印内容
-    });
-
-    pythonProcess.stderr.on('data', (data) => {
-      const error = data.toString();
-      stderr += error;
-      console.warn('🐍 [Batch] Python错误:', error.trim());
-    });
-
-    const killTimer = setTimeout(() => {
-      console.warn(`⏰ [Batch] Python进程超时(${Math.round(timeoutMs/1000)}s)，强制终止`);
-      try { pythonProcess.kill('SIGTERM'); } catch (_) {}
-      reject(new Error('Python脚本执行超时'));
-    }, timeoutMs);
-
-    pythonProcess.on('close', (code) => {
-      clearTimeout(killTimer);
-      // console.log('🐍 [Batch] Python进程结束，退出代码:', code);
-      if (code === 0) {
-        resolve({ success: true, stdout: stdout.trim(), outputPath });
-      } else {
-        reject(new Error(`Python脚本失败，退出代码: ${code}\n标准错误: ${stderr}\n标准输出: ${stdout}`));
-      }
-    });
-
-    pythonProcess.on('error', (err) => {
-      clearTimeout(killTimer);
-      console.error('❌ [Batch] 启动Python进程失败:', err);
-      reject(new Error(`启动Python进程失败: ${err.message}`));
-    });
-  });
+  // 矩形数据写入二进制临时文件（Python端mmap读取），避免超大JSON请求
+  const rectsPath = writeRectsFile([rectsByPage || {}]);
+  try {
+    const result = await pdfWorkerPool.call('annotate_pdf', {
+      source_path: sourcePath,
+      rects_path: rectsPath,
+      output_path: outputPath
+    }, { timeoutMs });
+    return { success: true, result, outputPath };
+  } catch (err) {
+    console.warn('🐍 [Batch] Python错误:', err.message);
+    throw new Error(`Python脚本失败: ${err.message}`);
+  } finally {
+    removeRectsFile(rectsPath);
+  }
 }
 
 // 🎨 **辅助函数**: 调用Python脚本生成注解PDF
 async function callPdfAnnotationScript(sourcePath, rectsByPage, outputPath) {
-  const { spawn } = require('child_process');
-  const path = require('path');
-  
-  // Python脚本路径
-  const scriptPath = path.join(__dirname, '../services/pdf_annotate.py');
-  
-  return new Promise((resolve, reject) => {
-    console.log('🐍 启动Python进程...');
-    console.log('📝 脚本路径:', scriptPath);
-    console.log('📄 源PDF:', sourcePath);
-    console.log('📊 矩形数据页数:', Object.keys(rectsByPage).length);
-    
-    // 将矩形数据转换为JSON字符串
-    const rectsJson = JSON.stringify(rectsByPage);
-    
-    // 启动Python进程
-    const pythonProcess = spawn('python3', [
-      scriptPath,
-      sourcePath,
-      rectsJson,  // 直接传递JSON字符串
-      outputPath
-    ], {
-      stdio: ['pipe', 'pipe', 'pipe']
-    });
-    
-    let stdout = '';
-    let stderr = '';
-    
-    // 收集标准输出
-    pythonProcess.stdout.on('data', (data) => {
-      const output = data.toString();
-      stdout += output;
-      console.log(output.trim()); // 直接输出Python的打印内容
-    });
-    
-    // 收集标准错误
-    pythonProcess.stderr.on('data', (data) => {
-      const error = data.toString();
-      stderr += error;
-      console.warn('🐍 Python错误:', error.trim());
-    });
-    
-    // 进程结束处理
-    pythonProcess.on('close', (code) => {
-      // console.log('🐍 Python进程结束，退出代码:', code);
-      
-      if (code === 0) {
-        console.log('✅ Python脚本执行成功');
-        resolve({
-          success: true,
-          stdout: stdout.trim(),
-          outputPath: outputPath
-        });
-      } else {
-        console.error('❌ Python脚本执行失败');
-        reject(new Error(`Python脚本失败，退出代码: ${code}\n标准错误: ${stderr}\n标准输出: ${stdout}`));
-      }
-    });
-    
-    // 进程错误处理
-    pythonProcess.on('error', (err) => {
-      console.error('❌ 启动Python进程失败:', err);
-      reject(new Error(`启动Python进程失败: ${err.message}`));
-    });
-    
-    // 设置超时 (20分钟) - 增加时间以支持大型CRF文件处理
-    const timeout = setTimeout(() => {
-      console.warn('⏰ Python进程超时，强制终止');
-      pythonProcess.kill('SIGTERM');
-      reject(new Error('Python脚本执行超时'));
-    }, 20 * 60 * 1000);
-    
-    pythonProcess.on('close', () => {
-      clearTimeout(timeout);
-    });
-  });
+  console.log('🐍 提交注解任务到Python worker...');
+  console.log('📄 源PDF:', sourcePath);
+  console.log('📊 矩形数据页数:', Object.keys(rectsByPage).length);
+
+  // 超时 (20分钟) - 支持大型CRF文件处理
+  const annotation = await callPdfAnnotationScriptWithTimeout(sourcePath, rectsByPage, outputPath, 20 * 60 * 1000);
+  console.log('✅ Python脚本执行成功');
+  return annotation;
 }
 
-// 🎨 **新增**: 分批注解PDF（每批5个表格，单批5分钟超时）
-async function annotatePdfInBatches(studyData, studyId, options = {}) {
+// 🎨 **辅助函数**: 逐批调用Python（单次多批调用整体失败时的回退路径，每批独立读写PDF）
+// options.startIndex / options.inputPath / options.processedForms：从指定批次、以已有的注解PDF为输入续做
+// options.deadline：续做的截止时间（毫秒时间戳），超过后剩余批次记为失败
+async function annotateBatchesOneByOne(sourcePath, finalOutputPath, batches, studyId, batchTimeoutMs, options = {}) {
   const fs = require('fs');
-  const path = require('path');
-  const { generateAnnotationRectsForForms } = require('../services/crf_analysis/annotationRectService');
-
-  const batchSize = options.batchSize || 5;
-  const batchTimeoutMs = options.batchTimeoutMs || (5 * 60 * 1000);
-
-  const sourcePath = studyData?.files?.crf?.sourcePath;
-  if (!sourcePath) throw new Error('源PDF路径不存在');
 
-  const crfFormList = studyData?.files?.crf?.crfUploadResult?.crfFormList || {};
-  const formKeys = Object.keys(crfFormList);
-  const totalForms = formKeys.length;
-  if (totalForms === 0) {
-    console.log('⏸️ 无Form可注解');
-    return { totalForms: 0, totalBatches: 0, processedForms: 0 };
-  }
-
-  console.log(`🎯 分批注解启动：共 ${totalForms} 个表格，批大小=${batchSize}，单批超时=${Math.round(batchTimeoutMs/1000)}秒`);
-
-  // 计算输出路径与工作路径
-  const finalOutputPath = generateAnnotatedPdfPath(sourcePath);
+  const totalBatches = batches.length;
   const workPathA = finalOutputPath;
   const workPathB = finalOutputPath.replace(/\.pdf$/i, '_work.pdf');
+  const startIndex = options.startIndex || 0;
 
-  let currentInput = sourcePath;
-  let lastOutput = null;
-
-  let colorState = { map: new Map(), index: 0 };
-
-  const totalBatches = Math.ceil(totalForms / batchSize);
-  let processedForms = 0;
+  let currentInput = options.inputPath || sourcePath;
+  let lastOutput = options.inputPath || null;
   let succeededBatches = 0;
   let failedBatches = 0;
+  let processedForms = options.processedForms || 0;
 
-  for (let batchIndex = 0; batchIndex < totalBatches; batchIndex++) {
-    const start = batchIndex * batchSize;
-    const end = Math.min(start + batchSize, totalForms);
-    const batchFormKeys = formKeys.slice(start, end);
-
-    // console.log(`\n🔄 开始处理第 ${batchIndex + 1}/${totalBatches} 批：表格索引范围 [${start + 1} - ${end}]，Keys: [${batchFormKeys.join(', ')}]`);
-
-    // 生成本批矩形
-    const { rectsByPage, colorState: updatedColorState } = generateAnnotationRectsForForms(studyData, batchFormKeys, colorState);
-    colorState = updatedColorState;
-
-    const batchRectsCount = Object.values(rectsByPage).reduce((s, arr) => s + (arr?.length || 0), 0);
-    // console.log(`📦 本批矩形总数: ${batchRectsCount}`);
+  for (let batchIndex = startIndex; batchIndex < totalBatches; batchIndex++) {
+    const { rectsByPage, rectsCount, endForm } = batches[batchIndex];
 
-    if (batchRectsCount === 0) {
+    if (rectsCount === 0) {
       console.log('⏭️ 本批无矩形，跳过Python调用');
-      processedForms = end;
-      console.log(`✅ 已分批注解至第 ${processedForms} 个表格 / 共 ${totalForms}`);
+      processedForms = endForm;
+      continue;
+    }
+
+    const timeoutMs = options.deadline ? Math.min(batchTimeoutMs, options.deadline - Date.now()) : batchTimeoutMs;
+    if (timeoutMs <= 0) {
+      console.warn('❌ 时间预算已用完，本批未执行。');
+      failedBatches++;
       continue;
     }
 
     // 切换输出文件以避免读写同一路径冲突
-    const outputPath = (batchIndex % 2 === 0) ? workPathA : workPathB;
+    const outputPath = currentInput === workPathA ? workPathB : workPathA;
 
     try {
-      await callPdfAnnotationScriptWithTimeout(currentInput, rectsByPage, outputPath, batchTimeoutMs);
+      await callPdfAnnotationScriptWithTimeout(currentInput, rectsByPage, outputPath, timeoutMs);
       lastOutput = outputPath;
       currentInput = outputPath; // 下一批以上一批的输出作为输入
       succeededBatches++;
-      processedForms = end;
-      console.log(`✅ 本批完成。已分批注解至第 ${processedForms} 个表格 / 共 ${totalForms}`);
+      processedForms = endForm;
+      console.log(`✅ 本批完成。已分批注解至第 ${processedForms} 个表格`);
 
       // 更新PDF进度（每批完成一次）
       updateAnnotationProgress(studyId, {
@@ -4406,19 +4296,172 @@ async function annotatePdfInBatches(studyData, studyId, options = {}) {
     console.warn('⚠️ 拷贝最终输出失败:', copyErr.message);
   }
 
+  return { succeededBatches, failedBatches, processedForms };
+}
+
+// 🎨 **辅助函数**: 单次多批调用整体失败后续做（不重跑已确认的批次，进度不回退）
+// 先用一次调用重放已确认成功的批次（输出文件在整次调用失败时未被写入），
+// 再从第一个未确认的批次起逐批调用；超时时正在执行的批次不再重试
+async function resumeAnnotationBatches(sourcePath, finalOutputPath, batches, studyId, batchTimeoutMs, acknowledged, err) {
+  const { pdfWorkerPool } = require('../services/pdfWorkerPool');
+  const { writeRectsFile, removeRectsFile } = require('../services/crf_analysis/annotationRectsFile');
+
+  let resumeIndex = 0;
+  while (resumeIndex < batches.length && acknowledged.has(resumeIndex)) resumeIndex++;
+  const completed = [...acknowledged.entries()].filter(([, status]) => status === 'completed').map(([index]) => index);
+  let failedBatches = [...acknowledged.values()].filter(status => status === 'failed').length;
+  const processedForms = Math.max(0, ...[...acknowledged.entries()]
+    .filter(([, status]) => status !== 'failed')
+    .map(([index]) => batches[index].endForm));
+  let inputPath = null;
+
+  if (completed.length > 0) {
+    const rectsPath = writeRectsFile(batches.map((b, index) => (acknowledged.get(index) === 'completed' ? b.rectsByPage : {})));
+    try {
+      const replay = await pdfWorkerPool.call('annotate_pdf_batches', {
+        source_path: sourcePath,
+        rects_path: rectsPath,
+        output_path: finalOutputPath
+      }, { timeoutMs: batchTimeoutMs * completed.length });
+      if (replay.written) inputPath = finalOutputPath;
+    } catch (replayErr) {
+      console.warn(`⚠️ 重放已完成批次失败：${replayErr.message}。从第一批起逐批注解。`);
+    } finally {
+      removeRectsFile(rectsPath);
+    }
+    if (!inputPath) {
+      return annotateBatchesOneByOne(sourcePath, finalOutputPath, batches, studyId, batchTimeoutMs);
+    }
+  }
+
+  // 超时说明正在执行的批次已用完时间预算，重试只会再次超时
+  if (err.code === 'PDF_JOB_TIMEOUT') {
+    while (resumeIndex < batches.length && batches[resumeIndex].rectsCount === 0) resumeIndex++;
+    if (resumeIndex < batches.length) {
+      console.warn(`❌ 第 ${resumeIndex + 1} 批执行超时，不再重试。`);
+      failedBatches++;
+      resumeIndex++;
+    }
+  }
+
+  // 剩余批次保持与逐批调用相同的时间预算
+  const remaining = batches.slice(resumeIndex).filter(b => b.rectsCount > 0).length;
+  console.log(`🔁 从第 ${resumeIndex + 1} 批续做（已确认 ${acknowledged.size} 批，剩余 ${remaining} 批有矩形）`);
+  const rest = await annotateBatchesOneByOne(sourcePath, finalOutputPath, batches, studyId, batchTimeoutMs, {
+    startIndex: resumeIndex,
+    inputPath,
+    processedForms,
+    deadline: Date.now() + batchTimeoutMs * remaining
+  });
+  return {
+    succeededBatches: completed.length + rest.succeededBatches,
+    failedBatches: failedBatches + rest.failedBatches,
+    processedForms: rest.processedForms
+  };
+}
+
+// 🎨 **新增**: 分批注解PDF（每批5个表格，单批5分钟超时）
+// 所有批次在一次Python调用中完成：只读取/写出PDF一次，每批完成后回报进度，单批失败会被回滚并跳过
+async function annotatePdfInBatches(studyData, studyId, options = {}) {
+  const { pdfWorkerPool } = require('../services/pdfWorkerPool');
+  const { generateAnnotationRectsForForms } = require('../services/crf_analysis/annotationRectService');
+  const { writeRectsFile, removeRectsFile } = require('../services/crf_analysis/annotationRectsFile');
+
+  const batchSize = options.batchSize || 5;
+  const batchTimeoutMs = options.batchTimeoutMs || (5 * 60 * 1000);
+
+  const sourcePath = studyData?.files?.crf?.sourcePath;
+  if (!sourcePath) throw new Error('源PDF路径不存在');
+
+  const crfFormList = studyData?.files?.crf?.crfUploadResult?.crfFormList || {};
+  const formKeys = Object.keys(crfFormList);
+  const totalForms = formKeys.length;
+  if (totalForms === 0) {
+    console.log('⏸️ 无Form可注解');
+    return { totalForms: 0, totalBatches: 0, processedForms: 0 };
+  }
+
+  console.log(`🎯 分批注解启动：共 ${totalForms} 个表格，批大小=${batchSize}，单批超时=${Math.round(batchTimeoutMs/1000)}秒`);
+
+  const finalOutputPath = generateAnnotatedPdfPath(sourcePath);
+
+  // 预先生成所有批次的矩形（颜色状态按批次顺序传递，与逐批生成结果一致）
+  let colorState = { map: new Map(), index: 0 };
+  const totalBatches = Math.ceil(totalForms / batchSize);
+  const batches = [];
+  for (let batchIndex = 0; batchIndex < totalBatches; batchIndex++) {
+    const start = batchIndex * batchSize;
+    const end = Math.min(start + batchSize, totalForms);
+    const { rectsByPage, colorState: updatedColorState } = generateAnnotationRectsForForms(studyData, formKeys.slice(start, end), colorState);
+    colorState = updatedColorState;
+    const rectsCount = Object.values(rectsByPage).reduce((s, arr) => s + (arr?.length || 0), 0);
+    batches.push({ rectsByPage, rectsCount, endForm: end });
+  }
+
+  const nonEmptyBatches = batches.filter(b => b.rectsCount > 0).length;
+  let processedForms = 0;
+  let succeededBatches = 0;
+  let failedBatches = 0;
+  const acknowledged = new Map(); // batch_index → 'completed' | 'failed' | 'skipped'
+
+  const rectsPath = writeRectsFile(batches.map(b => b.rectsByPage));
+  try {
+    await pdfWorkerPool.call('annotate_pdf_batches', {
+      source_path: sourcePath,
+      rects_path: rectsPath,
+      output_path: finalOutputPath,
+      stream: true
+    }, {
+      // 保持与逐批调用相同的总时间预算
+      timeoutMs: batchTimeoutMs * Math.max(1, nonEmptyBatches),
+      onRecord: (record) => {
+        const batchIndex = record.batch_index;
+        acknowledged.set(batchIndex, record.status);
+        if (record.status === 'failed') {
+          console.warn(`❌ 本批失败：${record.error}。已回滚并继续下一批。`);
+          failedBatches++;
+          return;
+        }
+        processedForms = batches[batchIndex].endForm;
+        if (record.status === 'skipped') {
+          console.log('⏭️ 本批无矩形，跳过');
+          return;
+        }
+        succeededBatches++;
+        console.log(`✅ 本批完成。已分批注解至第 ${processedForms} 个表格 / 共 ${totalForms}`);
+
+        // 更新PDF进度（每批完成一次）
+        updateAnnotationProgress(studyId, {
+          pdfDrawing: {
+            totalBatches,
+            processedBatches: batchIndex + 1,
+            percentage: ((batchIndex + 1) / totalBatches) * 100,
+            status: batchIndex + 1 === totalBatches ? 'completed' : 'running'
+          }
+        });
+      }
+    });
+  } catch (err) {
+    // 整次调用失败（超时/进程崩溃）时输出文件未被写入：保留已确认的批次，只逐批执行剩余批次
+    console.warn(`⚠️ 单次多批注解失败：${err.message}。从最后确认的批次之后续做。`);
+    ({ succeededBatches, failedBatches, processedForms } = await resumeAnnotationBatches(sourcePath, finalOutputPath, batches, studyId, batchTimeoutMs, acknowledged, err));
+  } finally {
+    removeRectsFile(rectsPath);
+  }
+
   // 更新数据库：标记完成 & 下载链接
   const downloadUrl = `/api/studies/${studyId}/crf-annotated.pdf`;
-  await Study.findByIdAndUpdate(
-    studyId,
-    {
-      $set: {
-        'files.crf.annotatedPath': finalOutputPath,
-        'files.crf.annotationReady': true,
-        'files.crf.annotatedAt': new Date(),
-        'files.crf.downloadUrl': downloadUrl
-      }
-    }
-  );
+  const annotationUpdate = {
+    'files.crf.annotatedPath': finalOutputPath,
+    'files.crf.annotationReady': true,
+    'files.crf.annotatedAt': new Date(),
+    'files.crf.downloadUrl': downloadUrl
+  };
+  if (succeededBatches > 0) {
+    // 本次完整重写的PDF中注解均带Form标记，之后可按Form增量重绘
+    annotationUpdate['files.crf.annotationTagged'] = true;
+  }
+  await Study.findByIdAndUpdate(studyId, { $set: annotationUpdate });
 
   console.log(`🎉 分批注解完成：成功批次 ${succeededBatches}，失败批次 ${failedBatches}，最终下载链接: ${downloadUrl}`);
 
@@ -4441,6 +4484,51 @@ async function annotatePdfInBatches(studyData, studyId, options = {}) {
   };
 }
 
+// 🎨 **新增**: 按Form增量重绘注解PDF（只追加这些Form的新注解与xref，不重写整个文件）
+async function redrawFormAnnotationsIncremental(studyData, studyId, targetFormKeys, options = {}) {
+  const { pdfWorkerPool } = require('../services/pdfWorkerPool');
+  const { generateAnnotationRectsForForms, getFormAnnotationPages } = require('../services/crf_analysis/annotationRectService');
+
+  const annotatedPath = studyData?.files?.crf?.annotatedPath;
+  const crfFormList = studyData?.files?.crf?.crfUploadResult?.crfFormList || {};
+  const formKeys = Object.keys(crfFormList);
+  const targetSet = new Set(targetFormKeys.filter(key => crfFormList[key]));
+  if (targetSet.size === 0) throw new Error('没有可重绘的Form');
+
+  // 按全部Form顺序生成矩形以保持全局颜色分配一致，再只保留目标Form的矩形
+  const { rectsByPage: allRectsByPage } = generateAnnotationRectsForForms(studyData, formKeys, null);
+  const rectsByPage = {};
+  Object.entries(allRectsByPage).forEach(([pageKey, rects]) => {
+    const formRects = (rects || []).filter(rect => targetSet.has(rect.form_name));
+    if (formRects.length > 0) rectsByPage[pageKey] = formRects;
+  });
+
+  const pageNumbers = new Set();
+  targetSet.forEach(formKey => getFormAnnotationPages(crfFormList[formKey]).forEach(p => pageNumbers.add(p)));
+
+  const result = await pdfWorkerPool.call('update_form_annotations', {
+    pdf_path: annotatedPath,
+    rects_by_page: rectsByPage,
+    form_keys: [...targetSet],
+    page_numbers: [...pageNumbers]
+  }, { timeoutMs: options.timeoutMs || 5 * 60 * 1000 });
+
+  console.log(`✅ 增量重绘完成：${targetSet.size} 个表格，删除 ${result.removed_annotations} 个旧注解，新增 ${result.added_annotations} 个，追加 ${result.appended_bytes} 字节`);
+
+  await Study.findByIdAndUpdate(studyId, { $set: { 'files.crf.annotatedAt': new Date() } });
+
+  return {
+    studyId,
+    incremental: true,
+    totalForms: formKeys.length,
+    redrawnForms: [...targetSet],
+    removedAnnotations: result.removed_annotations,
+    addedAnnotations: result.added_annotations,
+    appendedBytes: result.appended_bytes,
+    downloadUrl: studyData.files.crf.downloadUrl || `/api/studies/${studyId}/crf-annotated.pdf`
+  };
+}
+
 // 🎨 **新增**: 上传完成后自动生成注解PDF
 async function generateAnnotatedPdfAfterUpload(studyData, studyId) {
   console.log('🎨 generateAnnotatedPdfAfterUpload 开始...');
@@ -4675,11 +4763,26 @@ async function redrawCrfAnnotationPdf(req, res) {
     console.log('✅ 找到现成的SDTM数据，开始Re-draw PDF...');
     console.log('🚀 跳过GPT分析步骤，直接进行PDF绘制');
     
+    // 指定了formKeys且现有注解PDF带Form标记时，仅增量重绘这些Form
+    const fs = require('fs');
+    const requestedFormKeys = Array.isArray(req.body?.formKeys) ? req.body.formKeys : [];
+    const annotatedPath = study.files.crf.annotatedPath;
+    let batchResult = null;
+    if (requestedFormKeys.length > 0 && study.files.crf.annotationTagged && annotatedPath && fs.existsSync(annotatedPath)) {
+      try {
+        batchResult = await redrawFormAnnotationsIncremental(study, studyId, requestedFormKeys);
+      } catch (incrementalError) {
+        console.warn(`⚠️ 增量重绘失败：${incrementalError.message}，改为完整重绘`);
+      }
+    }
+
     // 直接调用分批PDF绘制（跳过GPT步骤）
-    const batchResult = await annotatePdfInBatches(study, studyId, { 
-      batchSize: 5, 
-      batchTimeoutMs: 5 * 60 * 1000 
-    });
+    if (!batchResult) {
+      batchResult = await annotatePdfInBatches(study, studyId, { 
+        batchSize: 5, 
+        batchTimeoutMs: 5 * 60 * 1000 
+      });
+    }
     
     console.log('🎉 Re-draw PDF完成!');
     // console.log('📊 绘制结果:', {
@@ -111,6 +111,8 @@ const CrfFileSlotSchema = new mongoose.Schema({
   annotationReady: { type: Boolean, default: false },
   annotatedAt: { type: Date },
   downloadUrl: { type: String },  // 🔥 新增：注解PDF下载链接
+  // 注解PDF中的注解带有Form标记（/NM），可按Form增量重绘
+  annotationTagged: { type: Boolean, default: false },
   // 🔥 新增：SDTM分析完成状态（GPT分析完成后设置为true）
   crf_sdtm_ready_for_annotation: { type: Boolean, default: false },
   crfUploadResult: {
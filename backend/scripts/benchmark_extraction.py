@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Extraction Benchmark - Time the PDF/Excel entry points over the bundled Resource corpus
+Purpose: Record wall time, peak RSS and pages/words/rows per second for
+         process_pdf_simple, extract_words_only, extract_pages, annotate_pdf and the
+         Excel importers, keep a JSON history and flag regressions against a baseline
+Author: LLX Solutions
+
+Every measurement runs in a fresh Python process (this script with --run-case),
+so peak RSS is per case and nothing is shared through module state. Wall time
+covers the entry point call only; interpreter start-up and imports are excluded.
+
+Usage:
+    python benchmark_extraction.py                          # full corpus, append to history
+    python benchmark_extraction.py --cases extract_words_only --files 'crf-1-28*'
+    python benchmark_extraction.py --save-baseline          # store this run as the baseline
+    python benchmark_extraction.py --threshold 0.15         # exit 1 if >15% slower/larger than baseline
+    python benchmark_extraction.py --terminology 'Resource/CDISC SDTM Terminology_20250328.xls'
+"""
+
+import os
+import sys
+import json
+import glob
+import time
+import fnmatch
+import argparse
+import platform
+import resource
+import statistics
+import subprocess
+import tempfile
+import datetime
+from typing import Dict, Any, List, Optional
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(SCRIPTS_DIR)
+SERVICES_DIR = os.path.join(BACKEND_DIR, 'services')
+RESOURCE_DIR = os.path.join(BACKEND_DIR, 'Resource')
+DEFAULT_RESULTS_DIR = os.path.join(BACKEND_DIR, 'benchmarks')
+
+# Case name -> corpora it runs over
+PDF_CASES = {
+    'process_pdf_simple': ('crf', 'protocol'),
+    'extract_words_only': ('crf', 'protocol'),
+    'extract_pages': ('crf', 'protocol'),
+    'annotate_pdf': ('crf',),
+}
+EXCEL_CASES = ('ts_import', 'sdtmig_extraction', 'terminology_import')
+ALL_CASES = tuple(PDF_CASES) + EXCEL_CASES
+
+# Synthetic annotation load for annotate_pdf (rects per page)
+ANNOTATION_RECTS_PER_PAGE = 12
+# Metrics compared against the baseline (lower is better)
+COMPARED_METRICS = ('wall_s', 'peak_rss_mb')
+
+
+def _peak_rss_mb(who: int) -> float:
+    """ru_maxrss in MB (kilobytes on Linux, bytes on macOS)"""
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+# ===================== Cases (run inside the child process) =====================
+
+def _case_process_pdf_simple(path: str) -> Dict[str, Any]:
+    from pdf_processor import process_pdf_simple
+    result = process_pdf_simple(path)
+    return {
+        'success': result['success'],
+        'error': result.get('error'),
+        'pages': result['total_pages'],
+        'words': len(result['text'].split()),
+        'tables': len(result['tables'])
+    }
+
+
+def _case_extract_words_only(path: str) -> Dict[str, Any]:
+    from crf_words_extractor import extract_words_only
+    result = extract_words_only(path)
+    return {
+        'success': result['success'],
+        'pages': result['metadata']['total_pages'],
+        'words': result['metadata']['total_words']
+    }
+
+
+def _case_extract_pages(path: str) -> Dict[str, Any]:
+    from pdf_page_extractor import extract_pages
+    with tempfile.TemporaryDirectory() as tmp:
+        result = extract_pages(path, os.path.join(tmp, 'extract.pdf'), 1, 5)
+    return {
+        'success': result['success'],
+        'error': result.get('error'),
+        'pages': result['pages_extracted']
+    }
+
+
+def _synthetic_rects(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Deterministic SDTM-style label grid on every page (stands in for generated rects)"""
+    from pypdf import PdfReader
+    rects_by_page = {}
+    for page_number, page in enumerate(PdfReader(path).pages, 1):
+        width = float(page.mediabox.width)
+        height = float(page.mediabox.height)
+        rects = []
+        for i in range(ANNOTATION_RECTS_PER_PAGE):
+            x0 = width * 0.55 + (i % 2) * 110
+            y1 = height - 60 - (i // 2) * 40
+            rects.append({
+                'page_number': page_number,
+                'rect': [x0, y1 - 18, x0 + 100, y1],
+                'text': f"AE.AETERM{i}" if i % 3 else 'DM (Demographics)',
+                'background_color': [0.75, 0.9, 1.0] if i % 2 else [1.0, 1.0, 0.6],
+                'form_name': f"FORM{page_number}"
+            })
+        rects_by_page[str(page_number)] = rects
+    return rects_by_page
+
+
+def _case_annotate_pdf(path: str) -> Dict[str, Any]:
+    from pdf_annotate import annotate_pdf
+    rects_by_page = _synthetic_rects(path)
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        result = annotate_pdf(path, rects_by_page, os.path.join(tmp, 'annotated.pdf'))
+        wall = time.perf_counter() - start
+    return {
+        'success': result['success'],
+        'error': result.get('error'),
+        'pages': result['total_pages'],
+        'rects': result['total_rects'],
+        # Rect generation is setup, not part of the measured call
+        'wall_s': wall
+    }
+
+
+def _case_ts_import(path: str) -> Dict[str, Any]:
+    from import_ts_reference import read_sheet_records
+    _, records = read_sheet_records(path)
+    return {'success': True, 'rows': len(records)}
+
+
+def _case_sdtmig_extraction(path: str) -> Dict[str, Any]:
+    # Spec_SDTMIG_Extraction_Service.js always reads Resource/SDTMIG_v3.4.xlsx
+    script = (
+        "require(process.argv[1]).extractSDTMIGData().then(r => {"
+        " if (!r.success) { console.error(r.error); process.exit(1); }"
+        " console.log('\\n' + JSON.stringify({rows: r.data.Datasets.row_count + r.data.Variables.row_count}));"
+        " });"
+    )
+    service = os.path.join(SERVICES_DIR, 'Spec_SDTMIG_Extraction_Service.js')
+    proc = subprocess.run(['node', '-e', script, service], capture_output=True, text=True, cwd=BACKEND_DIR)
+    if proc.returncode != 0:
+        return {'success': False, 'error': proc.stderr.strip()[-500:]}
+    return {'success': True, **json.loads(proc.stdout.strip().splitlines()[-1])}
+
+
+def _case_terminology_import(path: str) -> Dict[str, Any]:
+    from import_sdtm_terminology import (
+        iter_terminology_chunks, iter_codelist_documents_from_chunks, parse_version_from_filename
+    )
+    file_name = os.path.basename(path)
+    file_info = {'file_name': file_name, 'version': parse_version_from_filename(file_name)}
+    rows = 0
+
+    def counted_chunks():
+        nonlocal rows
+        for chunk in iter_terminology_chunks(path):
+            rows += len(chunk)
+            yield chunk
+
+    codelists = 0
+    items = 0
+    for doc in iter_codelist_documents_from_chunks(counted_chunks(), file_info):
+        codelists += 1
+        items += len(doc['items'])
+    return {'success': True, 'rows': rows, 'codelists': codelists, 'items': items}
+
+
+CASE_FUNCTIONS = {
+    'process_pdf_simple': _case_process_pdf_simple,
+    'extract_words_only': _case_extract_words_only,
+    'extract_pages': _case_extract_pages,
+    'annotate_pdf': _case_annotate_pdf,
+    'ts_import': _case_ts_import,
+    'sdtmig_extraction': _case_sdtmig_extraction,
+    'terminology_import': _case_terminology_import,
+}
+
+
+def run_case_in_process(case: str, path: str) -> Dict[str, Any]:
+    """Child-process entry: run one case once and measure it"""
+    for extra in (SERVICES_DIR, os.path.join(SERVICES_DIR, 'crf_analysis'),
+                  os.path.join(SERVICES_DIR, 'import_reference_files', 'TS'), SCRIPTS_DIR):
+        if extra not in sys.path:
+            sys.path.insert(0, extra)
+
+    start = time.perf_counter()
+    try:
+        measured = CASE_FUNCTIONS[case](path)
+    except Exception as e:
+        measured = {'success': False, 'error': f"{type(e).__name__}: {e}"}
+    wall = measured.pop('wall_s', time.perf_counter() - start)
+
+    measured['wall_s'] = wall
+    measured['peak_rss_mb'] = max(_peak_rss_mb(resource.RUSAGE_SELF), _peak_rss_mb(resource.RUSAGE_CHILDREN))
+    return measured
+
+
+# ===================== Driver =====================
+
+def collect_targets(cases: List[str], corpora: List[str], file_patterns: List[str],
+                    terminology: Optional[str]) -> List[Dict[str, str]]:
+    """Expand the selected cases into (case, corpus, path) targets"""
+    targets = []
+    for case in cases:
+        if case in PDF_CASES:
+            for corpus in PDF_CASES[case]:
+                if corpus not in corpora:
+                    continue
+                for path in sorted(glob.glob(os.path.join(RESOURCE_DIR, corpus, '*.pdf'))):
+                    targets.append({'case': case, 'corpus': corpus, 'path': path})
+        elif 'excel' in corpora:
+            if case == 'ts_import':
+                path = os.path.join(RESOURCE_DIR, 'TS_example.xlsx')
+            elif case == 'sdtmig_extraction':
+                path = os.path.join(RESOURCE_DIR, 'SDTMIG_v3.4.xlsx')
+            else:
+                path = terminology
+                if not path:
+                    # Terminology workbook is not bundled; only run when one is given
+                    continue
+            targets.append({'case': case, 'corpus': 'excel', 'path': path})
+
+    if file_patterns:
+        targets = [t for t in targets
+                   if any(fnmatch.fnmatch(os.path.basename(t['path']), p) for p in file_patterns)]
+    return targets
+
+
+def measure_target(target: Dict[str, str], repeat: int, timeout: float) -> Dict[str, Any]:
+    """Run one target `repeat` times, each in a fresh process, and aggregate"""
+    runs = []
+    for _ in range(repeat):
+        try:
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--run-case', target['case'], target['path']],
+                capture_output=True, text=True, timeout=timeout
+            )
+            lines = proc.stdout.strip().splitlines()
+            run = json.loads(lines[-1]) if proc.returncode == 0 and lines else {
+                'success': False, 'error': proc.stderr.strip()[-500:] or f"exit code {proc.returncode}"
+            }
+        except subprocess.TimeoutExpired:
+            run = {'success': False, 'error': f"timed out after {timeout:.0f}s"}
+        runs.append(run)
+        if not run.get('success'):
+            break
+
+    entry = {
+        'case': target['case'],
+        'corpus': target['corpus'],
+        'file': os.path.basename(target['path']),
+        'size_bytes': os.path.getsize(target['path']) if os.path.exists(target['path']) else None,
+        'repeat': len(runs),
+        'success': all(r.get('success') for r in runs)
+    }
+    if not entry['success']:
+        entry['error'] = next(r.get('error') for r in runs if not r.get('success'))
+        return entry
+
+    walls = [r['wall_s'] for r in runs]
+    entry['wall_s'] = round(statistics.median(walls), 4)
+    entry['wall_s_min'] = round(min(walls), 4)
+    entry['peak_rss_mb'] = round(max(r['peak_rss_mb'] for r in runs), 1)
+    for key, value in runs[0].items():
+        if key in ('success', 'error', 'wall_s', 'peak_rss_mb'):
+            continue
+        entry[key] = value
+        if isinstance(value, (int, float)) and entry['wall_s'] > 0:
+            entry[f"{key}_per_s"] = round(value / entry['wall_s'], 1)
+    return entry
+
+
+def _result_key(entry: Dict[str, Any]) -> str:
+    return f"{entry['case']}:{entry['corpus']}:{entry['file']}"
+
+
+def compare_to_baseline(results: List[Dict[str, Any]], baseline: Dict[str, Any],
+                        threshold: float) -> List[Dict[str, Any]]:
+    """Relative change per compared metric; entries above threshold are regressions"""
+    base_by_key = {_result_key(e): e for e in baseline.get('results', []) if e.get('success')}
+    comparisons = []
+    for entry in results:
+        base = base_by_key.get(_result_key(entry))
+        if base is None or not entry.get('success'):
+            continue
+        for metric in COMPARED_METRICS:
+            if not base.get(metric):
+                continue
+            change = entry[metric] / base[metric] - 1
+            comparisons.append({
+                'key': _result_key(entry),
+                'metric': metric,
+                'baseline': base[metric],
+                'current': entry[metric],
+                'change': round(change, 4),
+                'regression': change > threshold
+            })
+    return comparisons
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=BACKEND_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _load_json(path: str, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _write_json(path: str, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _format_rate(entry: Dict[str, Any]) -> str:
+    rates = [f"{entry[k]:>9.1f} {k[:-6]}/s" for k in ('pages_per_s', 'words_per_s', 'rects_per_s', 'rows_per_s')
+             if k in entry]
+    return '  '.join(rates)
+
+
+def main():
+    """Main function: run the selected cases, append to history and compare with the baseline"""
+    parser = argparse.ArgumentParser(description='Benchmark the extraction/import entry points over Resource/')
+    parser.add_argument('--run-case', nargs=2, metavar=('CASE', 'PATH'), help=argparse.SUPPRESS)
+    parser.add_argument('--cases', default=','.join(ALL_CASES),
+                        help=f"Comma-separated cases (default: all of {', '.join(ALL_CASES)})")
+    parser.add_argument('--corpus', default='crf,protocol,excel',
+                        help='Comma-separated corpora: crf, protocol, excel (default: all)')
+    parser.add_argument('--files', action='append', default=[],
+                        help='Only run files whose basename matches this glob (repeatable)')
+    parser.add_argument('--terminology', help='CDISC SDTM Terminology workbook for terminology_import')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per target; wall time is the median (default: 1)')
+    parser.add_argument('--timeout', type=float, default=600, help='Seconds per run before it counts as failed')
+    parser.add_argument('--history', default=os.path.join(DEFAULT_RESULTS_DIR, 'history.json'),
+                        help='History file the run is appended to')
+    parser.add_argument('--baseline', default=os.path.join(DEFAULT_RESULTS_DIR, 'baseline.json'),
+                        help='Baseline file to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Relative increase in wall time or peak RSS counted as a regression (default: 0.2)')
+    parser.add_argument('--no-history', action='store_true', help='Do not append this run to the history file')
+    args = parser.parse_args()
+
+    if args.run_case:
+        # Keep stdout for the measurement line; extractor prints go to stderr
+        protocol_out = sys.stdout
+        sys.stdout = sys.stderr
+        measured = run_case_in_process(*args.run_case)
+        protocol_out.write(json.dumps(measured) + '\n')
+        return
+
+    cases = [c.strip() for c in args.cases.split(',') if c.strip()]
+    unknown = [c for c in cases if c not in CASE_FUNCTIONS]
+    if unknown:
+        parser.error(f"Unknown case(s): {', '.join(unknown)}")
+    corpora = [c.strip() for c in args.corpus.split(',') if c.strip()]
+
+    targets = collect_targets(cases, corpora, args.files, args.terminology)
+    if not targets:
+        print('❌ No benchmark targets selected', file=sys.stderr)
+        sys.exit(2)
+
+    print(f"🏁 Running {len(targets)} benchmark target(s), {args.repeat} run(s) each", file=sys.stderr)
+    results = []
+    for target in targets:
+        entry = measure_target(target, max(1, args.repeat), args.timeout)
+        results.append(entry)
+        label = f"{entry['case']:<20} {entry['file'][:40]:<40}"
+        if entry['success']:
+            print(f"  ✅ {label} {entry['wall_s']:>8.2f}s {entry['peak_rss_mb']:>8.1f} MB  {_format_rate(entry)}",
+                  file=sys.stderr)
+        else:
+            print(f"  ❌ {label} {entry['error']}", file=sys.stderr)
+
+    run = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'results': results
+    }
+
+    baseline = _load_json(args.baseline, None)
+    regressions = []
+    if baseline and not args.save_baseline:
+        comparisons = compare_to_baseline(results, baseline, args.threshold)
+        run['baseline'] = {'git_commit': baseline.get('git_commit'), 'timestamp': baseline.get('timestamp'),
+                           'threshold': args.threshold, 'comparisons': comparisons}
+        regressions = [c for c in comparisons if c['regression']]
+        print(f"\n📊 Compared {len(comparisons)} metric(s) with baseline {baseline.get('git_commit') or ''} "
+              f"({baseline.get('timestamp')}), threshold {args.threshold:.0%}", file=sys.stderr)
+        for c in comparisons:
+            marker = '🔺' if c['regression'] else '  '
+            print(f"  {marker} {c['key']:<70} {c['metric']:<12} {c['baseline']:>10} -> {c['current']:>10} "
+                  f"({c['change']:+.1%})", file=sys.stderr)
+
+    if not args.no_history:
+        history = _load_json(args.history, {'runs': []})
+        history.setdefault('runs', []).append(run)
+        _write_json(args.history, history)
+        print(f"💾 Appended run to {args.history}", file=sys.stderr)
+
+    if args.save_baseline:
+        _write_json(args.baseline, run)
+        print(f"📌 Saved baseline to {args.baseline}", file=sys.stderr)
+
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) above {args.threshold:.0%}", file=sys.stderr)
+        sys.exit(1)
+    if any(not entry['success'] for entry in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
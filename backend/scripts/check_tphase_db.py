@@ -1,6 +1,7 @@
 import os
 from pymongo import MongoClient
 from dotenv import load_dotenv
+from terminology_search import find_codelist, search_codelists, search_terms
 
 # 加载环境变量
 load_dotenv('../.env')
@@ -12,10 +13,9 @@ db = client['References']
 collection = db['sdtm_terminology']
 
 print("\n========== 1. 查找TPHASE相关的codelist ==========")
-tphase_doc = collection.find_one({
-    'File_Function': 'CDISC',
-    'codelist.name': {'$regex': 'phase', '$options': 'i'}
-})
+# 名称分词索引（codelist.keywords），不再使用无法走索引的 $regex
+phase_docs = search_codelists(collection, 'phase', limit=1)
+tphase_doc = phase_docs[0] if phase_docs else None
 
 if tphase_doc:
     print("✅ 找到Phase相关codelist:")
@@ -32,10 +32,7 @@ else:
     print("❌ 未找到Phase相关codelist")
 
 print("\n========== 2. 精确查找 'Trial Phase Classification' ==========")
-exact_doc = collection.find_one({
-    'File_Function': 'CDISC',
-    'codelist.name': 'Trial Phase Classification'
-})
+exact_doc = find_codelist(collection, name='Trial Phase Classification')
 
 if exact_doc:
     print("✅ 找到 'Trial Phase Classification'")
@@ -44,33 +41,28 @@ else:
     print("❌ 未找到 'Trial Phase Classification'")
 
 print("\n========== 3. 查找所有包含Phase的codelist名称 ==========")
-all_phase = list(collection.find({
-    'File_Function': 'CDISC',
-    'codelist.name': {'$regex': 'phase', '$options': 'i'}
-}, {'codelist.name': 1, 'codelist.code': 1}))
+all_phase = search_codelists(collection, 'phase', {'codelist.name': 1, 'codelist.code': 1})
 
 print(f"找到 {len(all_phase)} 个包含'Phase'的codelist:")
 for doc in all_phase:
     print(f"  - {doc['codelist']['name']} ({doc['codelist'].get('code')})")
 
-print("\n========== 4. 查找codelist_code包含TPHASE的 ==========")
-by_code = collection.find_one({
-    'File_Function': 'CDISC',
-    'codelist.codelist_code': {'$regex': 'TPHASE', '$options': 'i'}
-})
+print("\n========== 4. 按短码TPHASE查找 ==========")
+by_code = find_codelist(collection, short_code='TPHASE')
 
 if by_code:
-    print("✅ 通过codelist_code找到:")
+    print("✅ 通过短码找到:")
     print(f"  - codelist.name: {by_code['codelist'].get('name')}")
     print(f"  - codelist.code: {by_code['codelist'].get('code')}")
-    print(f"  - codelist.codelist_code: {by_code['codelist'].get('codelist_code')}")
+    print(f"  - codelist.submission_value: {by_code['codelist'].get('submission_value')}")
 else:
-    print("❌ 未找到codelist_code包含TPHASE的")
+    print("❌ 未找到短码为TPHASE的codelist")
 
 print("\n========== 5. 在Phase codelist中查找'Phase 3' ==========")
 if tphase_doc:
-    phase3_item = next((item for item in tphase_doc.get('items', []) 
-                        if 'phase 3' in str(item.get('submission_value', '')).lower()), None)
+    # 子项分词索引（items.keywords：提交值、同义词、NCI术语），只返回匹配的子项
+    matches = search_terms(collection, 'phase 3', code=tphase_doc['codelist']['code'])
+    phase3_item = matches[0]['items'][0] if matches and matches[0]['items'] else None
     if phase3_item:
         print("✅ 找到Phase 3:")
         print(f"  - submission_value: {phase3_item.get('submission_value')}")
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MongoDB 并发批量写入管线（参考数据导入脚本共用）
+
+功能：
+1. 按BSON字节大小自适应分批（同时限制每批操作数）
+2. 无序 bulk_write（可配置为有序）
+3. 通过线程池并发提交，限制同时在途的批次数（生产端在满载时阻塞，形成背压）；
+   pymongo 的 MongoClient 自带连接池，在途批次各占一个连接
+4. 瞬时错误重试（网络中断、主节点切换等），只重发失败的操作
+5. 结束时报告吞吐量（docs/s、MB/s）
+
+用法：
+    with BulkWritePipeline(collection, max_in_flight=4) as pipeline:
+        for doc in documents:
+            pipeline.add(InsertOne(doc))
+    print(pipeline.stats)
+"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bson
+from pymongo.errors import BulkWriteError, ConnectionFailure, OperationFailure
+
+# 默认每批上限：BSON字节数 / 操作数
+DEFAULT_BATCH_BYTES = 4 * 1024 * 1024
+DEFAULT_BATCH_OPS = 1000
+# 默认同时在途的批次数
+DEFAULT_IN_FLIGHT = 4
+# 默认重试次数与退避基数（秒，按 2^n 递增）
+DEFAULT_RETRIES = 3
+DEFAULT_RETRY_BACKOFF = 0.5
+
+# 可重试的服务端错误码（主节点切换/关闭、网络超时等）
+TRANSIENT_ERROR_CODES = {
+    6, 7, 89, 91, 189, 262, 9001, 10107, 11600, 11602, 13435, 13436
+}
+# 重试时已写入的插入会报重复键，视为成功
+DUPLICATE_KEY_ERROR = 11000
+
+
+def operation_size(operation):
+    """估算单个写操作的BSON字节数（文档/更新 + 过滤条件，用于分批）"""
+    size = 0
+    for attribute in ('_doc', '_filter'):
+        value = getattr(operation, attribute, None)
+        if isinstance(value, dict):
+            size += len(bson.encode(value))
+        elif isinstance(value, list):
+            # 聚合管道形式的更新
+            size += sum(len(bson.encode(stage)) for stage in value)
+    return size
+
+
+def is_transient_error(error):
+    """是否为可重试的瞬时错误"""
+    if isinstance(error, ConnectionFailure):
+        return True
+    if isinstance(error, OperationFailure):
+        return error.code in TRANSIENT_ERROR_CODES or error.has_error_label('RetryableWriteError')
+    return False
+
+
+class BulkWritePipeline:
+    """按字节自适应分批、并发提交、带重试的 bulk_write 管线"""
+
+    def __init__(self, collection, max_batch_bytes=DEFAULT_BATCH_BYTES, max_batch_ops=DEFAULT_BATCH_OPS,
+                 max_in_flight=DEFAULT_IN_FLIGHT, ordered=False, retries=DEFAULT_RETRIES,
+                 retry_backoff=DEFAULT_RETRY_BACKOFF, on_batch=None):
+        """
+        Args:
+            collection: pymongo Collection
+            max_batch_bytes: 每批BSON字节上限（超过即提交，单个超大操作单独成批）
+            max_batch_ops: 每批操作数上限
+            max_in_flight: 同时在途的批次数（1 = 串行）
+            ordered: 是否有序写入（有序时批次也按顺序串行提交）
+            retries: 瞬时错误的重试次数
+            retry_backoff: 重试退避基数（秒）
+            on_batch: 每批完成后的回调 on_batch(stats)（在写入线程中调用）
+        """
+        self.collection = collection
+        self.max_batch_bytes = max(1, max_batch_bytes)
+        self.max_batch_ops = max(1, max_batch_ops)
+        self.max_in_flight = 1 if ordered else max(1, max_in_flight)
+        self.ordered = ordered
+        self.retries = max(0, retries)
+        self.retry_backoff = retry_backoff
+        self.on_batch = on_batch
+
+        self._batch = []
+        self._batch_bytes = 0
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix='mongo-write')
+        self._futures = []
+        self._lock = threading.Lock()
+        self._started = None
+        self._closed = False
+        self.stats = {
+            'batches': 0, 'operations': 0, 'bytes': 0, 'retries': 0,
+            'inserted': 0, 'matched': 0, 'modified': 0, 'deleted': 0, 'upserted': 0,
+            'seconds': 0.0, 'docs_per_s': 0.0, 'mb_per_s': 0.0
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        return False
+
+    def add(self, operation):
+        """加入一个写操作；当前批次达到字节/操作数上限时提交（在途批次已满则等待）"""
+        if self._started is None:
+            self._started = time.perf_counter()
+        size = operation_size(operation)
+        if self._batch and self._batch_bytes + size > self.max_batch_bytes:
+            self._submit()
+        self._batch.append(operation)
+        self._batch_bytes += size
+        if len(self._batch) >= self.max_batch_ops or self._batch_bytes >= self.max_batch_bytes:
+            self._submit()
+
+    def flush(self):
+        """提交当前批次并等待所有在途批次完成（写入错误在此抛出）"""
+        if self._batch:
+            self._submit()
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+        self._update_throughput()
+        return self.stats
+
+    def close(self):
+        """flush 后关闭线程池，返回统计（含吞吐量）"""
+        if self._closed:
+            return self.stats
+        try:
+            return self.flush()
+        finally:
+            self._closed = True
+            self._executor.shutdown(wait=True)
+
+    def _submit(self):
+        batch, batch_bytes = self._batch, self._batch_bytes
+        self._batch, self._batch_bytes = [], 0
+        # 已完成批次的错误尽早抛出，不再继续提交
+        for future in [f for f in self._futures if f.done()]:
+            future.result()
+            self._futures.remove(future)
+        self._slots.acquire()
+        future = self._executor.submit(self._write_batch, batch, batch_bytes)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def _write_batch(self, batch, batch_bytes):
+        pending = batch
+        attempt = 0
+        while True:
+            try:
+                result = self.collection.bulk_write(pending, ordered=self.ordered)
+                self._record(result.bulk_api_result)
+                break
+            except BulkWriteError as error:
+                details = error.details
+                self._record(details)
+                # 写关注错误：写入可能未被确认，不能计入成功
+                if details.get('writeConcernErrors'):
+                    raise
+                write_errors = details.get('writeErrors', [])
+                retry_ops = []
+                for write_error in write_errors:
+                    code = write_error.get('code')
+                    if code == DUPLICATE_KEY_ERROR and attempt > 0:
+                        continue
+                    if code not in TRANSIENT_ERROR_CODES or attempt >= self.retries:
+                        raise
+                    retry_ops.append(pending[write_error['index']])
+                if self.ordered and write_errors:
+                    # 有序写入在第一个错误处停止，之后的操作都未执行；
+                    # 重试时的重复键（上次已写入）跳过该操作，从下一个继续
+                    first = write_errors[0]
+                    skip = 1 if first.get('code') == DUPLICATE_KEY_ERROR else 0
+                    retry_ops = pending[first['index'] + skip:]
+                if not retry_ops:
+                    break
+                pending = retry_ops
+            except (ConnectionFailure, OperationFailure) as error:
+                if not is_transient_error(error) or attempt >= self.retries:
+                    raise
+            attempt += 1
+            with self._lock:
+                self.stats['retries'] += 1
+            time.sleep(self.retry_backoff * (2 ** (attempt - 1)))
+
+        with self._lock:
+            self.stats['batches'] += 1
+            self.stats['operations'] += len(batch)
+            self.stats['bytes'] += batch_bytes
+            self._update_throughput()
+            snapshot = dict(self.stats)
+        if self.on_batch:
+            self.on_batch(snapshot)
+
+    def _record(self, result):
+        with self._lock:
+            self.stats['inserted'] += result.get('nInserted', 0)
+            self.stats['matched'] += result.get('nMatched', 0)
+            self.stats['modified'] += result.get('nModified', 0)
+            self.stats['deleted'] += result.get('nRemoved', 0)
+            self.stats['upserted'] += result.get('nUpserted', 0)
+
+    def _update_throughput(self):
+        """吞吐量按第一个操作加入到最后一批确认的墙钟时间计算"""
+        if self._started is None:
+            return
+        seconds = time.perf_counter() - self._started
+        self.stats['seconds'] = round(seconds, 3)
+        if seconds > 0:
+            self.stats['docs_per_s'] = round(self.stats['operations'] / seconds, 1)
+            self.stats['mb_per_s'] = round(self.stats['bytes'] / seconds / (1024 * 1024), 2)
+
+
+def format_throughput(stats):
+    """吞吐量摘要文本"""
+    return (f"{stats['operations']} 个操作 / {stats['batches']} 批，"
+            f"{stats['bytes'] / (1024 * 1024):.1f} MB，用时 {stats['seconds']:.2f}s，"
+            f"{stats['docs_per_s']:.0f} docs/s，{stats['mb_per_s']:.2f} MB/s，重试 {stats['retries']} 次")
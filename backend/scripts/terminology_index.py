@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SDTM Terminology 进程内查找索引（References/sdtm_terminology 的内存副本）
+
+功能：
+1. 由导入脚本生成的大类文档（build_codelist_document / build_item 的结构）构建，
+   可直接从 MongoDB 集合加载，整个映射/Spec生成过程只需一次数据库读取
+2. 精确查找（哈希表）：大类 code / 名称 / 短码，子项 code，
+   大类内提交值或同义词（不区分大小写，规则同 terminology_search.normalize_text）
+3. 前缀查找：大类名称/短码、子项提交值/同义词的规范化文本排序后二分查找
+   （与前缀树等价的区间查询，内存只有前缀树的一小部分）
+4. 模糊查找：三元组（trigram）倒排索引，按 Dice 系数排序
+5. 按发布标记区分版本：导入脚本在导入全部完成后写入发布标记（版本 + 内容指纹，
+   见 publish_release），get_terminology_index 定期检查标记，变化后自动重建；
+   导入进行中标记不变，不会把写了一半的集合当作新版本缓存
+6. 也可以从导入脚本生成的本地快照加载（from_snapshot），不依赖数据库
+
+用法：
+    index = get_terminology_index(collection)
+    item = index.term('N', name='No Yes Response')
+    index.prefix('phase i')
+    index.fuzzy('trail phase')
+"""
+
+import os
+import sys
+import time
+import hashlib
+import threading
+from bisect import bisect_left
+from collections import Counter
+
+from terminology_search import FILE_FUNCTION, normalize_text
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'services', 'import_reference_files'))
+from reference_snapshot import TERMINOLOGY_DATASET, open_snapshot, iter_terminology_documents
+
+# 加载时不需要的字段（检索字段在内存中重新计算）
+LOAD_PROJECTION = {
+    'content_hash': 0,
+    'codelist.name_norm': 0, 'codelist.submission_value_norm': 0, 'codelist.keywords': 0,
+    'items.submission_value_norm': 0, 'items.synonyms_norm': 0, 'items.keywords': 0
+}
+# 发布标记集合：<术语集合名>_release，每个 File_Function 一条（_id = File_Function）
+RELEASE_COLLECTION_SUFFIX = '_release'
+# get_terminology_index 两次检查发布标记之间的最短间隔（秒）
+VERSION_CHECK_SECONDS = 60
+# 模糊查找默认的最低相似度（Dice 系数）
+FUZZY_THRESHOLD = 0.3
+
+# 前缀/模糊查找的文本来源
+KIND_CODELIST_NAME = 'codelist_name'
+KIND_CODELIST_SHORT_CODE = 'codelist_short_code'
+KIND_SUBMISSION_VALUE = 'submission_value'
+KIND_SYNONYM = 'synonym'
+
+
+def trigrams(text):
+    """规范化文本的三元组集合（首尾补空格，短文本也至少有一个三元组）"""
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TerminologyIndex:
+    """一个版本的 SDTM Terminology 内存索引（构建后只读，可在线程间共享）"""
+
+    def __init__(self, documents, version=None):
+        """
+        Args:
+            documents: 大类文档（codelist + items）
+            version: 版本；默认取文档中最大的 version
+        """
+        self.codelists = {}             # code → 大类文档
+        self._codelist_by_name = {}     # 规范化名称 → code
+        self._codelist_by_short_code = {}  # 规范化短码 → code
+        self._items_by_code = {}        # 子项 code → [(大类code, 子项)]（同一子项可属于多个大类）
+        self._terms = {}                # (大类code, 规范化提交值/同义词) → 子项（提交值优先）
+        self._terms_by_value = {}       # 规范化提交值/同义词 → [(大类code, 子项)]
+        # 前缀/模糊查找的文本：规范化文本 → [(类型, 大类code, 子项或None)]
+        entries = {}
+        versions = set()
+
+        for document in documents:
+            codelist = document['codelist']
+            code = codelist.get('code') or ''
+            self.codelists[code] = document
+            if document.get('version'):
+                versions.add(document['version'])
+
+            name = normalize_text(codelist.get('name'))
+            short_code = normalize_text(codelist.get('submission_value'))
+            if name:
+                self._codelist_by_name.setdefault(name, code)
+                entries.setdefault(name, []).append((KIND_CODELIST_NAME, code, None))
+            if short_code:
+                self._codelist_by_short_code.setdefault(short_code, code)
+                entries.setdefault(short_code, []).append((KIND_CODELIST_SHORT_CODE, code, None))
+
+            synonym_terms = []
+            for item in document.get('items', []):
+                self._items_by_code.setdefault(item.get('code') or '', []).append((code, item))
+                value = normalize_text(item.get('submission_value'))
+                if value:
+                    self._terms[(code, value)] = self._terms.get((code, value), item)
+                    self._terms_by_value.setdefault(value, []).append((code, item))
+                    entries.setdefault(value, []).append((KIND_SUBMISSION_VALUE, code, item))
+                for synonym in item.get('synonyms') or []:
+                    synonym = normalize_text(synonym)
+                    if synonym:
+                        synonym_terms.append((synonym, item))
+                        entries.setdefault(synonym, []).append((KIND_SYNONYM, code, item))
+            # 同义词只在大类内没有同名提交值时才作为精确匹配
+            for synonym, item in synonym_terms:
+                if (code, synonym) not in self._terms:
+                    self._terms[(code, synonym)] = item
+                    self._terms_by_value.setdefault(synonym, []).append((code, item))
+
+        self.version = version or (max(versions) if versions else None)
+
+        # 前缀查找：排序后的规范化文本（与 _entries 一一对应）
+        self._texts = sorted(entries)
+        self._entries = [entries[text] for text in self._texts]
+        # 模糊查找：三元组 → 文本下标
+        self._trigram_postings = {}
+        self._trigram_counts = []
+        for position, text in enumerate(self._texts):
+            text_trigrams = trigrams(text)
+            self._trigram_counts.append(len(text_trigrams))
+            for trigram in text_trigrams:
+                self._trigram_postings.setdefault(trigram, []).append(position)
+
+    @classmethod
+    def from_collection(cls, collection, query=None):
+        """从 MongoDB 集合加载（默认 File_Function = CDISC 的全部大类）"""
+        query = query if query is not None else {'File_Function': FILE_FUNCTION}
+        return cls(collection.find(query, LOAD_PROJECTION))
+
+    @classmethod
+    def from_snapshot(cls, version=None, directory=None):
+        """从本地快照加载（默认最近生成的版本，目录默认 reference_snapshot.DEFAULT_SNAPSHOT_DIR）"""
+        with open_snapshot(TERMINOLOGY_DATASET, version, directory) as snapshot:
+            return cls(iter_terminology_documents(snapshot), snapshot.version)
+
+    def __len__(self):
+        return len(self.codelists)
+
+    # ===================== 精确查找 =====================
+
+    def codelist(self, code=None, name=None, short_code=None):
+        """按 C-code / 名称 / 短码查找大类文档，未找到返回None"""
+        if not code:
+            if name:
+                code = self._codelist_by_name.get(normalize_text(name))
+            elif short_code:
+                code = self._codelist_by_short_code.get(normalize_text(short_code))
+        return self.codelists.get(code) if code else None
+
+    def item(self, code):
+        """按子项 C-code 查找，返回 [(大类code, 子项)]"""
+        return self._items_by_code.get(code, [])
+
+    def term(self, value, code=None, name=None, short_code=None):
+        """
+        按提交值或同义词（不区分大小写）查找子项
+
+        指定大类（code / name / short_code）时在该大类内查找；否则返回第一个匹配的子项。
+        未找到返回None
+        """
+        normalized = normalize_text(value)
+        if code or name or short_code:
+            codelist = self.codelist(code, name, short_code)
+            if codelist is None:
+                return None
+            return self._terms.get((codelist['codelist']['code'], normalized))
+        matches = self._terms_by_value.get(normalized)
+        return matches[0][1] if matches else None
+
+    def terms(self, value):
+        """所有提交值或同义词等于 value 的子项，返回 [(大类code, 子项)]"""
+        return self._terms_by_value.get(normalize_text(value), [])
+
+    # ===================== 前缀/模糊查找 =====================
+
+    def prefix(self, text, limit=20, codelist_code=None):
+        """
+        规范化文本以 text 开头的大类名称/短码、子项提交值/同义词
+
+        Returns:
+            [{'text', 'kind', 'codelist_code', 'item'}]，按文本排序
+        """
+        prefix = normalize_text(text)
+        results = []
+        for position in range(bisect_left(self._texts, prefix), len(self._texts)):
+            if not self._texts[position].startswith(prefix):
+                break
+            if self._collect(results, position, codelist_code, limit):
+                break
+        return results
+
+    def fuzzy(self, text, limit=10, threshold=FUZZY_THRESHOLD, codelist_code=None):
+        """
+        三元组相似度最高的大类名称/短码、子项提交值/同义词（可用于拼写错误的输入）
+
+        Returns:
+            [{'text', 'kind', 'codelist_code', 'item', 'score'}]，按相似度从高到低
+        """
+        query_trigrams = trigrams(normalize_text(text))
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(self._trigram_postings.get(trigram, ()))
+
+        scored = []
+        for position, count in shared.items():
+            score = 2 * count / (len(query_trigrams) + self._trigram_counts[position])
+            if score >= threshold:
+                scored.append((score, position))
+        scored.sort(key=lambda pair: (-pair[0], self._texts[pair[1]]))
+
+        results = []
+        for score, position in scored:
+            start = len(results)
+            full = self._collect(results, position, codelist_code, limit)
+            for result in results[start:]:
+                result['score'] = round(score, 3)
+            if full:
+                break
+        return results
+
+    def _collect(self, results, position, codelist_code, limit):
+        """把第 position 个文本的条目加入结果，达到 limit 时返回True"""
+        text = self._texts[position]
+        for kind, code, item in self._entries[position]:
+            if codelist_code and code != codelist_code:
+                continue
+            results.append({'text': text, 'kind': kind, 'codelist_code': code, 'item': item})
+            if limit and len(results) >= limit:
+                return True
+        return False
+
+
+# ===================== 进程内缓存 =====================
+
+_cache_lock = threading.Lock()
+_cached_index = None
+_cached_release = None
+_checked_at = 0.0
+
+
+def release_collection(collection):
+    """术语集合对应的发布标记集合"""
+    return collection.database[collection.name + RELEASE_COLLECTION_SUFFIX]
+
+
+def release_fingerprint(content_hashes):
+    """一次发布的内容指纹：全部大类 content_hash 排序后的哈希（与文档顺序无关）"""
+    digest = hashlib.sha256()
+    for content_hash in sorted(content_hashes):
+        digest.update(content_hash.encode('ascii'))
+    return digest.hexdigest()
+
+
+def publish_release(collection, version, fingerprint, file_name=None):
+    """导入全部完成后写入发布标记（导入中途失败则不写，缓存继续使用上一版本）"""
+    release_collection(collection).replace_one(
+        {'_id': FILE_FUNCTION},
+        {'_id': FILE_FUNCTION, 'version': version, 'fingerprint': fingerprint,
+         'File_Name': file_name, 'published_at': time.strftime('%Y-%m-%d %H:%M:%S')},
+        upsert=True
+    )
+
+
+def stored_release(collection):
+    """当前发布标记 (version, fingerprint)；尚未写过标记时返回None"""
+    document = release_collection(collection).find_one({'_id': FILE_FUNCTION})
+    return (document.get('version'), document.get('fingerprint')) if document else None
+
+
+def get_terminology_index(collection, check_interval=VERSION_CHECK_SECONDS):
+    """
+    进程内共享的 TerminologyIndex；距上次检查超过 check_interval 秒时
+    读取发布标记，与缓存时不同（完成了新的导入）则重新加载
+
+    标记在加载集合之前读取：加载期间完成的导入会改变标记，下次检查时重建
+    """
+    global _cached_index, _cached_release, _checked_at
+    with _cache_lock:
+        now = time.monotonic()
+        if _cached_index is not None and now - _checked_at < check_interval:
+            return _cached_index
+        release = stored_release(collection)
+        if _cached_index is None or _cached_release != release:
+            _cached_index = TerminologyIndex.from_collection(collection)
+            _cached_release = release
+        _checked_at = now
+        return _cached_index
+
+
+def invalidate_terminology_index():
+    """
+    丢弃本进程缓存的索引（下次 get_terminology_index 重新加载）
+
+    只影响调用它的进程；其他进程通过发布标记发现新版本
+    """
+    global _cached_index, _cached_release
+    with _cache_lock:
+        _cached_index = None
+        _cached_release = None
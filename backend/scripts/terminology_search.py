@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SDTM Terminology 检索字段与查询辅助（References/sdtm_terminology）
+
+功能：
+1. 导入时预先计算的规范化检索字段（NFKC + casefold + 合并空白）：
+   - codelist.name_norm / codelist.submission_value_norm（大类名称 / 短码，如 TPHASE）
+   - codelist.keywords：大类名称、短码、NCI术语的分词
+   - items[].submission_value_norm / items[].synonyms_norm
+   - items[].keywords：子项提交值、同义词、NCI术语的分词
+2. 与之对应的复合索引和全文索引（ensure_search_indexes）
+3. 基于这些字段的查询函数：大类/子项查找都是索引查找，不再使用不区分大小写的 $regex
+   （无法使用索引）或在Python中逐个扫描 items
+
+用法：
+    from terminology_search import find_codelist, find_term
+    doc = find_codelist(collection, short_code='TPHASE')
+    doc, item = find_term(collection, 'phase iii trial', short_code='TPHASE')
+"""
+
+import re
+import unicodedata
+
+from pymongo import ASCENDING, TEXT
+
+# 导入脚本写入的 File_Function
+FILE_FUNCTION = 'CDISC'
+
+# 分词：规范化后的连续字母/数字
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# 检索索引（名称, 键）；File_Function 在前（等值条件），数组字段每个索引只含一个
+SEARCH_INDEXES = [
+    ('codelist_name_norm', [('File_Function', ASCENDING), ('codelist.name_norm', ASCENDING)]),
+    ('codelist_submission_value_norm', [('File_Function', ASCENDING), ('codelist.submission_value_norm', ASCENDING)]),
+    ('codelist_keywords', [('File_Function', ASCENDING), ('codelist.keywords', ASCENDING)]),
+    ('items_submission_value_norm', [('File_Function', ASCENDING), ('items.submission_value_norm', ASCENDING)]),
+    ('items_synonyms_norm', [('File_Function', ASCENDING), ('items.synonyms_norm', ASCENDING)]),
+    ('items_keywords', [('File_Function', ASCENDING), ('items.keywords', ASCENDING)]),
+]
+
+# 全文索引（每个集合只能有一个）：字段 → 权重
+TEXT_INDEX_NAME = 'terminology_text'
+TEXT_INDEX_WEIGHTS = {
+    'codelist.name': 10,
+    'codelist.submission_value': 10,
+    'items.submission_value': 5,
+    'items.synonyms': 3,
+    'items.nci_preferred_term': 1,
+}
+
+# ===================== 规范化 =====================
+
+def fold_text(value):
+    """NFKC + casefold（纯ASCII时等价于lower，跳过NFKC）"""
+    return value.lower() if value.isascii() else unicodedata.normalize('NFKC', value).casefold()
+
+def normalize_text(value):
+    """规范化文本：NFKC、casefold、合并连续空白、去首尾空格（空值→''）"""
+    if not value:
+        return ''
+    return ' '.join(fold_text(str(value)).split())
+
+def tokenize(value):
+    """规范化后分词"""
+    return TOKEN_PATTERN.findall(normalize_text(value))
+
+def keyword_list(*values):
+    """多个文本的分词合并去重（排序，保证内容哈希稳定）"""
+    tokens = set()
+    for value in values:
+        tokens.update(TOKEN_PATTERN.findall(normalize_text(value)))
+    return sorted(tokens)
+
+def add_codelist_search_fields(codelist):
+    """为 codelist 子文档加上检索字段（原地修改并返回）"""
+    codelist['name_norm'] = normalize_text(codelist.get('name'))
+    codelist['submission_value_norm'] = normalize_text(codelist.get('submission_value'))
+    codelist['keywords'] = keyword_list(codelist.get('name'), codelist.get('submission_value'),
+                                        codelist.get('nci_preferred_term'))
+    return codelist
+
+def item_search_fields(submission_value, synonyms, nci_term):
+    """子项检索字段"""
+    return {
+        'submission_value_norm': normalize_text(submission_value),
+        'synonyms_norm': [normalize_text(synonym) for synonym in synonyms],
+        'keywords': keyword_list(submission_value, nci_term, *synonyms)
+    }
+
+def item_search_columns(submission_values, synonym_strings, nci_terms, synonyms):
+    """
+    按列计算子项检索字段（与item_search_fields等价）
+
+    Args:
+        submission_values / synonym_strings / nci_terms: 已清理的字符串列表（同义词为原始字符串）
+        synonyms: 每行解析后的同义词列表
+
+    Returns:
+        与行对应的检索字段字典列表
+    """
+    # 同义词分隔符（;,）不是词字符，整串分词与逐个同义词分词结果相同
+    return [
+        {
+            'submission_value_norm': normalize_text(submission_value),
+            'synonyms_norm': [normalize_text(synonym) for synonym in item_synonyms] if item_synonyms else [],
+            'keywords': sorted(set(TOKEN_PATTERN.findall(fold_text(f'{submission_value} {synonym_string} {nci_term}'))))
+        }
+        for submission_value, synonym_string, nci_term, item_synonyms in zip(
+            submission_values, synonym_strings, nci_terms, synonyms
+        )
+    ]
+
+# ===================== 索引 =====================
+
+def ensure_search_indexes(collection):
+    """创建检索字段的复合索引和全文索引（已存在则跳过）"""
+    for name, keys in SEARCH_INDEXES:
+        collection.create_index(keys, name=name)
+    collection.create_index([(field, TEXT) for field in TEXT_INDEX_WEIGHTS],
+                            name=TEXT_INDEX_NAME, weights=TEXT_INDEX_WEIGHTS)
+
+# ===================== 查询 =====================
+
+def codelist_filter(name=None, short_code=None, code=None):
+    """大类过滤条件：名称 / 短码（不区分大小写）/ C-code（精确）"""
+    query = {'File_Function': FILE_FUNCTION}
+    if name:
+        query['codelist.name_norm'] = normalize_text(name)
+    if short_code:
+        query['codelist.submission_value_norm'] = normalize_text(short_code)
+    if code:
+        query['codelist.code'] = code.strip()
+    return query
+
+def find_codelist(collection, name=None, short_code=None, code=None, projection=None):
+    """按名称/短码/C-code查找一个大类（索引查找），未找到返回None"""
+    return collection.find_one(codelist_filter(name, short_code, code), projection)
+
+def search_codelists(collection, text, projection=None, limit=0):
+    """查找名称/短码/NCI术语包含 text 全部词的大类（codelist.keywords 索引）"""
+    tokens = tokenize(text)
+    if not tokens:
+        return []
+    query = {'File_Function': FILE_FUNCTION, 'codelist.keywords': {'$all': tokens}}
+    return list(collection.find(query, projection).limit(limit))
+
+def find_term(collection, value, name=None, short_code=None, code=None):
+    """
+    按提交值或同义词（不区分大小写）查找子项，可限定大类
+
+    Returns:
+        (doc, item)：doc 只含大类信息和版本，item 为第一个匹配的子项；未找到返回 (None, None)
+    """
+    normalized = normalize_text(value)
+    if not normalized:
+        return None, None
+    item_match = {'$elemMatch': {'$or': [{'submission_value_norm': normalized}, {'synonyms_norm': normalized}]}}
+    query = codelist_filter(name, short_code, code)
+    query['items'] = item_match
+    doc = collection.find_one(query, {'codelist': 1, 'version': 1, 'items': item_match})
+    if not doc:
+        return None, None
+    return doc, doc.pop('items')[0]
+
+def search_terms(collection, text, name=None, short_code=None, code=None, limit=0):
+    """
+    查找提交值/同义词/NCI术语包含 text 全部词的子项（items.keywords 索引），可限定大类
+
+    Returns:
+        [{'codelist': ..., 'version': ..., 'items': [匹配的子项]}, ...]
+    """
+    tokens = tokenize(text)
+    if not tokens:
+        return []
+    match = codelist_filter(name, short_code, code)
+    match['items.keywords'] = {'$all': tokens}
+    pipeline = [{'$match': match}]
+    if limit:
+        pipeline.append({'$limit': limit})
+    pipeline.append({'$project': {
+        'codelist': 1, 'version': 1,
+        'items': {'$filter': {'input': '$items', 'as': 'item',
+                              'cond': {'$setIsSubset': [tokens, '$$item.keywords']}}}
+    }})
+    return list(collection.aggregate(pipeline))
+
+def text_search(collection, text, projection=None, limit=20):
+    """全文检索（带词干处理），按相关度排序"""
+    projection = dict(projection or {'codelist': 1, 'version': 1})
+    projection['score'] = {'$meta': 'textScore'}
+    cursor = collection.find({'File_Function': FILE_FUNCTION, '$text': {'$search': text}}, projection)
+    return list(cursor.sort([('score', {'$meta': 'textScore'})]).limit(limit))
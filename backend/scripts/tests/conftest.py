@@ -0,0 +1,10 @@
+"""测试公共配置：把导入脚本目录、参考数据快照模块和 PDF 服务模块加入 sys.path"""
+
+import os
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(SCRIPTS_DIR), 'services', 'import_reference_files'))
+sys.path.insert(0, os.path.join(os.path.dirname(SCRIPTS_DIR), 'services'))
+sys.path.insert(0, os.path.join(os.path.dirname(SCRIPTS_DIR), 'services', 'crf_analysis'))
@@ -0,0 +1,32 @@
+"""测试用的 SDTM Terminology 表格数据（与 iter_terminology_chunks 生成的DataFrame列相同）"""
+
+import pandas as pd
+
+from import_sdtm_terminology import COLUMN_MAPPING, iter_codelist_documents_from_chunks
+
+FILE_INFO = {'file_name': 'CDISC SDTM Terminology_20250627.xlsx', 'version': '2025-06-27'}
+
+# (大类code, 名称, 短码, [(子项code, 提交值, 同义词)])
+NY = ('C66742', 'No Yes Response', 'NY', [('C49487', 'N', 'No'), ('C49488', 'Y', 'Yes')])
+PHASE = ('C66737', 'Trial Phase Response', 'TPHASE', [('C15600', 'PHASE I TRIAL', 'Phase 1; Trial Phase 1'),
+                                                      ('C15601', 'PHASE II TRIAL', None)])
+SEX = ('C66731', 'Sex', 'SEX', [('C20197', 'M', 'Male'), ('C16576', 'F', 'Female')])
+
+
+def codelist_rows(code, name, short_code, items):
+    """一个大类的表格行：标题行 + 子项行（列顺序同 COLUMN_MAPPING）"""
+    rows = [[code, None, 'No', name, short_code, None, f'{name} definition', name]]
+    for item_code, value, synonyms in items:
+        rows.append([item_code, code, None, name, value, synonyms, f'{value} definition', value])
+    return rows
+
+
+def terminology_frame(codelists):
+    """多个大类 → 与 iter_terminology_chunks 相同列名的DataFrame"""
+    rows = [row for codelist in codelists for row in codelist_rows(*codelist)]
+    return pd.DataFrame(rows, columns=list(COLUMN_MAPPING))
+
+
+def release(*codelists):
+    """解析一次发布的大类文档"""
+    return list(iter_codelist_documents_from_chunks([terminology_frame(codelists)], FILE_INFO))
@@ -0,0 +1,75 @@
+"""
+CRFR 二进制矩形文件往返测试：Node 端 annotationRectsFile.js 编码 → Python 端 load_rects 解码
+
+运行：cd backend/scripts && python -m pytest tests（需要 node，没有时跳过）
+"""
+
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from pdf_annotation_rects import encode_rect_batches, load_rect_batches, load_rects
+
+RECTS_FILE_JS = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                             'services', 'crf_analysis', 'annotationRectsFile.js')
+
+BATCHES = [
+    {
+        '1': [{'rect': [72.5, 700.25, 180.125, 716.0], 'text': 'AETERM', 'background_color': [1, 0.9, 0.6],
+               'form_name': 'AE'},
+              {'rect': [72.5, 680.0, 180.0, 696.0], 'text': 'AESEV', 'background_color': [1, 0.9, 0.6],
+               'form_name': 'AE'}],
+        '12': [{'rect': [0, 0, 612, 792], 'text': '不良事件 / Adverse Events', 'form_name': 'AE'}]
+    },
+    {},
+    {
+        '3': [{'rect': [10, 20, 30, 40], 'text': 'SEX', 'background_color': [0.75, 1, 0.75]},
+              {'rect': [10, 20, 30, 40], 'text': ''}]
+    }
+]
+
+
+def expected_rect(page_key, rect):
+    """解码结果：每个矩形带 page_number，缺省 text 为空字符串，数值为浮点"""
+    decoded = {'page_number': int(page_key), 'rect': [float(v) for v in rect['rect']], 'text': rect.get('text', '')}
+    if 'background_color' in rect:
+        decoded['background_color'] = [float(v) for v in rect['background_color']]
+    if 'form_name' in rect:
+        decoded['form_name'] = rect['form_name']
+    return decoded
+
+
+def expected_batches(batches):
+    return [{page_key: [expected_rect(page_key, rect) for rect in rects] for page_key, rects in rects_by_page.items()}
+            for rects_by_page in batches]
+
+
+def write_with_node(batches, path):
+    script = ("const fs = require('fs');"
+              "const { encodeRectBatches } = require(process.argv[1]);"
+              "fs.writeFileSync(process.argv[2], encodeRectBatches(JSON.parse(process.argv[3])));")
+    subprocess.run(['node', '-e', script, RECTS_FILE_JS, str(path), json.dumps(batches)], check=True)
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='需要 node')
+def test_js_encoded_rects_decode_in_python(tmp_path):
+    """JS 编码的文件经 mmap 解码后与原始批次一致，且与 Python 编码的字节完全相同"""
+    path = tmp_path / 'rects.bin'
+    write_with_node(BATCHES, path)
+
+    assert path.read_bytes() == encode_rect_batches(BATCHES)
+    assert load_rects(str(path)) == expected_batches(BATCHES)
+    assert load_rect_batches(str(path), 'binary') == expected_batches(BATCHES)
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='需要 node')
+def test_js_encoded_empty_batch_list(tmp_path):
+    """没有批次时只有文件头，解码为空列表"""
+    path = tmp_path / 'rects.bin'
+    write_with_node([], path)
+
+    assert path.stat().st_size == 24
+    assert load_rects(str(path)) == []
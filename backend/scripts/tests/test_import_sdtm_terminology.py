@@ -0,0 +1,51 @@
+"""
+import_sdtm_terminology 差异导入测试（不需要Excel文件和数据库）
+
+运行：cd backend/scripts && python -m pytest tests
+"""
+
+from pymongo import DeleteMany, InsertOne, ReplaceOne
+
+from import_sdtm_terminology import iter_diff_operations
+from terminology_fixtures import NY, PHASE, SEX, release
+
+
+def stored_from(documents):
+    """模拟 load_stored_codelists 的结果"""
+    stored = {}
+    for document in documents:
+        stored.setdefault(document['codelist']['code'], []).append(
+            {'_id': document['_id'], 'content_hash': document['content_hash']})
+    return stored
+
+
+def new_stats():
+    return {'inserted': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0}
+
+
+def test_same_release_yields_no_operations():
+    """同一发布重新导入：没有任何写操作"""
+    stats = new_stats()
+    operations = list(iter_diff_operations(release(NY, PHASE), stored_from(release(NY, PHASE)), stats))
+
+    assert operations == []
+    assert stats == {'inserted': 0, 'updated': 0, 'unchanged': 2, 'deleted': 0}
+
+
+def test_edit_drop_and_new_codelist():
+    """一个大类修改、一个删除、一个新增 → 一个 ReplaceOne、一个 DeleteMany、一个 InsertOne"""
+    previous = release(NY, PHASE, SEX)
+    edited_phase = PHASE[:3] + ([('C15600', 'PHASE I TRIAL', 'Phase 1'), ('C15601', 'PHASE II TRIAL', None)],)
+    new_codelist = ('C66769', 'Severity/Intensity Scale', 'AESEV', [('C41338', 'MILD', None)])
+    stats = new_stats()
+
+    operations = list(iter_diff_operations(release(NY, edited_phase, new_codelist), stored_from(previous), stats))
+
+    assert [type(operation) for operation in operations] == [ReplaceOne, InsertOne, DeleteMany]
+    phase_id = next(doc['_id'] for doc in previous if doc['codelist']['code'] == 'C66737')
+    sex_id = next(doc['_id'] for doc in previous if doc['codelist']['code'] == 'C66731')
+    assert operations[0]._filter == {'_id': phase_id}
+    assert operations[0]._doc['_id'] == phase_id
+    assert operations[1]._doc['codelist']['code'] == 'C66769'
+    assert operations[2]._filter == {'_id': {'$in': [sex_id]}}
+    assert stats == {'inserted': 1, 'updated': 1, 'unchanged': 1, 'deleted': 1}
@@ -0,0 +1,90 @@
+"""
+pdf_annotate 增量更新测试：追加的 xref 表 / xref 流能被 PdfReader(strict=True) 重新读取
+
+运行：cd backend/scripts && python -m pytest tests
+"""
+
+import logging
+
+import pytest
+from pypdf import PdfReader, PdfWriter
+
+from pdf_annotate import annotate_pdf, update_form_annotations
+
+RECTS = {
+    '1': [{'rect': [50, 700, 150, 720], 'text': 'AETERM', 'form_name': 'AE'},
+          {'rect': [50, 650, 150, 670], 'text': 'AESEV', 'form_name': 'AE'}],
+    '2': [{'rect': [50, 700, 150, 720], 'text': 'SEX', 'form_name': 'DM'}]
+}
+
+
+def blank_pdf(path, pages=2):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=612, height=792)
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+def annotated_pdf(tmp_path):
+    source = tmp_path / 'blank.pdf'
+    output = tmp_path / 'annotated.pdf'
+    blank_pdf(str(source))
+    annotate_pdf(str(source), RECTS, str(output))
+    return output
+
+
+def with_xref_stream(path):
+    """用 pypdf 的增量写入再追加一段，使文件最后一段为 xref 流"""
+    writer = PdfWriter(str(path), incremental=True)
+    writer.add_metadata({'/Title': 'aCRF'})
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+def last_section_is_table(path):
+    data = path.read_bytes()
+    startxref = int(data[data.rindex(b'startxref') + len(b'startxref'):].split()[0])
+    return data[startxref:startxref + 4] == b'xref'
+
+
+def contents_by_page(path):
+    reader = PdfReader(str(path), strict=True)
+    return [[annot.get_object().get('/Contents') for annot in page.get('/Annots', [])]
+            for page in reader.pages]
+
+
+@pytest.mark.parametrize('xref_stream', [False, True], ids=['xref-table', 'xref-stream'])
+def test_incremental_update_rereads_strict(tmp_path, caplog, xref_stream):
+    """替换 AE 的注解后：DM 注解保留，AE 注解为新内容，严格模式读取没有任何警告"""
+    output = annotated_pdf(tmp_path)
+    if xref_stream:
+        with_xref_stream(output)
+    assert last_section_is_table(output) is not xref_stream
+    original = output.read_bytes()
+
+    new_rects = {'1': [{'rect': [60, 600, 160, 620], 'text': 'AEDECOD', 'form_name': 'AE'}]}
+    with caplog.at_level(logging.WARNING, logger='pypdf'):
+        result = update_form_annotations(str(output), new_rects, ['AE'], page_numbers=[2])
+        pages = contents_by_page(output)
+
+    assert output.read_bytes().startswith(original)
+    assert last_section_is_table(output) is not xref_stream
+    assert result['removed_annotations'] == 2
+    assert result['added_annotations'] == 1
+    assert pages == [['AEDECOD'], ['SEX']]
+    assert caplog.records == []
+
+
+def test_repeated_incremental_updates(tmp_path, caplog):
+    """连续两次增量更新：/Prev 链完整，最后一次的注解生效"""
+    output = annotated_pdf(tmp_path)
+    update_form_annotations(str(output), {'2': [{'rect': [60, 600, 160, 620], 'text': 'AGE', 'form_name': 'DM'}]},
+                            ['DM'])
+    with caplog.at_level(logging.WARNING, logger='pypdf'):
+        update_form_annotations(str(output), {'2': [{'rect': [60, 500, 160, 520], 'text': 'RACE',
+                                                     'form_name': 'DM'}]}, ['DM'])
+        pages = contents_by_page(output)
+
+    assert pages == [['AETERM', 'AESEV'], ['RACE']]
+    assert caplog.records == []
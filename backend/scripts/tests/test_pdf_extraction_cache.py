@@ -0,0 +1,104 @@
+"""
+pdf_extraction_cache 测试：缓存键、LRU 淘汰、只缓存成功结果（使用临时目录，不需要真实PDF）
+
+运行：cd backend/scripts && python -m pytest tests
+"""
+
+import json
+import os
+
+from pdf_extraction_cache import ExtractionCache, source_sha256
+
+PDF_BYTES = b'%PDF-1.4\n% test document\n'
+
+
+def entry_names(cache):
+    return sorted(os.listdir(cache.cache_dir))
+
+
+def age(cache, key, seconds_ago):
+    """把条目的 mtime 设为若干秒前（LRU 顺序由 mtime 决定）"""
+    path = os.path.join(cache.cache_dir, f"{key}.json")
+    mtime = os.path.getmtime(path) - seconds_ago
+    os.utime(path, (mtime, mtime))
+
+
+def test_key_depends_on_content_extractor_version_and_options():
+    key = ExtractionCache.make_key('abc', 'process_pdf_simple', '2', {'pages': '1-3', 'text': True})
+
+    assert key == ExtractionCache.make_key('abc', 'process_pdf_simple', '2', {'text': True, 'pages': '1-3'})
+    assert key != ExtractionCache.make_key('abd', 'process_pdf_simple', '2', {'pages': '1-3', 'text': True})
+    assert key != ExtractionCache.make_key('abc', 'extract_words_only', '2', {'pages': '1-3', 'text': True})
+    assert key != ExtractionCache.make_key('abc', 'process_pdf_simple', '3', {'pages': '1-3', 'text': True})
+    assert key != ExtractionCache.make_key('abc', 'process_pdf_simple', '2', {'pages': '1-4', 'text': True})
+    assert key != ExtractionCache.make_key('abc', 'process_pdf_simple', '2', {})
+
+
+def test_file_and_bytes_sources_share_entries(tmp_path):
+    """同一内容的文件路径和内存字节得到同一个哈希"""
+    pdf_path = tmp_path / 'a.pdf'
+    pdf_path.write_bytes(PDF_BYTES)
+
+    assert source_sha256(str(pdf_path)) == source_sha256(PDF_BYTES)
+
+
+def test_lru_eviction_keeps_recently_read_entries(tmp_path):
+    """超出容量时先淘汰最久未使用的条目；读取会刷新条目的位置"""
+    payload = {'success': True, 'text': 'x' * 100}
+    entry_size = len(json.dumps(payload))
+    cache = ExtractionCache(str(tmp_path / 'cache'), max_bytes=3 * entry_size)
+
+    for seconds_ago, key in [(30, 'a'), (20, 'b'), (10, 'c')]:
+        cache.put(key, payload)
+        age(cache, key, seconds_ago)
+    assert cache.get('a') == payload   # a 变为最近使用
+
+    cache.put('d', payload)
+
+    assert entry_names(cache) == ['a.json', 'c.json', 'd.json']
+    assert cache.get('b') is None
+    assert cache.stats()['entries'] == 3
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 1, 1)
+
+
+def test_oversized_result_is_not_stored(tmp_path):
+    cache = ExtractionCache(str(tmp_path / 'cache'), max_bytes=50)
+    cache.put('big', {'success': True, 'text': 'x' * 100})
+
+    assert cache.get('big') is None
+    assert not os.path.exists(cache.cache_dir)
+
+
+def test_cached_computes_once_and_skips_failures(tmp_path):
+    """命中时不再调用 compute；失败结果不写入缓存"""
+    cache = ExtractionCache(str(tmp_path / 'cache'), max_bytes=1024 * 1024)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {'success': True, 'pages': len(calls)}
+
+    first = cache.cached('process_pdf_simple', '2', PDF_BYTES, {}, compute)
+    second = cache.cached('process_pdf_simple', '2', PDF_BYTES, {}, compute)
+    other_options = cache.cached('process_pdf_simple', '2', PDF_BYTES, {'pages': '1'}, compute)
+
+    assert first == second == {'success': True, 'pages': 1}
+    assert other_options == {'success': True, 'pages': 2}
+
+    failure = {'success': False, 'error': 'boom'}
+    cache.cached('extract_words_only', '1', PDF_BYTES, {}, lambda: failure)
+    assert cache.cached('extract_words_only', '1', PDF_BYTES, {}, lambda: {'success': True}) == {'success': True}
+
+
+def test_cached_records_replays_complete_streams_only(tmp_path):
+    """流式记录：成功的 summary 结尾才保存，命中时逐行重放"""
+    cache = ExtractionCache(str(tmp_path / 'cache'), max_bytes=1024 * 1024)
+    records = [{'type': 'page', 'page': 1, 'text': '不良事件'}, {'type': 'summary', 'success': True}]
+
+    assert list(cache.cached_records('iter_pdf_records', '2', PDF_BYTES, {}, lambda: iter(records))) == records
+    assert list(cache.cached_records('iter_pdf_records', '2', PDF_BYTES, {}, lambda: iter([]))) == records
+
+    failed = [{'type': 'page', 'page': 1}, {'type': 'summary', 'success': False}]
+    list(cache.cached_records('iter_pdf_records', '2', PDF_BYTES, {'pages': '1'}, lambda: iter(failed)))
+    stored_key = cache.make_key(source_sha256(PDF_BYTES), 'iter_pdf_records', '2', {})
+    assert entry_names(cache) == [f"{stored_key}.ndjson"]
@@ -0,0 +1,70 @@
+"""
+pdf_processor 页面选择测试：parse_page_range 与 PageSelection（不需要PDF文件）
+
+运行：cd backend/scripts && python -m pytest tests
+"""
+
+import pytest
+
+from pdf_processor import DEFAULT_SELECTION, PageSelection, parse_page_range
+
+
+@pytest.mark.parametrize('spec, expected', [
+    (None, [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]),
+    ('', [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]),
+    ('3', [3]),
+    ('1-5', [1, 2, 3, 4, 5]),
+    (' 2 , 4,9-12,, ', [2, 4, 9, 10]),   # 空白和空段忽略，超出页数的页丢弃
+    ('8-', [8, 9, 10]),                   # 开放结尾
+    ('-3', [1, 2, 3]),                    # 开放开头
+    ('5-3', []),                          # 反向区间为空
+    ('4,2-4,4', [2, 3, 4]),               # 去重并排序
+    ('0,11,99', []),
+    ([7, 1, 7, 0, 11], [1, 7]),           # 页码序列
+    ((), []),
+])
+def test_parse_page_range(spec, expected):
+    assert parse_page_range(spec, 10) == expected
+
+
+def test_parse_page_range_rejects_bad_numbers():
+    """非数字页码抛出 ValueError"""
+    with pytest.raises(ValueError):
+        parse_page_range('1-x', 10)
+
+
+def test_selection_requires_text_or_tables():
+    with pytest.raises(ValueError):
+        PageSelection(text=False, tables=False)
+
+
+def test_default_selection():
+    """默认选择：所有页、完整提取，缓存键与原来的 process_pdf_simple 相同，结果不加额外字段"""
+    assert DEFAULT_SELECTION.is_default
+    assert DEFAULT_SELECTION.page_numbers(10) is None
+    assert DEFAULT_SELECTION.cache_options() == {}
+    assert DEFAULT_SELECTION.summary_fields([1, 2], None) == {}
+    assert PageSelection(table_prefilter=False).cache_options() == {'table_prefilter': False}
+
+
+def test_non_default_selection():
+    selection = PageSelection(pages=(3, 1), tables=False, stop_after='Visit')
+
+    assert not selection.is_default
+    assert selection.page_numbers(2) == [1]
+    assert selection.cache_options() == {'pages': [3, 1], 'text': True, 'tables': False, 'stop_after': 'Visit'}
+    assert selection.summary_fields([1], 1) == {'pages_processed': [1], 'stopped_at_page': 1}
+
+
+def test_stop_after_pattern_and_callable():
+    """stop_after 为正则时检查页面文本和表格单元格；为函数时不可缓存"""
+    page = {'text': 'Demographics', 'tables': [{'data': [['Form', 'Adverse Events']]}]}
+
+    assert PageSelection(stop_after=r'Adverse\s+Events').should_stop(page)
+    assert PageSelection(stop_after='Demo').should_stop(page)
+    assert not PageSelection(stop_after='Vital Signs').should_stop(page)
+    assert not PageSelection().should_stop(page)
+
+    by_function = PageSelection(stop_after=lambda content: 'Demo' in content['text'])
+    assert by_function.should_stop(page)
+    assert by_function.cache_options() is None
@@ -0,0 +1,63 @@
+"""
+reference_snapshot 快照往返测试：写入后读出的内容与写入前相同
+
+运行：cd backend/scripts && python -m pytest tests
+"""
+
+from reference_snapshot import (TERMINOLOGY_DATASET, TS_DATASET, TERMINOLOGY_ITEM_FIELDS,
+                                TerminologySnapshotBuilder, iter_terminology_documents, open_snapshot,
+                                snapshot_path, ts_snapshot_document, write_ts_snapshot)
+
+from terminology_fixtures import FILE_INFO, NY, PHASE, SEX, release
+
+# 快照只保存导入文档的这些字段（_id、content_hash 和检索字段在加载时不需要）
+CODELIST_KEYS = ['code', 'codelist_code', 'name', 'submission_value', 'extensible', 'definition',
+                 'nci_preferred_term']
+ITEM_KEYS = TERMINOLOGY_ITEM_FIELDS + ['synonyms']
+
+
+def snapshot_fields(document):
+    return {
+        'File_Name': document['File_Name'],
+        'File_Function': document['File_Function'],
+        'version': document['version'],
+        'codelist': {key: document['codelist'][key] for key in CODELIST_KEYS},
+        'items': [{key: item[key] for key in ITEM_KEYS} for item in document['items']],
+        'last_updated': document['last_updated']
+    }
+
+
+def test_terminology_snapshot_round_trip(tmp_path):
+    """Terminology 快照读出的大类文档与导入的文档相同"""
+    documents = release(NY, PHASE, SEX)
+    builder = TerminologySnapshotBuilder()
+    list(builder.track(documents))
+    builder.write(snapshot_path(TERMINOLOGY_DATASET, FILE_INFO['version'], str(tmp_path)))
+
+    with open_snapshot(TERMINOLOGY_DATASET, directory=str(tmp_path)) as snapshot:
+        assert snapshot.version == FILE_INFO['version']
+        restored = list(iter_terminology_documents(snapshot))
+
+    assert restored == [snapshot_fields(document) for document in documents]
+
+
+def test_ts_snapshot_round_trip(tmp_path):
+    """TS 快照读出的 columns / data 与写入的相同（数字、None、中文保持原样）"""
+    columns = ['TSPARMCD', 'TSPARM', 'Order', 'Note']
+    records = [
+        {'TSPARMCD': 'ADDON', 'TSPARM': 'Added on to Existing Treatments', 'Order': 1, 'Note': None},
+        {'TSPARMCD': 'AGEMAX', 'TSPARM': 'Planned Maximum Age of Subjects', 'Order': 2.5, 'Note': '最大年龄'},
+        {'TSPARMCD': '', 'TSPARM': None, 'Order': None, 'Note': ''}
+    ]
+    version = 'sha-0123456789ab'
+    write_ts_snapshot(snapshot_path(TS_DATASET, version, str(tmp_path)), version, columns, records,
+                      {'file_name': 'TS.xlsx'})
+
+    with open_snapshot(TS_DATASET, version, str(tmp_path)) as snapshot:
+        document = ts_snapshot_document(snapshot)
+
+    assert document['columns'] == columns
+    assert document['data'] == records
+    assert document['total_rows'] == len(records)
+    assert document['version'] == version
+    assert document['file_name'] == 'TS.xlsx'
@@ -0,0 +1,28 @@
+"""
+import_sdtm_terminology 流式分块解析测试：块大小不影响解析结果
+
+运行：cd backend/scripts && python -m pytest tests
+"""
+
+import pytest
+
+from import_sdtm_terminology import iter_codelist_documents_from_chunks
+from terminology_fixtures import FILE_INFO, NY, PHASE, SEX, terminology_frame
+
+
+def without_ids(documents):
+    return [{key: value for key, value in document.items() if key != '_id'} for document in documents]
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 2, 3, 1000])
+def test_chunk_size_does_not_change_documents(chunk_rows):
+    """按块解析（大类跨块）与整表解析得到相同的文档"""
+    frame = terminology_frame([NY, PHASE, SEX])
+    chunks = [frame.iloc[start:start + chunk_rows].reset_index(drop=True)
+              for start in range(0, len(frame), chunk_rows)]
+
+    whole = list(iter_codelist_documents_from_chunks([frame], FILE_INFO))
+    chunked = list(iter_codelist_documents_from_chunks(chunks, FILE_INFO))
+
+    assert len(whole) == 3
+    assert without_ids(chunked) == without_ids(whole)
@@ -73,6 +73,12 @@ app.get('/api/test', (req, res) => {
   });
   });
 
+// PDF worker 池状态（并发、各优先级队列深度、任务计数）
+app.get('/api/pdf-workers/stats', (req, res) => {
+  const { pdfWorkerPool } = require('./services/pdfWorkerPool');
+  res.json({ success: true, data: pdfWorkerPool.stats() });
+});
+
 // 挂载业务路由（上传、分析、项目选择等）
 try {
   const documentRoutes = require('./routes/documentRoutes');
@@ -613,8 +613,24 @@ function addRectToPage(allRectsByPage, rectData) {
   allRectsByPage[page_number].push(rectData);
 }
 
+/**
+ * 获取Form可能绘制注解的所有页面（标题页 + Label/OID所在页）
+ * 增量重绘时用于定位该Form已有的旧注解
+ * @param {Object} form - Form对象
+ * @returns {Array<number>} 页码数组（升序）
+ */
+function getFormAnnotationPages(form) {
+  const pages = new Set(extractFormPages(form));
+  [...(form.LabelForm || []), ...(form.OIDForm || [])].forEach(item => {
+    const pageNumber = item?.content?.page_number;
+    if (typeof pageNumber === 'number') pages.add(pageNumber);
+  });
+  return [...pages].sort((a, b) => a - b);
+}
+
 module.exports = {
   generateAnnotationRects,
+  getFormAnnotationPages,
   /**
    * 为指定的Form子集生成标注矩形（支持跨批次颜色状态传递）
    * @param {Object} studyData - Study数据（包含crfFormList与页面尺寸）
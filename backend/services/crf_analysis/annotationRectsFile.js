@@ -0,0 +1,129 @@
+/**
+ * Annotation Rects File - Compact binary transport for annotation rectangles
+ * Purpose: Hand large rect sets to pdf_annotate through a temp file
+ *          (read with mmap on the Python side) instead of one huge JSON request
+ * Author: LLX Solutions
+ *
+ * Layout (little-endian) must match backend/services/pdf_annotation_rects.py:
+ *   header  24 bytes  'CRFR', u16 version, u16 reserved,
+ *                     u32 recordCount, u32 colorCount, u32 stringCount, u32 batchCount
+ *   records 48 bytes  u16 batch, u16 page, f64 x0, f64 y0, f64 x1, f64 y1,
+ *                     i32 color index (-1 = none), u32 text id, u32 form id (0xFFFFFFFF = none)
+ *   colors  24 bytes  f64 r, f64 g, f64 b
+ *   strings           u32 byte length + UTF-8 bytes (texts and form names, interned)
+ */
+
+const fs = require('fs');
+const path = require('path');
+
+const MAGIC = 'CRFR';
+const VERSION = 1;
+const HEADER_SIZE = 24;
+const RECORD_SIZE = 48;
+const COLOR_SIZE = 24;
+const NO_FORM = 0xFFFFFFFF;
+const TEMP_DIR = path.join(__dirname, '../../temp');
+
+/**
+ * Encode an ordered list of rectsByPage batches
+ * @param {Array<Object>} batches - [{ [pageNumber]: [rect, ...] }, ...]
+ * @returns {Buffer} Binary rects payload
+ */
+function encodeRectBatches(batches) {
+  const strings = new Map();
+  const colors = new Map();
+  const intern = (table, key) => {
+    if (!table.has(key)) table.set(key, table.size);
+    return table.get(key);
+  };
+
+  const records = [];
+  batches.forEach((rectsByPage, batchIndex) => {
+    Object.entries(rectsByPage || {}).forEach(([pageKey, rects]) => {
+      (rects || []).forEach(rect => {
+        const color = Array.isArray(rect.background_color) && rect.background_color.length === 3
+          ? rect.background_color
+          : null;
+        records.push({
+          batchIndex,
+          page: parseInt(pageKey, 10),
+          rect: rect.rect,
+          colorId: color ? intern(colors, color.join(',')) : -1,
+          colorValue: color,
+          textId: intern(strings, rect.text || ''),
+          formId: rect.form_name ? intern(strings, rect.form_name) : NO_FORM
+        });
+      });
+    });
+  });
+
+  const encodedStrings = [...strings.keys()].map(value => Buffer.from(value, 'utf8'));
+  const stringBytes = encodedStrings.reduce((sum, buf) => sum + 4 + buf.length, 0);
+  const buffer = Buffer.alloc(HEADER_SIZE + records.length * RECORD_SIZE + colors.size * COLOR_SIZE + stringBytes);
+
+  buffer.write(MAGIC, 0, 'ascii');
+  buffer.writeUInt16LE(VERSION, 4);
+  buffer.writeUInt16LE(0, 6);
+  buffer.writeUInt32LE(records.length, 8);
+  buffer.writeUInt32LE(colors.size, 12);
+  buffer.writeUInt32LE(strings.size, 16);
+  buffer.writeUInt32LE(batches.length, 20);
+
+  let offset = HEADER_SIZE;
+  const colorValues = new Array(colors.size);
+  records.forEach(record => {
+    buffer.writeUInt16LE(record.batchIndex, offset);
+    buffer.writeUInt16LE(record.page, offset + 2);
+    for (let i = 0; i < 4; i++) buffer.writeDoubleLE(record.rect[i], offset + 4 + i * 8);
+    buffer.writeInt32LE(record.colorId, offset + 36);
+    buffer.writeUInt32LE(record.textId, offset + 40);
+    buffer.writeUInt32LE(record.formId, offset + 44);
+    if (record.colorId >= 0) colorValues[record.colorId] = record.colorValue;
+    offset += RECORD_SIZE;
+  });
+
+  colorValues.forEach(color => {
+    for (let i = 0; i < 3; i++) buffer.writeDoubleLE(color[i], offset + i * 8);
+    offset += COLOR_SIZE;
+  });
+
+  encodedStrings.forEach(buf => {
+    buffer.writeUInt32LE(buf.length, offset);
+    buf.copy(buffer, offset + 4);
+    offset += 4 + buf.length;
+  });
+
+  return buffer;
+}
+
+/**
+ * Write batches to a temp binary rects file for pdf_annotate
+ * @param {Array<Object>} batches - Ordered rectsByPage batches
+ * @returns {string} Temp file path (remove with removeRectsFile)
+ */
+function writeRectsFile(batches) {
+  if (!fs.existsSync(TEMP_DIR)) {
+    fs.mkdirSync(TEMP_DIR, { recursive: true });
+  }
+  const filePath = path.join(TEMP_DIR, `temp_rects_${Date.now()}_${Math.random().toString(36).substr(2, 6)}.bin`);
+  fs.writeFileSync(filePath, encodeRectBatches(batches));
+  return filePath;
+}
+
+/**
+ * Remove a temp rects file (ignores missing files)
+ * @param {string} filePath - Path returned by writeRectsFile
+ */
+function removeRectsFile(filePath) {
+  try {
+    if (filePath && fs.existsSync(filePath)) fs.unlinkSync(filePath);
+  } catch (error) {
+    console.warn('⚠️ Failed to clean up temp rects file:', error.message);
+  }
+}
+
+module.exports = {
+  encodeRectBatches,
+  writeRectsFile,
+  removeRectsFile
+};
@@ -5,105 +5,458 @@ Purpose: Simplified extraction of word positions without form/table processing
 Author: LLX Solutions
 """
 
-import pdfplumber
-import json
 import sys
 import os
-from typing import Dict, Any, List
+import argparse
+import base64
+from array import array
+from typing import Dict, Any, Iterator, List, Optional
 import datetime
+import time
 
-def extract_words_only(file_path: str, study_id: str = None) -> Dict[str, Any]:
+# Shared PDF helpers live one level up in services/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pdf_source import PdfSource, STDIN_PATH, open_pdf, resolve_cli_source
+from pdf_page_parallel import effective_workers, iter_numbered_pages, iter_page_results
+from pdf_extraction_cache import get_extraction_cache
+from pdf_metrics import (page_metrics, build_metrics_block, dumps_with_metrics, iter_ndjson_lines, profiled,
+                         reset_peak_rss, peak_rss_fields)
+
+# Bump whenever the word payload or extraction logic changes (invalidates cached results)
+WORDS_EXTRACTOR_VERSION = '1'
+
+# Page word payload formats: one dict per word, or the compact columnar layout
+WORD_FORMATS = ('records', 'columnar')
+# Coordinate columns packed (in this order) into a columnar page's 'coords' buffer
+COLUMNAR_COORDS = ('x0', 'y0', 'x1', 'y1', 'size')
+
+def _build_columnar_page(words: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Pack pdfplumber words into the columnar payload
+    
+    'coords' is base64 of little-endian float32 values, column by column
+    (all x0, then all y0, x1, y1, size); width/height are left to the reader
+    (x1 - x0, y1 - y0). Word texts and font names are interned per page, so
+    'text'/'font' hold indexes into 'strings'/'fonts'.
+    """
+    strings: Dict[str, int] = {}
+    fonts: Dict[str, int] = {}
+    text_ids = []
+    font_ids = []
+    columns = {name: array('f') for name in COLUMNAR_COORDS}
+    for word in words:
+        text_ids.append(strings.setdefault(word.get('text', ''), len(strings)))
+        font_ids.append(fonts.setdefault(word.get('fontname', ''), len(fonts)))
+        columns['x0'].append(word.get('x0', 0))
+        columns['y0'].append(word.get('top', 0))
+        columns['x1'].append(word.get('x1', 0))
+        columns['y1'].append(word.get('bottom', 0))
+        columns['size'].append(word.get('size', 0))
+    
+    packed = array('f')
+    for name in COLUMNAR_COORDS:
+        packed.extend(columns[name])
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    
+    return {
+        'format': 'columnar',
+        'word_count': len(text_ids),
+        'strings': list(strings),
+        'text': text_ids,
+        'fonts': list(fonts),
+        'font': font_ids,
+        'coords': base64.b64encode(packed.tobytes()).decode('ascii')
+    }
+
+def group_words_into_rows(words: List[Dict[str, Any]], y_tolerance: float) -> List[Dict[str, Any]]:
+    """
+    Cluster pdfplumber words into rows by their top Y coordinate
+    
+    Words are sorted once by (top, x0) and swept in that order: a word joins the
+    current row while it is within y_tolerance of the row's mean top, otherwise
+    it starts a new row. Row bounds and the mean are kept as running values, so
+    the sweep is linear; each row's words are then put in x order for full_text.
+    
+    Rows have the fields words_to_rows_processor.groupWordsIntoRows produces,
+    except that 'words' holds indexes into the page's word list (records
+    'words' / columnar arrays) rather than the word objects themselves.
+    
+    Args:
+        words: pdfplumber extract_words() output for one page
+        y_tolerance: Maximum distance (pt) between a word's top and the row's mean top
+        
+    Returns:
+        Row dictionaries in top-to-bottom order
+    """
+    tops = [float(word.get('top', 0)) for word in words]
+    bottoms = [float(word.get('bottom', 0)) for word in words]
+    lefts = [float(word.get('x0', 0)) for word in words]
+    rights = [float(word.get('x1', 0)) for word in words]
+    order = sorted(range(len(words)), key=lambda i: (tops[i], lefts[i]))
+    
+    # Each row: [member indexes, sum of tops, x_min, x_max, y_min, y_max]
+    rows = []
+    current = None
+    for index in order:
+        top = tops[index]
+        if current is not None and abs(top - current[1] / len(current[0])) <= y_tolerance:
+            current[0].append(index)
+            current[1] += top
+            if lefts[index] < current[2]:
+                current[2] = lefts[index]
+            if rights[index] > current[3]:
+                current[3] = rights[index]
+            if bottoms[index] > current[5]:
+                current[5] = bottoms[index]
+        else:
+            # Tops arrive in ascending order, so a row's y_min is its first top
+            current = [[index], top, lefts[index], rights[index], top, bottoms[index]]
+            rows.append(current)
+    
+    result = []
+    for row_index, (members, top_sum, x_min, x_max, y_min, y_max) in enumerate(rows, 1):
+        members.sort(key=lefts.__getitem__)
+        result.append({
+            'row_index': row_index,
+            'y_center': top_sum / len(members),
+            'x_min': x_min,
+            'x_max': x_max,
+            'y_min': y_min,
+            'y_max': y_max,
+            'width': x_max - x_min,
+            'height': y_max - y_min,
+            'word_count': len(members),
+            'words': members,
+            'full_text': ' '.join(words[i].get('text', '') for i in members)
+        })
+    return result
+
+def word_payload_cache_options(word_format: str, row_tolerance: Optional[float] = None) -> Dict[str, Any]:
+    """Cache key options for a word payload (empty for the default, so existing entries stay valid)"""
+    options: Dict[str, Any] = {}
+    if word_format != 'records':
+        options['word_format'] = word_format
+    if row_tolerance is not None:
+        options['row_tolerance'] = row_tolerance
+    return options
+
+def page_word_count(page_data: Dict[str, Any]) -> int:
+    """Number of words in a page payload of either format"""
+    if page_data.get('format') == 'columnar':
+        return page_data['word_count']
+    return len(page_data['words'])
+
+def build_page_words(page, page_number: int, word_format: str = 'records',
+                     row_tolerance: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Build the word-position payload for a single pdfplumber page
+    
+    Args:
+        page: pdfplumber Page object
+        page_number: 1-based page number
+        word_format: 'records' (a 'words' list of dicts) or 'columnar'
+            (see _build_columnar_page; coordinates are float32)
+        row_tolerance: Also group the words into 'rows' with this Y tolerance
+            (see group_words_into_rows)
+        
+    Returns:
+        Dictionary with page size and word boxes
+    """
+    # Extract words from current page
+    words = page.extract_words()
+    
+    # Create page data structure
+    page_data = {
+        'page_number': page_number,
+        'page_width': float(page.width),
+        'page_height': float(page.height)
+    }
+    
+    if word_format == 'columnar':
+        page_data.update(_build_columnar_page(words))
+    else:
+        # Process word data
+        page_words = []
+        for word in words:
+            word_data = {
+                'text': word.get('text', ''),
+                'x0': float(word.get('x0', 0)),
+                'y0': float(word.get('top', 0)),        # 使用 'top' 作为上边界
+                'x1': float(word.get('x1', 0)),
+                'y1': float(word.get('bottom', 0)),     # 使用 'bottom' 作为下边界
+                'width': float(word.get('x1', 0) - word.get('x0', 0)),
+                'height': float(word.get('bottom', 0) - word.get('top', 0)),
+                'fontname': word.get('fontname', ''),
+                'size': float(word.get('size', 0))
+            }
+            page_words.append(word_data)
+        page_data['words'] = page_words
+    
+    if row_tolerance is not None:
+        page_data['rows'] = group_words_into_rows(words, row_tolerance)
+    
+    return page_data
+
+def build_words_result(all_pages_words: List[Dict[str, Any]],
+                       row_tolerance: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Wrap per-page word payloads into the extractor result structure
+    ('y_tolerance' records the row grouping tolerance when pages carry 'rows')
+    """
+    result = {
+        'success': True,
+        'extraction_time': datetime.datetime.now().isoformat(),
+        'pages': all_pages_words,
+        'metadata': {
+            'total_pages': len(all_pages_words),
+            'total_words': sum(page_word_count(p) for p in all_pages_words)
+        }
+    }
+    if row_tolerance is not None:
+        result['y_tolerance'] = row_tolerance
+    return result
+
+def empty_words_result() -> Dict[str, Any]:
+    """Result structure returned when word extraction fails"""
+    return {
+        'success': False,
+        'extraction_time': datetime.datetime.now().isoformat(),
+        'pages': [],
+        'metadata': {
+            'total_pages': 0,
+            'total_words': 0
+        }
+    }
+
+def _check_word_format(word_format: str):
+    if word_format not in WORD_FORMATS:
+        raise ValueError(f"Unknown word format '{word_format}' (expected one of {', '.join(WORD_FORMATS)})")
+
+def _extract_words_page(page, page_number: int, total_pages: int, collect_metrics: bool = False,
+                        word_format: str = 'records', row_tolerance: Optional[float] = None) -> Dict[str, Any]:
+    """Extract one page's words with progress logging (page 'metrics' attached when collect_metrics is set)"""
+    print(f"🔍 Processing page {page_number}/{total_pages}", file=sys.stderr)
+    metrics = page_metrics(page_number, collect_metrics)
+    metrics.count_layout(page)
+    with metrics.phase('words'):
+        page_data = build_page_words(page, page_number, word_format, row_tolerance)
+    word_count = page_word_count(page_data)
+    print(f"✅ Page {page_number}: extracted {word_count} words", file=sys.stderr)
+    if collect_metrics:
+        metrics.count('words', word_count)
+        page_data['metrics'] = metrics.to_dict()
+    return page_data
+
+def _extract_words_range(file_path: PdfSource, start: int, end: int, collect_metrics: bool = False,
+                         word_format: str = 'records',
+                         row_tolerance: Optional[float] = None,
+                         low_memory: bool = False) -> List[Dict[str, Any]]:
+    """Process-pool entry: open the PDF independently and extract pages [start, end)"""
+    with open_pdf(file_path) as pdf:
+        total_pages = len(pdf.pages)
+        return [_extract_words_page(page, page_number, total_pages, collect_metrics, word_format, row_tolerance)
+                for page_number, page in iter_numbered_pages(pdf, range(start + 1, end + 1), release=low_memory)]
+
+def _iter_words_pages(pdf, file_path: PdfSource, workers: int, collect_metrics: bool,
+                      word_format: str = 'records',
+                      row_tolerance: Optional[float] = None,
+                      low_memory: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Yield page word payloads in page order, serially or from the process pool
+    (with low_memory, each page is closed once its payload has been taken)
+    """
+    page_count = len(pdf.pages)
+    workers = effective_workers(workers, page_count)
+    if workers > 1:
+        yield from iter_page_results(_extract_words_range, file_path, page_count, workers,
+                                     collect_metrics, word_format, row_tolerance, low_memory)
+    else:
+        for page_number, page in iter_numbered_pages(pdf, range(1, page_count + 1), release=low_memory):
+            yield _extract_words_page(page, page_number, page_count, collect_metrics, word_format, row_tolerance)
+
+def iter_words_records(file_path: PdfSource, workers: int = 1, use_cache: bool = False,
+                       metrics: bool = False, word_format: str = 'records',
+                       row_tolerance: Optional[float] = None, low_memory: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming variant of extract_words_only: yield one record per page as soon as
+    it is extracted, then a final summary record
+    
+    Page records: {'type': 'page', 'page_number', 'page_width', 'page_height', 'words'}
+        (columnar fields instead of 'words' when word_format is 'columnar',
+        plus 'rows' when row_tolerance is set)
+    Summary record: {'type': 'summary', 'success', 'extraction_time', 'metadata'
+                     [, 'y_tolerance', 'metrics', 'peak_rss_mb', 'pool_peak_rss_mb']}
+        Page records already emitted must be discarded if success is False.
+    
+    Args:
+        file_path: Path to the PDF file, or the PDF bytes
+        workers: Number of processes to split the page range across
+        use_cache: Replay/store the record stream through the extraction cache
+            (ignored when metrics is set)
+        metrics: Collect per-page timings and object counts into the summary
+        word_format: Page payload format, 'records' or 'columnar' (see build_page_words)
+        row_tolerance: Also group each page's words into 'rows' (see group_words_into_rows)
+        low_memory: Close each page once its record is built and report the
+            extraction's peak RSS as summary 'peak_rss_mb'
+        
+    Yields:
+        NDJSON-ready record dictionaries
+    """
+    _check_word_format(word_format)
+    if low_memory:
+        reset_peak_rss()
+    if use_cache and not metrics:
+        records = get_extraction_cache().cached_records(
+            'extract_words_only', WORDS_EXTRACTOR_VERSION, file_path,
+            {'stream': True, **word_payload_cache_options(word_format, row_tolerance)},
+            lambda: iter_words_records(file_path, workers=workers, word_format=word_format,
+                                       row_tolerance=row_tolerance, low_memory=low_memory)
+        )
+        for record in records:
+            if low_memory and record.get('type') == 'summary':
+                # A replayed summary carries the peak of the run that stored it
+                record.pop('pool_peak_rss_mb', None)
+                record.update(peak_rss_fields())
+            yield record
+        return
+    
+    total_pages = 0
+    total_words = 0
+    pages_metrics = []
+    start_time = time.perf_counter()
+    try:
+        with open_pdf(file_path) as pdf:
+            for page_data in _iter_words_pages(pdf, file_path, workers, metrics, word_format, row_tolerance,
+                                               low_memory):
+                if metrics:
+                    pages_metrics.append(page_data.pop('metrics'))
+                total_pages += 1
+                total_words += page_word_count(page_data)
+                yield {'type': 'page', **page_data}
+        
+        summary = build_words_result([], row_tolerance)
+        summary['metadata'] = {'total_pages': total_pages, 'total_words': total_words}
+        print(f"🎉 Extraction completed: {total_words} words from {total_pages} pages", file=sys.stderr)
+        
+    except Exception as e:
+        print(f"❌ Error extracting words: {str(e)}", file=sys.stderr)
+        summary = empty_words_result()
+    
+    summary.pop('pages')
+    if metrics:
+        summary['metrics'] = build_metrics_block(pages_metrics, time.perf_counter() - start_time)
+    if low_memory:
+        summary.update(peak_rss_fields())
+    yield {'type': 'summary', **summary}
+
+def extract_words_only(file_path: PdfSource, study_id: str = None, workers: int = 1,
+                       use_cache: bool = False, metrics: bool = False,
+                       profile_path: str = None, word_format: str = 'records',
+                       row_tolerance: Optional[float] = None, low_memory: bool = False) -> Dict[str, Any]:
     """
     Extract only word positions from CRF PDF file
     
     Args:
-        file_path: Path to the PDF file
+        file_path: Path to the PDF file, or the PDF bytes
         study_id: Optional study ID for metadata
+        workers: Number of processes to split the page range across
+            (1 = serial; page payloads are identical either way)
+        use_cache: Return a stored result for an identical file (by SHA-256)
+            and store new results (ignored when metrics or profile_path is set)
+        metrics: Add a 'metrics' block with per-page timings and object counts
+        profile_path: Dump cProfile stats for the extraction to this file
+        word_format: Page payload format, 'records' (one dict per word) or
+            'columnar' (packed float32 coordinates plus interned strings/fonts)
+        row_tolerance: Also group each page's words into 'rows' with this
+            Y tolerance (pt), sparing the caller the row grouping pass
+        low_memory: Close each page once its payload is built, so parsed layout
+            objects do not pile up across long documents, and report the
+            extraction's peak RSS as 'peak_rss_mb'
         
     Returns:
         Dictionary containing word extraction results
     """
+    _check_word_format(word_format)
+    if low_memory:
+        reset_peak_rss()
+    if profile_path:
+        with profiled(profile_path):
+            return extract_words_only(file_path, study_id, workers=workers, metrics=metrics,
+                                      word_format=word_format, row_tolerance=row_tolerance,
+                                      low_memory=low_memory)
+    
+    if use_cache and not metrics:
+        result = get_extraction_cache().cached(
+            'extract_words_only', WORDS_EXTRACTOR_VERSION, file_path,
+            word_payload_cache_options(word_format, row_tolerance),
+            lambda: extract_words_only(file_path, study_id, workers=workers, word_format=word_format,
+                                       row_tolerance=row_tolerance, low_memory=low_memory)
+        )
+        if low_memory:
+            # A replayed result carries the peak of the run that stored it
+            result.pop('pool_peak_rss_mb', None)
+            result.update(peak_rss_fields())
+        return result
+    
+    start_time = time.perf_counter()
     try:
-        all_pages_words = []
-        total_words = 0
-        
-        with pdfplumber.open(file_path) as pdf:
-            for page_number, page in enumerate(pdf.pages, 1):
-                print(f"🔍 Processing page {page_number}/{len(pdf.pages)}", file=sys.stderr)
-                
-                # Extract words from current page
-                words = page.extract_words()
-                
-                # Process word data
-                page_words = []
-                for word in words:
-                    word_data = {
-                        'text': word.get('text', ''),
-                        'x0': float(word.get('x0', 0)),
-                        'y0': float(word.get('top', 0)),        # 使用 'top' 作为上边界
-                        'x1': float(word.get('x1', 0)),
-                        'y1': float(word.get('bottom', 0)),     # 使用 'bottom' 作为下边界
-                        'width': float(word.get('x1', 0) - word.get('x0', 0)),
-                        'height': float(word.get('bottom', 0) - word.get('top', 0)),
-                        'fontname': word.get('fontname', ''),
-                        'size': float(word.get('size', 0))
-                    }
-                    page_words.append(word_data)
-                
-                # Create page data structure
-                page_data = {
-                    'page_number': page_number,
-                    'page_width': float(page.width),
-                    'page_height': float(page.height),
-                    'words': page_words
-                }
-                
-                all_pages_words.append(page_data)
-                total_words += len(page_words)
-                
-                print(f"✅ Page {page_number}: extracted {len(page_words)} words", file=sys.stderr)
+        with open_pdf(file_path) as pdf:
+            all_pages_words = list(_iter_words_pages(pdf, file_path, workers, metrics, word_format,
+                                                     row_tolerance, low_memory))
+        pages_metrics = [page_data.pop('metrics') for page_data in all_pages_words] if metrics else []
         
         # Create final result structure
-        result = {
-            'success': True,
-            'extraction_time': datetime.datetime.now().isoformat(),
-            'pages': all_pages_words,
-            'metadata': {
-                'total_pages': len(all_pages_words),
-                'total_words': total_words
-            }
-        }
-        
-        print(f"🎉 Extraction completed: {total_words} words from {len(all_pages_words)} pages", file=sys.stderr)
+        result = build_words_result(all_pages_words, row_tolerance)
+        if metrics:
+            result['metrics'] = build_metrics_block(pages_metrics, time.perf_counter() - start_time)
         
-        return result
+        print(f"🎉 Extraction completed: {result['metadata']['total_words']} words from {len(all_pages_words)} pages", file=sys.stderr)
         
     except Exception as e:
         error_msg = f"Error extracting words: {str(e)}"
         print(f"❌ {error_msg}", file=sys.stderr)
         
-        return {
-            'success': False,
-            'extraction_time': datetime.datetime.now().isoformat(),
-            'pages': [],
-            'metadata': {
-                'total_pages': 0,
-                'total_words': 0
-            }
-        }
+        result = empty_words_result()
+    
+    if low_memory:
+        result.update(peak_rss_fields())
+    return result
 
 def main():
     """Main function to run the word extraction"""
+    parser = argparse.ArgumentParser(description='Extract word positions from a CRF PDF')
+    parser.add_argument('pdf_file_path', help='PDF file path ("-" reads the PDF bytes from stdin)')
+    parser.add_argument('output_dir', help='Output directory')
+    parser.add_argument('study_id', nargs='?', default=None, help='Optional study ID')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of processes to split the page range across (default: 1)')
+    parser.add_argument('--cache', action='store_true',
+                        help='Use the on-disk extraction cache (keyed by file SHA-256)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Write one NDJSON record per page as it completes, then a summary record')
+    parser.add_argument('--metrics', action='store_true',
+                        help='Add per-page timings and object counts as a "metrics" block')
+    parser.add_argument('--profile', metavar='PSTATS_PATH',
+                        help='Dump cProfile stats for the extraction to this file')
+    parser.add_argument('--format', dest='word_format', choices=WORD_FORMATS, default='records',
+                        help='Page word payload: one dict per word (default) or compact columnar arrays')
+    parser.add_argument('--rows', dest='row_tolerance', type=float, metavar='Y_TOLERANCE',
+                        help='Also group each page\'s words into rows with this Y tolerance (pt)')
+    parser.add_argument('--low-memory', action='store_true',
+                        help='Close each page once extracted and report the peak RSS as "peak_rss_mb"')
+    
     if len(sys.argv) < 3:
-        print("Usage: python3 crf_words_extractor.py <pdf_file_path> <output_dir> [study_id]", file=sys.stderr)
+        print("Usage: python3 crf_words_extractor.py <pdf_file_path> <output_dir> [study_id] [--workers N] [--cache] [--stream] [--metrics] [--profile PATH] [--format records|columnar] [--rows Y_TOLERANCE] [--low-memory]", file=sys.stderr)
         sys.exit(1)
     
-    pdf_file_path = sys.argv[1]
-    output_dir = sys.argv[2]
-    study_id = sys.argv[3] if len(sys.argv) > 3 else None
+    args = parser.parse_args()
+    pdf_file_path = args.pdf_file_path
+    output_dir = args.output_dir
+    study_id = args.study_id
     
     # Validate input file
-    if not os.path.exists(pdf_file_path):
+    if pdf_file_path != STDIN_PATH and not os.path.exists(pdf_file_path):
         print(f"❌ Error: PDF file not found: {pdf_file_path}", file=sys.stderr)
         sys.exit(1)
     
@@ -115,11 +468,25 @@ def main():
     print(f"📄 Input file: {pdf_file_path}", file=sys.stderr)
     print(f"📁 Output directory: {output_dir}", file=sys.stderr)
     
+    source = resolve_cli_source(pdf_file_path)
+    
+    if args.stream:
+        with profiled(args.profile):
+            records = iter_words_records(source, workers=args.workers, use_cache=args.cache,
+                                         metrics=args.metrics, word_format=args.word_format,
+                                         row_tolerance=args.row_tolerance, low_memory=args.low_memory)
+            for line in iter_ndjson_lines(records):
+                print(line, flush=True)
+        return
+    
     # Extract words
-    result = extract_words_only(pdf_file_path, study_id)
+    result = extract_words_only(source, study_id, workers=args.workers, use_cache=args.cache,
+                                metrics=args.metrics, profile_path=args.profile,
+                                word_format=args.word_format, row_tolerance=args.row_tolerance,
+                                low_memory=args.low_memory)
     
     # Output result to stdout for Node.js to capture (no file saving)
-    print(json.dumps(result, ensure_ascii=False))
+    print(dumps_with_metrics(result))
 
 if __name__ == "__main__":
     main()
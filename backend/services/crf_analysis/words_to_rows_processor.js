@@ -4,6 +4,61 @@
  * Author: LLX Solutions
  */
 
+// Coordinate columns packed in a columnar page's 'coords' buffer (must match
+// COLUMNAR_COORDS in crf_words_extractor.py)
+const COLUMNAR_COORDS = ['x0', 'y0', 'x1', 'y1', 'size'];
+
+/**
+ * Decode a columnar page's packed float32 coordinates into one Float32Array per column
+ * @param {Object} page - Columnar page payload
+ * @returns {Object} { x0, y0, x1, y1, size } typed arrays of length word_count
+ */
+function decodeColumnarCoords(page) {
+  const count = page.word_count || 0;
+  const bytes = Buffer.from(page.coords || '', 'base64');
+  if (bytes.length !== count * COLUMNAR_COORDS.length * 4) {
+    throw new Error(`Columnar page ${page.page_number}: expected ${count} words of coordinates, got ${bytes.length} bytes`);
+  }
+  // Float32Array views need 4-byte alignment; small Buffers may sit unaligned in the shared pool
+  const aligned = bytes.byteOffset % 4 === 0
+    ? bytes
+    : Buffer.from(new Uint8Array(bytes));
+  const values = new Float32Array(aligned.buffer, aligned.byteOffset, count * COLUMNAR_COORDS.length);
+  const columns = {};
+  COLUMNAR_COORDS.forEach((name, index) => {
+    columns[name] = values.subarray(index * count, (index + 1) * count);
+  });
+  return columns;
+}
+
+/**
+ * Expand a page payload to word objects in the records shape
+ * ({ text, x0, y0, x1, y1, width, height, fontname, size })
+ * @param {Object} page - Page payload (records pages are returned as-is)
+ * @returns {Array} Word objects
+ */
+function getPageWords(page) {
+  if (!page || page.format !== 'columnar') {
+    return (page && page.words) || [];
+  }
+  const { x0, y0, x1, y1, size } = decodeColumnarCoords(page);
+  const words = new Array(page.word_count);
+  for (let i = 0; i < page.word_count; i++) {
+    words[i] = {
+      text: page.strings[page.text[i]],
+      x0: x0[i],
+      y0: y0[i],
+      x1: x1[i],
+      y1: y1[i],
+      width: x1[i] - x0[i],
+      height: y1[i] - y0[i],
+      fontname: page.fonts[page.font[i]],
+      size: size[i]
+    };
+  }
+  return words;
+}
+
 /**
  * Group words into rows based on Y-coordinate proximity
  * @param {Array} words - Array of word objects with position data
@@ -74,9 +129,21 @@ function groupWordsIntoRows(words, yTolerance = 2.0) {
   return rows;
 }
 
+/**
+ * Resolve rows grouped by crf_words_extractor (row 'words' are indexes into the page words)
+ * @param {Array} rows - Page 'rows' from the extractor
+ * @param {Array} words - The page's word objects (getPageWords)
+ * @returns {Array} Row objects in the groupWordsIntoRows shape
+ */
+function resolveExtractedRows(rows, words) {
+  return rows.map(row => ({ ...row, words: row.words.map(index => words[index]) }));
+}
+
 /**
  * Process words data to extract rows with position information
  * @param {Object} wordsData - Words extraction result from crf_words_extractor
+ *   (pages in the records or columnar format; rows the extractor already grouped
+ *   with the same Y tolerance are reused instead of regrouped)
  * @param {Number} yTolerance - Y-coordinate tolerance for row grouping
  * @returns {Object} Rows extraction result
  */
@@ -95,10 +162,14 @@ function processWordsToRows(wordsData, yTolerance = 2.0) {
     let totalWords = 0;
 
     for (const page of wordsData.pages) {
-      // console.log(`🔄 Processing page ${page.page_number} - ${page.words.length} words`);
+      // Columnar pages are expanded here, one page at a time
+      const words = getPageWords(page);
+      // console.log(`🔄 Processing page ${page.page_number} - ${words.length} words`);
       
-      // Group words into rows for this page
-      const rows = groupWordsIntoRows(page.words, yTolerance);
+      // Group words into rows for this page (unless the extractor already did)
+      const rows = wordsData.y_tolerance === yTolerance && Array.isArray(page.rows)
+        ? resolveExtractedRows(page.rows, words)
+        : groupWordsIntoRows(words, yTolerance);
       
       const pageData = {
         page_number: page.page_number,
@@ -106,14 +177,14 @@ function processWordsToRows(wordsData, yTolerance = 2.0) {
         page_height: page.page_height,
         rows: rows,
         row_count: rows.length,
-        word_count: page.words.length
+        word_count: words.length
       };
       
       processedPages.push(pageData);
       totalRows += rows.length;
-      totalWords += page.words.length;
+      totalWords += words.length;
       
-      // console.log(`✅ Page ${page.page_number}: ${rows.length} rows created from ${page.words.length} words`);
+      // console.log(`✅ Page ${page.page_number}: ${rows.length} rows created from ${words.length} words`);
     }
 
     const result = {
@@ -182,6 +253,7 @@ function analyzeRowDistribution(rowsData) {
 }
 
 module.exports = {
+  getPageWords,
   groupWordsIntoRows,
   processWordsToRows,
   analyzeRowDistribution
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+参考数据本地快照（列式、压缩、可内存映射），按版本存放
+
+功能：
+1. 导入脚本在写入MongoDB的同时为每个版本生成一个快照文件：
+   <快照目录>/<数据集>/<版本>.snap（如 sdtm_terminology/2025-03-28.snap），多个版本并存
+2. 读取端 mmap 打开文件，只解析文件尾部的元数据；列在首次访问时才解压，
+   偏移数组直接映射为 numpy 数组（不复制）
+3. 数据集适配：SDTM Terminology（codelists + items 两张表）、TS Reference（一张表）
+
+文件布局（小端）：
+    b'LLXSNAP1'
+    列数据块（8字节对齐）：字符串列 = 偏移数组（uint32/uint64，不压缩）+ UTF-8 数据（zlib 压缩）
+    元数据 JSON（数据集、版本、各表各列的块位置）
+    uint64 元数据长度
+    b'LLXSNAP1'
+
+列类型：
+- str：字符串（None 存为空字符串）
+- str_list：字符串列表（列表偏移 + 展平后的字符串）
+- json：任意 JSON 值（每个单元格 json.dumps 后按字符串存储，读取时解码）
+- int64：整数
+"""
+
+import os
+import re
+import json
+import mmap
+import zlib
+import struct
+from datetime import datetime
+
+import numpy as np
+
+MAGIC = b'LLXSNAP1'
+FORMAT_VERSION = 1
+# 快照目录：环境变量 REFERENCE_SNAPSHOT_DIR，默认 backend/Resource/reference_snapshots
+DEFAULT_SNAPSHOT_DIR = os.getenv('REFERENCE_SNAPSHOT_DIR') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'Resource', 'reference_snapshots')
+SNAPSHOT_SUFFIX = '.snap'
+# 数据块压缩级别（zlib，1-9）
+COMPRESS_LEVEL = 6
+
+TERMINOLOGY_DATASET = 'sdtm_terminology'
+TS_DATASET = 'ts_reference'
+
+_FOOTER = struct.Struct('<Q8s')
+
+# ===================== 版本与路径 =====================
+
+def snapshot_version(file_name, content_hash=None):
+    """
+    快照版本：文件名中的8位日期（与导入脚本的 parse_version_from_filename 相同，格式 YYYY-MM-DD）；
+    文件名不含日期时用内容哈希前12位，避免同一内容每天生成新版本
+    """
+    match = re.search(r'(\d{8})', file_name or '')
+    if match:
+        date_str = match.group(1)
+        return f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:]}"
+    if content_hash:
+        return f"sha-{content_hash[:12]}"
+    return datetime.now().strftime('%Y-%m-%d')
+
+def snapshot_path(dataset, version, directory=None):
+    """某数据集某版本的快照文件路径"""
+    return os.path.join(directory or DEFAULT_SNAPSHOT_DIR, dataset, f'{version}{SNAPSHOT_SUFFIX}')
+
+def read_snapshot_header(path):
+    """只读取快照文件尾部的元数据（不映射整个文件），文件无效时返回None"""
+    try:
+        with open(path, 'rb') as handle:
+            handle.seek(0, os.SEEK_END)
+            size = handle.tell()
+            if size < len(MAGIC) + _FOOTER.size:
+                return None
+            handle.seek(size - _FOOTER.size)
+            footer_length, magic = _FOOTER.unpack(handle.read(_FOOTER.size))
+            if magic != MAGIC or footer_length > size - _FOOTER.size - len(MAGIC):
+                return None
+            handle.seek(size - _FOOTER.size - footer_length)
+            return json.loads(handle.read(footer_length))
+    except (OSError, ValueError):
+        return None
+
+def list_snapshot_versions(dataset, directory=None):
+    """
+    本地已有的有效版本，按生成时间升序（元数据 created_at，相同时按文件修改时间）
+
+    版本名不一定可排序（TS 文件名不含日期时为 sha-<内容哈希>），因此不按名称排序
+    """
+    folder = os.path.join(directory or DEFAULT_SNAPSHOT_DIR, dataset)
+    if not os.path.isdir(folder):
+        return []
+    entries = []
+    for name in os.listdir(folder):
+        if not name.endswith(SNAPSHOT_SUFFIX):
+            continue
+        path = os.path.join(folder, name)
+        header = read_snapshot_header(path)
+        if header is None:
+            continue
+        entries.append((header.get('created_at', ''), os.path.getmtime(path), name[:-len(SNAPSHOT_SUFFIX)]))
+    return [version for _, _, version in sorted(entries)]
+
+def open_snapshot(dataset, version=None, directory=None):
+    """打开某版本（默认最近生成的版本）的快照，不存在时抛出 FileNotFoundError"""
+    if version is None:
+        versions = list_snapshot_versions(dataset, directory)
+        if not versions:
+            raise FileNotFoundError(f'没有 {dataset} 的本地快照: {directory or DEFAULT_SNAPSHOT_DIR}')
+        version = versions[-1]
+    return Snapshot(snapshot_path(dataset, version, directory))
+
+# ===================== 写入 =====================
+
+class _BlockWriter:
+    """按8字节对齐顺序写数据块，返回块描述（位置、长度、编码）"""
+
+    def __init__(self, handle, compress):
+        self.handle = handle
+        self.compress = compress
+
+    def write(self, payload, compress=False, **info):
+        position = self.handle.tell()
+        padding = -position % 8
+        if padding:
+            self.handle.write(b'\0' * padding)
+            position += padding
+        codec = 'none'
+        if compress and self.compress:
+            payload = zlib.compress(payload, COMPRESS_LEVEL)
+            codec = 'zlib'
+        self.handle.write(payload)
+        return {'offset': position, 'length': len(payload), 'codec': codec, **info}
+
+    def write_array(self, array):
+        return self.write(array.tobytes(), dtype=array.dtype.str, count=len(array))
+
+    def write_strings(self, values):
+        encoded = [(value or '').encode('utf-8') for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        if offsets[-1] < 2 ** 32:
+            offsets = offsets.astype(np.uint32)
+        return {'offsets': self.write_array(offsets), 'data': self.write(b''.join(encoded), compress=True)}
+
+def _write_column(writer, column_type, values):
+    if column_type == 'str':
+        return {'type': 'str', **writer.write_strings(values)}
+    if column_type == 'json':
+        return {'type': 'json', **writer.write_strings([json.dumps(value, ensure_ascii=False) for value in values])}
+    if column_type == 'str_list':
+        lengths = [len(value or []) for value in values]
+        list_offsets = np.zeros(len(values) + 1, dtype=np.uint32)
+        np.cumsum(lengths, out=list_offsets[1:])
+        flat = [item for value in values for item in (value or [])]
+        return {'type': 'str_list', 'lists': writer.write_array(list_offsets), **writer.write_strings(flat)}
+    if column_type == 'int64':
+        return {'type': 'int64', 'data': writer.write_array(np.asarray(values, dtype=np.int64))}
+    raise ValueError(f'不支持的列类型: {column_type}')
+
+def write_snapshot(path, dataset, version, tables, metadata=None, compress=True):
+    """
+    写快照文件（先写临时文件再原子替换，读取端不会看到写了一半的文件）
+
+    Args:
+        tables: {表名: {列名: (列类型, 值列表)}}，同一张表各列长度相同
+        metadata: 附加元数据（JSON可序列化）
+
+    Returns:
+        文件大小（字节）
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f'{path}.tmp-{os.getpid()}'
+    try:
+        with open(temp_path, 'wb') as handle:
+            handle.write(MAGIC)
+            writer = _BlockWriter(handle, compress)
+            layout = {}
+            for table_name, columns in tables.items():
+                rows = {len(values) for _, values in columns.values()}
+                if len(rows) > 1:
+                    raise ValueError(f'表 {table_name} 各列长度不同: {sorted(rows)}')
+                layout[table_name] = {
+                    'rows': rows.pop() if rows else 0,
+                    'columns': {name: _write_column(writer, column_type, values)
+                                for name, (column_type, values) in columns.items()}
+                }
+            footer = json.dumps({
+                'format': FORMAT_VERSION,
+                'dataset': dataset,
+                'version': version,
+                'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'metadata': metadata or {},
+                'tables': layout
+            }, ensure_ascii=False).encode('utf-8')
+            handle.write(footer)
+            handle.write(_FOOTER.pack(len(footer), MAGIC))
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return os.path.getsize(path)
+
+# ===================== 读取 =====================
+
+class StringColumn:
+    """只读字符串列；偏移数组直接映射，数据块在首次访问时解压"""
+
+    def __init__(self, snapshot, info, decode_json=False):
+        self._snapshot = snapshot
+        self._data_info = info['data']
+        self._decode_json = decode_json
+        self.offsets = snapshot.array(info['offsets'])
+        self._data = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _buffer(self):
+        if self._data is None:
+            self._data = self._snapshot.block(self._data_info)
+        return self._data
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        data = self._buffer()
+        value = str(data[int(self.offsets[index]):int(self.offsets[index + 1])], 'utf-8')
+        return json.loads(value) if self._decode_json else value
+
+    def tolist(self):
+        """整列解码（比逐个下标访问快）"""
+        data = self._buffer()
+        offsets = self.offsets.tolist()
+        values = [str(data[start:end], 'utf-8') for start, end in zip(offsets, offsets[1:])]
+        return [json.loads(value) for value in values] if self._decode_json else values
+
+class StringListColumn:
+    """只读字符串列表列"""
+
+    def __init__(self, snapshot, info):
+        self.lists = snapshot.array(info['lists'])
+        self.values = StringColumn(snapshot, info)
+
+    def __len__(self):
+        return len(self.lists) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        return [self.values[position] for position in range(int(self.lists[index]), int(self.lists[index + 1]))]
+
+    def tolist(self):
+        values = self.values.tolist()
+        bounds = self.lists.tolist()
+        return [values[start:end] for start, end in zip(bounds, bounds[1:])]
+
+class SnapshotTable:
+    """快照中的一张表：按列访问，列对象惰性创建"""
+
+    def __init__(self, snapshot, name, layout):
+        self._snapshot = snapshot
+        self.name = name
+        self.rows = layout['rows']
+        self._layout = layout['columns']
+        self._columns = {}
+
+    @property
+    def column_names(self):
+        return list(self._layout)
+
+    def __len__(self):
+        return self.rows
+
+    def column(self, name):
+        """列对象（str/json → StringColumn，str_list → StringListColumn，int64 → numpy数组）"""
+        if name not in self._columns:
+            info = self._layout[name]
+            if info['type'] == 'str_list':
+                self._columns[name] = StringListColumn(self._snapshot, info)
+            elif info['type'] == 'int64':
+                self._columns[name] = self._snapshot.array(info['data'])
+            else:
+                self._columns[name] = StringColumn(self._snapshot, info, decode_json=info['type'] == 'json')
+        return self._columns[name]
+
+    def row(self, index):
+        return {name: self.column(name)[index] for name in self._layout}
+
+    def to_columns(self):
+        """{列名: 值列表}"""
+        return {name: self.column(name).tolist() for name in self._layout}
+
+    def to_records(self):
+        """[{列名: 值}]"""
+        columns = self.to_columns()
+        names = list(columns)
+        return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+class Snapshot:
+    """mmap 打开的快照文件（只读，可在线程间共享）"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        size = len(self._mmap)
+        if size < len(MAGIC) + _FOOTER.size or self._mmap[:len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f'不是有效的快照文件: {path}')
+        footer_length, magic = _FOOTER.unpack_from(self._mmap, size - _FOOTER.size)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f'快照文件不完整: {path}')
+        footer_start = size - _FOOTER.size - footer_length
+        self.header = json.loads(self._mmap[footer_start:size - _FOOTER.size])
+        if self.header.get('format') != FORMAT_VERSION:
+            self._mmap.close()
+            raise ValueError(f"不支持的快照格式版本: {self.header.get('format')}")
+        self.dataset = self.header['dataset']
+        self.version = self.header['version']
+        self.metadata = self.header.get('metadata', {})
+        self._tables = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        # 仍被 numpy 数组引用时 mmap 无法关闭，交给垃圾回收
+        self._tables = {}
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+    @property
+    def table_names(self):
+        return list(self.header['tables'])
+
+    def table(self, name):
+        if name not in self._tables:
+            self._tables[name] = SnapshotTable(self, name, self.header['tables'][name])
+        return self._tables[name]
+
+    def array(self, info):
+        """未压缩的数值块 → 直接映射的 numpy 数组（只读）"""
+        return np.frombuffer(self._mmap, dtype=np.dtype(info['dtype']), count=info['count'], offset=info['offset'])
+
+    def block(self, info):
+        """数据块内容（未压缩时为 mmap 上的 memoryview，不复制）"""
+        view = memoryview(self._mmap)[info['offset']:info['offset'] + info['length']]
+        if info['codec'] == 'zlib':
+            return zlib.decompress(view)
+        return view
+
+# ===================== SDTM Terminology =====================
+
+# 大类/子项表的字符串列（与导入脚本的文档字段对应）
+TERMINOLOGY_CODELIST_FIELDS = ['code', 'codelist_code', 'name', 'submission_value', 'definition', 'nci_preferred_term']
+TERMINOLOGY_ITEM_FIELDS = ['code', 'codelist_code', 'name', 'submission_value', 'definition', 'nci_preferred_term']
+
+class TerminologySnapshotBuilder:
+    """导入过程中按列收集大类文档（build_codelist_document 的结构），导入成功后写快照"""
+
+    def __init__(self):
+        self.codelists = {field: [] for field in TERMINOLOGY_CODELIST_FIELDS}
+        self.codelists['extensible'] = []
+        self.codelists['item_start'] = []
+        self.items = {field: [] for field in TERMINOLOGY_ITEM_FIELDS}
+        self.items['synonyms'] = []
+        self.file_name = None
+        self.version = None
+
+    def add(self, document):
+        codelist = document['codelist']
+        for field in TERMINOLOGY_CODELIST_FIELDS:
+            self.codelists[field].append(codelist.get(field) or '')
+        self.codelists['extensible'].append(1 if codelist.get('extensible') else 0)
+        self.codelists['item_start'].append(len(self.items['code']))
+        for item in document.get('items', []):
+            for field in TERMINOLOGY_ITEM_FIELDS:
+                self.items[field].append(item.get(field) or '')
+            self.items['synonyms'].append(item.get('synonyms') or [])
+        self.file_name = self.file_name or document.get('File_Name')
+        self.version = self.version or document.get('version')
+
+    def track(self, documents):
+        """在文档流经导入管线时顺带收集（生成器包装）"""
+        for document in documents:
+            self.add(document)
+            yield document
+
+    def write(self, path, version=None):
+        """写快照，返回文件大小（字节）"""
+        tables = {
+            'codelists': {
+                **{field: ('str', self.codelists[field]) for field in TERMINOLOGY_CODELIST_FIELDS},
+                'extensible': ('int64', self.codelists['extensible']),
+                'item_start': ('int64', self.codelists['item_start'])
+            },
+            'items': {
+                **{field: ('str', self.items[field]) for field in TERMINOLOGY_ITEM_FIELDS},
+                'synonyms': ('str_list', self.items['synonyms'])
+            }
+        }
+        metadata = {'file_name': self.file_name, 'file_function': 'CDISC',
+                    'codelists': len(self.codelists['code']), 'items': len(self.items['code'])}
+        return write_snapshot(path, TERMINOLOGY_DATASET, version or self.version, tables, metadata)
+
+def iter_terminology_documents(snapshot):
+    """从快照还原大类文档（与导入脚本写入的字段相同，不含_id和检索字段）"""
+    codelists = snapshot.table('codelists').to_columns()
+    items = snapshot.table('items').to_columns()
+    item_names = list(items)
+    item_rows = [dict(zip(item_names, values)) for values in zip(*items.values())]
+    starts = codelists['item_start'] + [len(item_rows)]
+    file_name = snapshot.metadata.get('file_name')
+
+    for index in range(len(codelists['code'])):
+        yield {
+            'File_Name': file_name,
+            'File_Function': snapshot.metadata.get('file_function', 'CDISC'),
+            'version': snapshot.version,
+            'codelist': {
+                **{field: codelists[field][index] for field in TERMINOLOGY_CODELIST_FIELDS},
+                'extensible': bool(codelists['extensible'][index])
+            },
+            'items': item_rows[starts[index]:starts[index + 1]],
+            'last_updated': snapshot.version
+        }
+
+# ===================== TS Reference =====================
+
+def write_ts_snapshot(path, version, columns, records, metadata=None):
+    """TS参考数据快照：一张 data 表，每个Excel列一个 json 列（保留数字/None）"""
+    tables = {'data': {column: ('json', [record.get(column) for record in records]) for column in columns}}
+    return write_snapshot(path, TS_DATASET, version, tables, {'columns': columns, **(metadata or {})})
+
+def ts_snapshot_document(snapshot):
+    """从快照还原TS参考数据（columns + data，与MongoDB文档中的字段相同）"""
+    table = snapshot.table('data')
+    return {
+        **snapshot.metadata,
+        'columns': snapshot.metadata.get('columns', table.column_names),
+        'data': table.to_records(),
+        'total_rows': table.rows,
+        'version': snapshot.version
+    }
@@ -0,0 +1,381 @@
+const { spawn, execFile } = require('child_process');
+const path = require('path');
+const readline = require('readline');
+const { promisify } = require('util');
+
+const execFileAsync = promisify(execFile);
+
+const WORKER_SCRIPT = path.join(__dirname, 'pdf_worker.py');
+const DEFAULT_POOL_SIZE = parseInt(process.env.PDF_WORKER_POOL_SIZE, 10) || 2;
+const DEFAULT_TIMEOUT_MS = 5 * 60 * 1000;
+// Jobs allowed to wait for a worker; further submissions are rejected (PDF_QUEUE_FULL)
+const DEFAULT_MAX_QUEUE = parseInt(process.env.PDF_WORKER_MAX_QUEUE, 10) || 50;
+// Priority lanes in dispatch order: uploads waiting on a user run ahead of batch annotation
+const PRIORITIES = ['interactive', 'batch'];
+const METHOD_PRIORITY = {
+  process_pdf_simple: 'interactive',
+  extract_words_only: 'interactive',
+  extract_pages: 'interactive',
+  annotate_pdf: 'batch',
+  annotate_pdf_batches: 'batch',
+  update_form_annotations: 'batch'
+};
+// Processes each extraction job may split its page range across (1 = serial)
+const EXTRACTION_WORKERS = parseInt(process.env.PDF_EXTRACTION_WORKERS, 10) || 1;
+// Reuse stored extraction results for byte-identical re-uploads (PDF_EXTRACTION_CACHE=0 disables)
+const EXTRACTION_CACHE = process.env.PDF_EXTRACTION_CACHE !== '0';
+// Collect per-page, per-phase extraction timings and log the slowest pages (PDF_EXTRACTION_METRICS=1 enables)
+const EXTRACTION_METRICS = process.env.PDF_EXTRACTION_METRICS === '1';
+// Close each page once extracted so long documents run in bounded memory, and report the
+// job's peak RSS (PDF_EXTRACTION_LOW_MEMORY=0 keeps pdfplumber's per-page caches)
+const EXTRACTION_LOW_MEMORY = process.env.PDF_EXTRACTION_LOW_MEMORY !== '0';
+// Word payload format requested from the extractors: compact 'columnar' arrays, decoded by
+// words_to_rows_processor (PDF_WORDS_FORMAT=records restores one object per word)
+const EXTRACTION_WORDS_FORMAT = process.env.PDF_WORDS_FORMAT === 'records' ? 'records' : 'columnar';
+
+let pythonCommandPromise = null;
+
+/**
+ * Resolve the Python command once per Node process (Anaconda first, then system Python)
+ * @returns {Promise<string>} Python command
+ */
+function resolvePythonCommand() {
+  if (!pythonCommandPromise) {
+    pythonCommandPromise = (async () => {
+      const candidates = ['/opt/anaconda3/bin/python3', 'python3', 'python'];
+      for (const candidate of candidates) {
+        try {
+          await execFileAsync(candidate, ['--version']);
+          return candidate;
+        } catch (error) {
+          // try next candidate
+        }
+      }
+      throw new Error('Python environment not found. Please ensure Python is installed and accessible from command line');
+    })();
+    // Allow a later retry if resolution failed
+    pythonCommandPromise.catch(() => { pythonCommandPromise = null; });
+  }
+  return pythonCommandPromise;
+}
+
+/**
+ * Error carrying a machine-readable code (PDF_QUEUE_FULL, PDF_JOB_TIMEOUT, PDF_JOB_CANCELLED)
+ * @param {string} message - Error message
+ * @param {string} code - Error code
+ * @returns {Error} Error with .code set
+ */
+function jobError(message, code) {
+  const error = new Error(message);
+  error.code = code;
+  return error;
+}
+
+/**
+ * One long-lived pdf_worker.py process handling a single job at a time
+ */
+class PdfWorker {
+  constructor(pythonCmd, onExit) {
+    this.pythonCmd = pythonCmd;
+    this.job = null;
+    this.alive = true;
+
+    this.process = spawn(pythonCmd, [WORKER_SCRIPT], {
+      stdio: ['pipe', 'pipe', 'pipe'],
+      env: { ...process.env }
+    });
+
+    // Write failures surface through the 'exit' handler below
+    this.process.stdin.on('error', () => {});
+
+    readline.createInterface({ input: this.process.stdout }).on('line', (line) => this.handleLine(line));
+    readline.createInterface({ input: this.process.stderr }).on('line', (line) => {
+      if (this.job) this.job.stderr.push(line);
+      if (process.env.PDF_WORKER_DEBUG) console.log(`🐍 [worker ${this.process.pid}] ${line}`);
+    });
+
+    this.process.on('exit', (code, signal) => {
+      this.alive = false;
+      if (this.job) {
+        this.finish(new Error(`PDF worker exited (code=${code}, signal=${signal})\n${this.job.stderr.join('\n')}`));
+      }
+      onExit(this);
+    });
+
+    this.process.on('error', (err) => {
+      this.alive = false;
+      if (this.job) this.finish(new Error(`Failed to start PDF worker: ${err.message}`));
+      onExit(this);
+    });
+  }
+
+  get busy() {
+    return this.job !== null;
+  }
+
+  run(job) {
+    this.job = job;
+    job.worker = this;
+    job.timer = setTimeout(() => {
+      console.warn(`⏰ PDF worker job "${job.method}" timed out (${Math.round(job.timeoutMs / 1000)}s), restarting worker`);
+      // Kill first so the pool does not hand this worker the next job
+      this.kill();
+      this.finish(jobError('PDF worker job timed out', 'PDF_JOB_TIMEOUT'));
+    }, job.timeoutMs);
+
+    const request = JSON.stringify({ id: job.id, method: job.method, params: job.params });
+    this.process.stdin.write(request + '\n');
+    // The PDF bytes follow the request line as-is (params.payload_bytes tells the worker how many)
+    if (job.payload) this.process.stdin.write(job.payload);
+  }
+
+  handleLine(line) {
+    if (!line.trim() || !this.job) return;
+
+    let response;
+    try {
+      response = JSON.parse(line);
+    } catch (parseError) {
+      this.finish(new Error(`Failed to parse PDF worker output: ${parseError.message}\nWorker output: ${line.substring(0, 500)}`));
+      return;
+    }
+
+    if (response.id !== this.job.id) return;
+    if (response.record !== undefined) {
+      // Streamed page record; the job continues until the final result line
+      if (this.job.onRecord) {
+        try {
+          this.job.onRecord(response.record);
+        } catch (recordError) {
+          console.warn(`⚠️ PDF worker record handler failed: ${recordError.message}`);
+        }
+      }
+      return;
+    }
+    if (response.error) {
+      this.finish(new Error(response.error.message || 'PDF worker job failed'));
+    } else {
+      this.finish(null, response.result);
+    }
+  }
+
+  finish(error, result) {
+    const job = this.job;
+    if (!job) return;
+    this.job = null;
+    clearTimeout(job.timer);
+    if (error) job.reject(error);
+    else job.resolve(result);
+    job.onDone(error);
+  }
+
+  /**
+   * Abandon the running job; the worker is restarted since the Python side cannot be interrupted
+   * @param {Error} error - Rejection for the job
+   */
+  cancel(error) {
+    if (!this.job) return;
+    this.kill();
+    this.finish(error);
+  }
+
+  kill() {
+    this.alive = false;
+    try { this.process.kill('SIGTERM'); } catch (_) {}
+  }
+}
+
+/**
+ * Pool of long-lived Python PDF workers.
+ * Replaces per-call `python3` spawns so pdfplumber/pypdf are imported once per worker.
+ * At most `size` jobs run at once; waiting jobs are queued per priority lane (interactive
+ * before batch) up to `maxQueue`, beyond which submissions are rejected.
+ */
+class PdfWorkerPool {
+  constructor(size = DEFAULT_POOL_SIZE, maxQueue = DEFAULT_MAX_QUEUE) {
+    this.size = Math.max(1, size);
+    this.maxQueue = Math.max(0, maxQueue);
+    this.workers = [];
+    this.queues = Object.fromEntries(PRIORITIES.map(priority => [priority, []]));
+    this.nextId = 1;
+    this.pythonCmd = null;
+    this.counters = { submitted: 0, completed: 0, failed: 0, timedOut: 0, cancelled: 0, rejected: 0 };
+    this.waitMs = { total: 0, max: 0, jobs: 0 };
+    this.maxQueued = 0;
+  }
+
+  get queued() {
+    return PRIORITIES.reduce((total, priority) => total + this.queues[priority].length, 0);
+  }
+
+  async ensureStarted() {
+    if (!this.pythonCmd) {
+      this.pythonCmd = await resolvePythonCommand();
+    }
+  }
+
+  /**
+   * Submit a job to the pool
+   * @param {string} method - Worker method (process_pdf_simple, extract_words_only, extract_pages, annotate_pdf, annotate_pdf_batches, update_form_annotations)
+   * @param {Object} params - Method parameters
+   * @param {Object} options - {
+   *   timeoutMs: run time limit once the job has a worker (the worker is restarted on expiry),
+   *   onRecord: called with each streamed record when params.stream is set,
+   *   payload: PDF Buffer sent to the worker after the request, used instead of params.file_path,
+   *   priority: 'interactive' | 'batch' (default by method, see METHOD_PRIORITY),
+   *   signal: AbortSignal; aborting drops a queued job or restarts the worker running it
+   * }
+   * @returns {Promise<Object>} Method result (the summary record for streamed calls); rejects with
+   *   error.code PDF_QUEUE_FULL, PDF_JOB_TIMEOUT or PDF_JOB_CANCELLED
+   */
+  async call(method, params = {}, options = {}) {
+    await this.ensureStarted();
+    const payload = options.payload || null;
+    const priority = PRIORITIES.includes(options.priority) ? options.priority : (METHOD_PRIORITY[method] || 'batch');
+    const { signal } = options;
+    this.counters.submitted++;
+
+    if (signal && signal.aborted) {
+      this.counters.cancelled++;
+      throw jobError(`PDF worker job "${method}" cancelled`, 'PDF_JOB_CANCELLED');
+    }
+    if (this.queued >= this.maxQueue && !this.hasIdleCapacity()) {
+      this.counters.rejected++;
+      throw jobError(`PDF worker queue is full (${this.queued} jobs waiting), try again later`, 'PDF_QUEUE_FULL');
+    }
+
+    return new Promise((resolve, reject) => {
+      const job = {
+        id: this.nextId++,
+        method,
+        params: payload ? { ...params, payload_bytes: payload.length } : params,
+        payload,
+        priority,
+        timeoutMs: options.timeoutMs || DEFAULT_TIMEOUT_MS,
+        onRecord: options.onRecord || null,
+        stderr: [],
+        queuedAt: Date.now(),
+        worker: null,
+        resolve,
+        reject,
+        onDone: (error) => {
+          if (signal) signal.removeEventListener('abort', onAbort);
+          this.recordOutcome(error);
+          this.dispatch();
+        }
+      };
+      const onAbort = () => this.cancelJob(job);
+      if (signal) signal.addEventListener('abort', onAbort, { once: true });
+
+      this.queues[priority].push(job);
+      this.maxQueued = Math.max(this.maxQueued, this.queued);
+      this.dispatch();
+    });
+  }
+
+  /**
+   * Cancel a job: drop it from its queue, or stop the worker running it
+   * @param {Object} job - Job created by call()
+   */
+  cancelJob(job) {
+    const error = jobError(`PDF worker job "${job.method}" cancelled`, 'PDF_JOB_CANCELLED');
+    const queue = this.queues[job.priority];
+    const index = queue.indexOf(job);
+    if (index !== -1) {
+      queue.splice(index, 1);
+      job.reject(error);
+      job.onDone(error);
+    } else if (job.worker && job.worker.job === job) {
+      console.warn(`🛑 PDF worker job "${job.method}" cancelled, restarting worker`);
+      job.worker.cancel(error);
+    }
+  }
+
+  recordOutcome(error) {
+    if (!error) this.counters.completed++;
+    else if (error.code === 'PDF_JOB_CANCELLED') this.counters.cancelled++;
+    else if (error.code === 'PDF_JOB_TIMEOUT') this.counters.timedOut++;
+    else this.counters.failed++;
+  }
+
+  hasIdleCapacity() {
+    return this.workers.length < this.size || this.workers.some(w => w.alive && !w.busy);
+  }
+
+  nextJob() {
+    for (const priority of PRIORITIES) {
+      if (this.queues[priority].length > 0) return this.queues[priority].shift();
+    }
+    return null;
+  }
+
+  dispatch() {
+    while (this.queued > 0) {
+      const worker = this.acquireWorker();
+      if (!worker) return;
+      const job = this.nextJob();
+      const waitMs = Date.now() - job.queuedAt;
+      this.waitMs.total += waitMs;
+      this.waitMs.max = Math.max(this.waitMs.max, waitMs);
+      this.waitMs.jobs++;
+      worker.run(job);
+    }
+  }
+
+  /**
+   * Queue depth and job counters for monitoring
+   * @returns {Object} { size, workers, running, maxQueue, queued: {lane: depth}, maxQueued, jobs, waitMs }
+   */
+  stats() {
+    const running = this.workers.filter(w => w.busy);
+    return {
+      size: this.size,
+      workers: this.workers.filter(w => w.alive).length,
+      running: running.map(w => ({ method: w.job.method, priority: w.job.priority })),
+      maxQueue: this.maxQueue,
+      queued: Object.fromEntries(PRIORITIES.map(priority => [priority, this.queues[priority].length])),
+      maxQueued: this.maxQueued,
+      jobs: { ...this.counters },
+      waitMs: {
+        avg: this.waitMs.jobs ? Math.round(this.waitMs.total / this.waitMs.jobs) : 0,
+        max: this.waitMs.max
+      }
+    };
+  }
+
+  acquireWorker() {
+    const idle = this.workers.find(w => w.alive && !w.busy);
+    if (idle) return idle;
+
+    if (this.workers.length < this.size) {
+      const worker = new PdfWorker(this.pythonCmd, (exited) => {
+        this.workers = this.workers.filter(w => w !== exited);
+        this.dispatch();
+      });
+      this.workers.push(worker);
+      return worker;
+    }
+    return null;
+  }
+
+  shutdown() {
+    this.workers.forEach(w => w.kill());
+    this.workers = [];
+  }
+}
+
+// Create singleton instance
+const pdfWorkerPool = new PdfWorkerPool();
+
+process.on('exit', () => pdfWorkerPool.shutdown());
+
+module.exports = {
+  pdfWorkerPool,
+  EXTRACTION_WORKERS,
+  EXTRACTION_CACHE,
+  EXTRACTION_METRICS,
+  EXTRACTION_LOW_MEMORY,
+  EXTRACTION_WORDS_FORMAT,
+  PdfWorkerPool,
+  resolvePythonCommand
+};
@@ -4,24 +4,55 @@ PDF Annotation Script for CRF Documents - FreeText Version
 在PDF上绘制FreeText注解
 
 Usage:
-    python pdf_annotate.py <source_path> <rects_json> <output_path>
+    python pdf_annotate.py <source_path> <rects> <output_path> [--format auto|json|binary]
     
+    rects 为矩形数据文件（JSON，或 pdf_annotation_rects 的二进制格式，按mmap读取），
+    '-' 表示从stdin读取；加 --inline 时 rects 本身是JSON字符串
+    数据为数组/二进制时按顺序作为多个批次处理（单次读写，批次失败互不影响）
+
+    python pdf_annotate.py <annotated_path> <rects> --update-forms '["FORM_KEY"]' [--pages '[1,2]']
+    增量更新：只替换指定Form的注解，把新对象和xref追加到已注解PDF末尾（不重写原有内容）
+
     或作为模块调用:
     annotate_pdf(source_path, rects_by_page, output_path)
+    annotate_pdf_batches(source_path, batches, output_path)
+    update_form_annotations(pdf_path, rects_by_page, form_keys)
+
+每个FreeText注解的 /NM 记录其所属Form（crf-form:<formKey>#p<页>-<序号>），
+增量更新据此找到需要替换的旧注解。
 """
 
 import sys
 import json
 import os
+import math
+import shutil
+import argparse
 from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
 try:
     from pypdf import PdfReader, PdfWriter
     from pypdf.annotations import FreeText
+    from pypdf.generic import (
+        ArrayObject, DictionaryObject, FloatObject, IndirectObject, NameObject, NumberObject,
+        StreamObject, TextStringObject
+    )
 except ImportError:
     print("❌ 错误: 需要安装 pypdf 库")
     print("请运行: pip install pypdf")
     sys.exit(1)
 
+from pdf_annotation_rects import load_rects, merge_rect_batches
+
+
+FORM_TAG_PREFIX = 'crf-form:'
+
+# 共享资源模式：注解字体（Helvetica-Bold 13pt，黑字黑框）
+FONT_RESOURCE_NAME = '/HeBo'
+FONT_SIZE = 13
+TEXT_PADDING = 2
+CAP_HEIGHT = 0.718  # Helvetica-Bold 大写字母高度（相对字号）
+
 
 def rgb01_to_hex(rgb01):
     """
@@ -40,7 +71,7 @@ def rgb01_to_hex(rgb01):
     return f"{r:02x}{g:02x}{b:02x}"
 
 
-def annotate_pdf(source_path, rects_by_page, output_path):
+def annotate_pdf(source_path, rects_by_page, output_path, shared_resources=False):
     """
     在PDF上添加FreeText注解
     
@@ -48,6 +79,7 @@ def annotate_pdf(source_path, rects_by_page, output_path):
         source_path (str): 原始PDF文件路径
         rects_by_page (dict): 按页码组织的矩形数据
         output_path (str): 输出PDF文件路径
+        shared_resources (bool): 共享字体/外观流资源（默认False：每个注解独立的FreeText，由阅读器排版）
         
     Returns:
         dict: 处理结果统计
@@ -72,6 +104,7 @@ def annotate_pdf(source_path, rects_by_page, output_path):
         # 复制所有页面到writer
         for page in reader.pages:
             writer.add_page(page)
+        resources = SharedAnnotationResources.for_writer(writer) if shared_resources else None
         
         # 遍历每一页添加注解
         for page_num in range(len(reader.pages)):
@@ -84,7 +117,7 @@ def annotate_pdf(source_path, rects_by_page, output_path):
                 print(f"📍 处理第 {page_number} 页 - {len(rects)} 个矩形")
                 
                 # 为该页添加FreeText注解
-                add_annotations_to_page(writer, page_num, rects)
+                add_annotations_to_page(writer, page_num, rects, resources)
                 total_rects += len(rects)
                 processed_pages += 1
         
@@ -101,7 +134,9 @@ def annotate_pdf(source_path, rects_by_page, output_path):
             'total_pages': len(reader.pages),
             'processed_pages': processed_pages,
             'total_rects': total_rects,
-            'file_size': os.path.getsize(output_path)
+            'file_size': os.path.getsize(output_path),
+            'appearance_streams': resources.appearance_streams if resources else 0,
+            'appearance_reuses': resources.appearance_reuses if resources else 0
         }
         
         return result
@@ -112,7 +147,382 @@ def annotate_pdf(source_path, rects_by_page, output_path):
         raise Exception(error_msg)
 
 
-def add_annotations_to_page(writer, page_index, rects):
+def iter_annotate_batches(source_path: str, batches: List[Dict[str, Any]], output_path: str,
+                          shared_resources: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    单次读取/写出完成多批注解：每批完成后产出一条进度记录，最后产出汇总记录
+
+    每批在同一个 PdfWriter 上添加注解：先校验并构建整批注解，全部成功后才加入 writer；
+    某批失败时跳过该批并继续下一批，与逐批调用 annotate_pdf 的失败隔离一致。只有至少一批成功时才写出文件
+    （先写临时文件再替换，避免留下半写的输出）。
+
+    Args:
+        source_path (str): 原始PDF文件路径
+        batches (list): 按顺序排列的 rects_by_page 字典列表
+        output_path (str): 输出PDF文件路径
+        shared_resources (bool): 共享字体/外观流资源（见 SharedAnnotationResources）
+
+    Yields:
+        dict: {'type': 'batch', ...} 每批一条，最后一条为 {'type': 'summary', ...}
+    """
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(f"源PDF文件不存在: {source_path}")
+
+    output_dir = os.path.dirname(output_path)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+
+    reader = PdfReader(source_path)
+    writer = PdfWriter()
+    for page in reader.pages:
+        writer.add_page(page)
+    total_pages = len(reader.pages)
+    resources = SharedAnnotationResources.for_writer(writer) if shared_resources else None
+
+    total_rects = 0
+    annotated_pages = set()
+    succeeded_batches = 0
+    failed_batches = 0
+    skipped_batches = 0
+
+    for batch_index, rects_by_page in enumerate(batches):
+        rects_by_page = rects_by_page or {}
+        page_items = [
+            (int(page_key) - 1, rects)
+            for page_key, rects in rects_by_page.items()
+            if rects and 1 <= int(page_key) <= total_pages
+        ]
+        batch_rects = sum(len(rects) for _, rects in page_items)
+
+        if batch_rects == 0:
+            skipped_batches += 1
+            yield {'type': 'batch', 'batch_index': batch_index, 'status': 'skipped', 'rects': 0}
+            continue
+
+        # 整批校验并构建完成后才加入 writer，失败的批次不会在文档中留下任何注解
+        try:
+            for _, rects in page_items:
+                for rect_data in rects:
+                    validate_rect_data(rect_data)
+            built = [(page_index, build_page_annotations(page_index, rects, resources))
+                     for page_index, rects in page_items]
+        except Exception as e:
+            failed_batches += 1
+            print(f"❌ 第 {batch_index + 1} 批注解失败，已跳过: {e}", file=sys.stderr)
+            yield {'type': 'batch', 'batch_index': batch_index, 'status': 'failed', 'rects': 0, 'error': str(e)}
+            continue
+
+        for page_index, annots in built:
+            for annot in annots:
+                writer.add_annotation(page_number=page_index, annotation=annot)
+
+        succeeded_batches += 1
+        total_rects += batch_rects
+        annotated_pages.update(page_index for page_index, _ in page_items)
+        yield {'type': 'batch', 'batch_index': batch_index, 'status': 'completed', 'rects': batch_rects}
+
+    written = succeeded_batches > 0
+    if written:
+        tmp_path = f"{output_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as output_file:
+                writer.write(output_file)
+            os.replace(tmp_path, output_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    yield {
+        'type': 'summary',
+        'success': True,
+        'source_path': source_path,
+        'output_path': output_path,
+        'output_path_absolute': os.path.abspath(output_path),
+        'written': written,
+        'total_pages': total_pages,
+        'processed_pages': len(annotated_pages),
+        'total_rects': total_rects,
+        'total_batches': len(batches),
+        'succeeded_batches': succeeded_batches,
+        'failed_batches': failed_batches,
+        'skipped_batches': skipped_batches,
+        'file_size': os.path.getsize(output_path) if written else 0,
+        'appearance_streams': resources.appearance_streams if resources else 0,
+        'appearance_reuses': resources.appearance_reuses if resources else 0
+    }
+
+
+def annotate_pdf_batches(source_path, batches, output_path, shared_resources=False):
+    """
+    iter_annotate_batches 的非流式版本
+
+    Returns:
+        dict: 汇总结果，附带每批状态列表 'batches'
+    """
+    batch_records = []
+    summary = None
+    for record in iter_annotate_batches(source_path, batches, output_path, shared_resources):
+        if record['type'] == 'summary':
+            summary = record
+        else:
+            batch_records.append(record)
+    summary = {k: v for k, v in summary.items() if k != 'type'}
+    summary['batches'] = batch_records
+    return summary
+
+
+def form_annotation_name(form_name, page_number, index):
+    """生成注解 /NM：crf-form:<formKey>#p<页码>-<序号>"""
+    return f"{FORM_TAG_PREFIX}{form_name}#p{page_number}-{index}"
+
+
+def form_of_annotation_name(name):
+    """从注解 /NM 解析所属Form键名；非本脚本生成的注解返回None"""
+    if not isinstance(name, str) or not name.startswith(FORM_TAG_PREFIX):
+        return None
+    form_name, sep, _ = name[len(FORM_TAG_PREFIX):].rpartition('#')
+    return form_name if sep else None
+
+
+def validate_rect_data(rect_data):
+    """
+    校验一条矩形数据（不修改文档），不合法时抛出 ValueError
+
+    rect 必须是4个有限数值；text 为字符串或省略；background_color 为3个数值时才使用
+    """
+    if not isinstance(rect_data, dict):
+        raise ValueError(f"矩形数据必须是对象: {rect_data!r}")
+    rect = rect_data.get("rect")
+    if (not isinstance(rect, (list, tuple)) or len(rect) != 4
+            or not all(isinstance(c, (int, float)) and not isinstance(c, bool) and math.isfinite(c) for c in rect)):
+        raise ValueError(f"rect 必须是4个数值: {rect!r}")
+    if not isinstance(rect_data.get("text", ""), str):
+        raise ValueError(f"text 必须是字符串: {rect_data.get('text')!r}")
+    background = rect_data.get("background_color")
+    if isinstance(background, (list, tuple)) and len(background) == 3:
+        if not all(isinstance(c, (int, float)) and not isinstance(c, bool) for c in background):
+            raise ValueError(f"background_color 必须是3个数值: {background!r}")
+
+
+def build_freetext_annotation(rect_data, page_number, index):
+    """
+    根据矩形数据创建FreeText注解（带Form标记）
+
+    Args:
+        rect_data (dict): 矩形数据 (rect, text, background_color, form_name)
+        page_number (int): 页码 (1-based)，用于生成 /NM
+        index (int): 该矩形在本页矩形列表中的序号
+
+    Returns:
+        FreeText: 注解字典
+    """
+    # 提取矩形参数并确保坐标精度
+    rect_raw = rect_data["rect"]  # [x0, y0, x1, y1] pypdf坐标
+    rect = [round(coord, 2) for coord in rect_raw]  # 保留2位小数避免精度问题
+    text = rect_data.get("text", "")
+
+    # 背景颜色转换：从RGB 0-1数组转为十六进制字符串
+    bg_hex = None
+    if isinstance(rect_data.get("background_color"), (list, tuple)) and len(rect_data["background_color"]) == 3:
+        bg_hex = rgb01_to_hex(rect_data["background_color"])
+
+    # 创建FreeText注释
+    annot = FreeText(
+        text=text,
+        rect=rect,                     # [x0, y0, x1, y1] pypdf坐标 - 已经设置了Rect
+        font="Helvetica",              # 通用字体
+        font_size="13pt",              # 与原Widget字段一致的字号
+        font_color="000000",           # 黑色字体
+        border_color="000000",         # 黑色边框
+        background_color=bg_hex,       # 动态背景色或None（透明）
+        bold=True,                     # 粗体，与原设计一致
+        italic=False
+    )
+
+    # 记录所属Form，供增量重绘定位
+    if rect_data.get("form_name"):
+        annot[NameObject("/NM")] = TextStringObject(form_annotation_name(rect_data["form_name"], page_number, index))
+    return annot
+
+
+def _pdf_literal(encoded):
+    """转义PDF字面字符串中的 \\ ( )"""
+    return encoded.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+class SharedAnnotationResources:
+    """
+    共享资源模式的FreeText构建器
+
+    字体对象和外观流 /Resources 只定义一次，由所有注解引用；/DA 复用同一字符串，
+    背景色数组为共享的间接对象；相同 (文本, 宽, 高, 背景色) 的外观流（/AP /N）只生成
+    一个 Form XObject。
+    外观流为单行文本（不换行、不缩小字号，超出矩形的部分被裁掉），与阅读器自行排版的
+    FreeText 不完全一致，因此只在显式开启 shared_resources 时使用。
+    文本无法用 WinAnsi 编码（如中文）时退回 build_freetext_annotation。
+    """
+
+    def __init__(self, add_object, font_ref=None):
+        """
+        Args:
+            add_object: 把对象加入文档并返回 IndirectObject 的函数
+            font_ref: 文档中已有的 Helvetica-Bold 字体引用（省略则新建）
+        """
+        self._add_object = add_object
+        if font_ref is None:
+            font_ref = add_object(DictionaryObject({
+                NameObject('/Type'): NameObject('/Font'),
+                NameObject('/Subtype'): NameObject('/Type1'),
+                NameObject('/BaseFont'): NameObject('/Helvetica-Bold'),
+                NameObject('/Encoding'): NameObject('/WinAnsiEncoding')
+            }))
+        self.font_ref = font_ref
+        self.resources_ref = add_object(DictionaryObject({
+            NameObject('/Font'): DictionaryObject({NameObject(FONT_RESOURCE_NAME): font_ref})
+        }))
+        self.default_appearance = TextStringObject(f"{FONT_RESOURCE_NAME} {FONT_SIZE} Tf 0 g")
+        self._colors = {}
+        self._appearances = {}
+        self.appearance_streams = 0
+        self.appearance_reuses = 0
+
+    @classmethod
+    def for_writer(cls, writer):
+        """为 PdfWriter 创建共享资源；文档已有 /AcroForm 时把字体登记到其 /DR（不新建 /AcroForm）"""
+        resources = cls(writer._add_object)
+        root = writer.root_object
+        if '/AcroForm' in root:
+            register_default_font(root['/AcroForm'].get_object(), None, resources.font_ref)
+        return resources
+
+    @staticmethod
+    def find_font(reader):
+        """查找之前由共享资源模式登记的字体引用（增量更新时复用）"""
+        try:
+            fonts = reader.trailer['/Root']['/AcroForm']['/DR']['/Font']
+            font_ref = fonts.raw_get(FONT_RESOURCE_NAME)
+        except (KeyError, TypeError):
+            return None
+        return font_ref if isinstance(font_ref, IndirectObject) else None
+
+    def _color(self, rgb):
+        """背景色数组作为间接对象共享（每个注解只写一个引用）"""
+        key = tuple(rgb)
+        if key not in self._colors:
+            self._colors[key] = self._add_object(ArrayObject([FloatObject(c) for c in key]))
+        return self._colors[key]
+
+    def appearance(self, text, width, height, background):
+        """返回 (文本, 宽, 高, 背景色) 对应的共享外观流引用；无法编码时返回None"""
+        key = (text, width, height, background)
+        if key in self._appearances:
+            self.appearance_reuses += 1
+            return self._appearances[key]
+
+        try:
+            encoded = text.encode('cp1252')
+        except UnicodeEncodeError:
+            return None
+
+        ops = []
+        if background is not None:
+            ops.append(f"{background[0]:g} {background[1]:g} {background[2]:g} rg 0 0 {width:g} {height:g} re f")
+        ops.append(f"0 G 1 w 0.5 0.5 {max(width - 1, 0):g} {max(height - 1, 0):g} re S")
+        baseline = max((height - FONT_SIZE * CAP_HEIGHT) / 2, 0)
+        content = ('\n'.join(ops) + f"\nBT {FONT_RESOURCE_NAME} {FONT_SIZE} Tf 0 g {TEXT_PADDING} {baseline:.2f} Td (").encode('latin-1')
+        content += _pdf_literal(encoded) + b') Tj ET'
+
+        stream = StreamObject()
+        stream.update({
+            NameObject('/Type'): NameObject('/XObject'),
+            NameObject('/Subtype'): NameObject('/Form'),
+            NameObject('/BBox'): ArrayObject([FloatObject(0), FloatObject(0), FloatObject(width), FloatObject(height)]),
+            NameObject('/Resources'): self.resources_ref
+        })
+        stream.set_data(content)
+        self._appearances[key] = self._add_object(stream)
+        self.appearance_streams += 1
+        return self._appearances[key]
+
+    def build_annotation(self, rect_data, page_number, index):
+        """创建引用共享资源的FreeText注解字典；文本无法编码时返回 build_freetext_annotation 的结果"""
+        rect = [round(coord, 2) for coord in rect_data["rect"]]
+        text = rect_data.get("text", "")
+        try:
+            text.encode('cp1252')
+        except UnicodeEncodeError:
+            return DictionaryObject(build_freetext_annotation(rect_data, page_number, index))
+        background = None
+        if isinstance(rect_data.get("background_color"), (list, tuple)) and len(rect_data["background_color"]) == 3:
+            # 与 rgb01_to_hex 相同的8位量化，保证颜色与旧模式一致
+            background = tuple(max(0, min(255, round(c * 255))) / 255 for c in rect_data["background_color"])
+
+        annot = DictionaryObject({
+            NameObject('/Type'): NameObject('/Annot'),
+            NameObject('/Subtype'): NameObject('/FreeText'),
+            NameObject('/Rect'): ArrayObject([FloatObject(c) for c in rect]),
+            NameObject('/Contents'): TextStringObject(text),
+            NameObject('/DA'): self.default_appearance
+        })
+        if background is not None:
+            annot[NameObject('/C')] = self._color(background)
+        if rect_data.get("form_name"):
+            annot[NameObject('/NM')] = TextStringObject(form_annotation_name(rect_data["form_name"], page_number, index))
+
+        appearance = self.appearance(text, round(rect[2] - rect[0], 2), round(rect[3] - rect[1], 2), background)
+        annot[NameObject('/AP')] = DictionaryObject({NameObject('/N'): appearance})
+        return annot
+
+
+def register_default_font(acro_form, acro_form_ref, font_ref):
+    """
+    把共享资源字体登记到 /AcroForm /DR /Font（/DA 中的字体名由此解析）
+
+    Args:
+        acro_form: /AcroForm 字典
+        acro_form_ref: 包含 /AcroForm 字典的间接对象引用（增量更新时用于确定需要重写的对象）
+        font_ref: 字体的间接对象引用
+
+    Returns:
+        被修改的间接对象引用（/AcroForm 或其间接的 /DR、/Font）；已登记时返回None
+    """
+    owner = acro_form_ref
+    parent = acro_form
+    for key in ('/DR', '/Font'):
+        raw = parent.raw_get(key) if key in parent else None
+        if isinstance(raw, IndirectObject):
+            owner = raw
+            parent = raw.get_object()
+        elif isinstance(raw, DictionaryObject):
+            parent = raw
+        else:
+            child = DictionaryObject()
+            parent[NameObject(key)] = child
+            parent = child
+    if FONT_RESOURCE_NAME in parent:
+        return None
+    parent[NameObject(FONT_RESOURCE_NAME)] = font_ref
+    return owner
+
+
+def build_page_annotations(page_index, rects, resources=None):
+    """
+    构建一页的FreeText注解字典（不加入文档）
+
+    Args:
+        page_index: 页面索引 (0-based)
+        rects (list): 该页的矩形列表
+        resources: SharedAnnotationResources（共享资源模式），None 时每个注解独立构建
+
+    Returns:
+        list: 注解字典
+    """
+    if resources is not None:
+        return [resources.build_annotation(rect_data, page_index + 1, index) for index, rect_data in enumerate(rects)]
+    return [build_freetext_annotation(rect_data, page_index + 1, index) for index, rect_data in enumerate(rects)]
+
+
+def add_annotations_to_page(writer, page_index, rects, resources=None):
     """
     在指定页面添加FreeText注解
     
@@ -120,66 +530,290 @@ def add_annotations_to_page(writer, page_index, rects):
         writer: PdfWriter对象
         page_index: 页面索引 (0-based)
         rects (list): 该页的矩形列表
+        resources: SharedAnnotationResources（共享资源模式），None 时每个注解独立构建
     """
-    for rect_data in rects:
-        # 提取矩形参数并确保坐标精度
-        rect_raw = rect_data["rect"]  # [x0, y0, x1, y1] pypdf坐标
-        rect = [round(coord, 2) for coord in rect_raw]  # 保留2位小数避免精度问题
-        text = rect_data.get("text", "")
-        
-        # 背景颜色转换：从RGB 0-1数组转为十六进制字符串
-        bg_hex = None
-        if isinstance(rect_data.get("background_color"), (list, tuple)) and len(rect_data["background_color"]) == 3:
-            bg_hex = rgb01_to_hex(rect_data["background_color"])
-        
-        # 创建FreeText注释
-        annot = FreeText(
-            text=text,
-            rect=rect,                     # [x0, y0, x1, y1] pypdf坐标 - 已经设置了Rect
-            font="Helvetica",              # 通用字体
-            font_size="13pt",              # 与原Widget字段一致的字号
-            font_color="000000",           # 黑色字体
-            border_color="000000",         # 黑色边框
-            background_color=bg_hex,       # 动态背景色或None（透明）
-            bold=True,                     # 粗体，与原设计一致
-            italic=False
-        )
-        
+    for annot in build_page_annotations(page_index, rects, resources):
         # 添加到指定页面
         writer.add_annotation(page_number=page_index, annotation=annot)
 
 
+def _read_startxref(f):
+    """读取文件末尾 startxref 指向的偏移量"""
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    f.seek(max(0, size - 2048))
+    tail = f.read()
+    marker = tail.rfind(b'startxref')
+    if marker < 0:
+        raise ValueError('找不到 startxref，无法增量更新')
+    return int(tail[marker + len(b'startxref'):].split()[0])
+
+
+def _write_xref_table(out, offsets, trailer):
+    """写出传统 xref 表 + trailer（原文件使用 xref 表时）"""
+    xref_offset = out.tell()
+    out.write(b'xref\n')
+    # 第一段总是从 0 号空闲对象开始：首段不从 0 开始时 pypdf 会判定为"非零起始"的
+    # 损坏表并尝试重新编号对象
+    ids = [0] + sorted(offsets)
+    start = 0
+    while start < len(ids):
+        end = start
+        while end + 1 < len(ids) and ids[end + 1] == ids[end] + 1:
+            end += 1
+        out.write(f"{ids[start]} {end - start + 1}\n".encode())
+        for idnum in ids[start:end + 1]:
+            if idnum == 0:
+                out.write(b'0000000000 65535 f\r\n')
+                continue
+            offset, generation = offsets[idnum]
+            out.write(f"{offset:010d} {generation:05d} n\r\n".encode())
+        start = end + 1
+    out.write(b'trailer\n')
+    trailer.write_to_stream(out)
+    out.write(f"\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+
+def _write_xref_stream(out, offsets, trailer, xref_id):
+    """写出 xref 流（原文件使用 xref 流时）"""
+    offsets = dict(offsets)
+    xref_offset = out.tell()
+    offsets[xref_id] = (xref_offset, 0)
+    ids = sorted(offsets)
+    index = []
+    start = 0
+    while start < len(ids):
+        end = start
+        while end + 1 < len(ids) and ids[end + 1] == ids[end] + 1:
+            end += 1
+        index.extend([ids[start], end - start + 1])
+        start = end + 1
+
+    xref = StreamObject()
+    xref.update(trailer)
+    xref[NameObject('/Type')] = NameObject('/XRef')
+    xref[NameObject('/W')] = ArrayObject([NumberObject(1), NumberObject(8), NumberObject(2)])
+    xref[NameObject('/Index')] = ArrayObject([NumberObject(n) for n in index])
+    xref.set_data(b''.join(
+        b'\x01' + offsets[idnum][0].to_bytes(8, 'big') + offsets[idnum][1].to_bytes(2, 'big')
+        for idnum in ids
+    ))
+    out.write(f"{xref_id} 0 obj\n".encode())
+    xref.write_to_stream(out)
+    out.write(f"\nendobj\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+
+def update_form_annotations(pdf_path: str, rects_by_page: Dict[str, List[Dict[str, Any]]],
+                            form_keys: List[str], output_path: Optional[str] = None,
+                            page_numbers: Optional[List[int]] = None,
+                            shared_resources: bool = False) -> Dict[str, Any]:
+    """
+    增量更新已注解PDF中指定Form的注解（追加写入，不重写原有页面内容）
+
+    删除 /NM 标记属于 form_keys 的旧注解、添加 rects_by_page 中的新注解，然后只把
+    新注解对象、被修改的页面字典（或 /Annots 数组）和新的 xref 段追加到文件末尾。
+    PdfReader 按需解析对象，因此耗时与被修改页面的注解数量成正比，而非整个文档。
+
+    只检查 rects_by_page 与 page_numbers 涉及的页面；被删除的旧注解对象成为不再被
+    引用的孤立对象，由下一次完整重绘清理。
+
+    Args:
+        pdf_path (str): 由 annotate_pdf / annotate_pdf_batches 生成的已注解PDF
+        rects_by_page (dict): 这些Form的新矩形（按页码组织）
+        form_keys (list): 需要替换注解的Form键名
+        output_path (str): 输出路径；省略或与 pdf_path 相同时原地追加
+        page_numbers (list): 这些Form可能已有注解的其他页码（1-based）
+        shared_resources (bool): 共享字体/外观流资源；复用文档中已登记的字体
+
+    Returns:
+        dict: 处理结果统计
+    """
+    if not os.path.exists(pdf_path):
+        raise FileNotFoundError(f"已注解PDF文件不存在: {pdf_path}")
+
+    if output_path and os.path.abspath(output_path) != os.path.abspath(pdf_path):
+        shutil.copyfile(pdf_path, output_path)
+        pdf_path = output_path
+
+    target_forms = set(form_keys or [])
+    original_size = os.path.getsize(pdf_path)
+
+    with open(pdf_path, 'rb') as f:
+        reader = PdfReader(f)
+        if reader.is_encrypted:
+            raise ValueError('加密PDF不支持增量更新')
+        startxref = _read_startxref(f)
+        f.seek(startxref)
+        uses_xref_table = f.read(4) == b'xref'
+
+        total_pages = len(reader.pages)
+        next_id = int(reader.trailer['/Size'])
+        modified = {}      # idnum -> (generation, object)
+        new_objects = []   # (idnum, object)
+
+        def add_object(obj):
+            nonlocal next_id
+            new_objects.append((next_id, obj))
+            next_id += 1
+            return IndirectObject(next_id - 1, 0, reader)
+
+        resources = None
+        if shared_resources:
+            font_ref = SharedAnnotationResources.find_font(reader)
+            resources = SharedAnnotationResources(add_object, font_ref)
+            root_ref = reader.trailer.raw_get('/Root')
+            root = root_ref.get_object()
+            if font_ref is None and '/AcroForm' in root:
+                # 新建的字体登记到已有的 /AcroForm /DR，并重写被修改的对象
+                raw_acro_form = root.raw_get('/AcroForm')
+                acro_form_ref = raw_acro_form if isinstance(raw_acro_form, IndirectObject) else root_ref
+                owner = register_default_font(raw_acro_form.get_object(), acro_form_ref, resources.font_ref)
+                if owner is not None:
+                    modified[owner.idnum] = (owner.generation, owner.get_object())
+        removed = 0
+        added = 0
+        touched_pages = 0
+
+        # 新矩形所在页面 + 调用方指定的该Form其他页面（旧注解可能在这些页上）
+        # 只添加属于目标Form的矩形（未标记Form的注解之后无法再被增量替换）
+        pages_to_update = {
+            int(page_key): [rect for rect in rects or [] if rect.get('form_name') in target_forms]
+            for page_key, rects in rects_by_page.items()
+        }
+        for page_number in page_numbers or []:
+            pages_to_update.setdefault(int(page_number), [])
+
+        for page_number, rects in sorted(pages_to_update.items()):
+            if not 1 <= page_number <= total_pages:
+                continue
+            page = reader.pages[page_number - 1]
+            page_ref = page.indirect_reference
+
+            raw_annots = page.raw_get('/Annots') if '/Annots' in page else None
+            if isinstance(raw_annots, IndirectObject):
+                # /Annots 为间接数组时只需改写该数组对象
+                annots = raw_annots.get_object()
+                modified[raw_annots.idnum] = (raw_annots.generation, annots)
+            else:
+                if not isinstance(raw_annots, ArrayObject):
+                    raw_annots = ArrayObject()
+                    page[NameObject('/Annots')] = raw_annots
+                annots = raw_annots
+                modified[page_ref.idnum] = (page_ref.generation, page)
+
+            kept = ArrayObject()
+            for annot_ref in annots:
+                annot = annot_ref.get_object() if isinstance(annot_ref, IndirectObject) else annot_ref
+                if form_of_annotation_name(annot.get('/NM')) in target_forms:
+                    removed += 1
+                else:
+                    kept.append(annot_ref)
+
+            for index, rect_data in enumerate(rects):
+                if resources is not None:
+                    annot = resources.build_annotation(rect_data, page_number, index)
+                else:
+                    annot = DictionaryObject(build_freetext_annotation(rect_data, page_number, index))
+                annot[NameObject('/P')] = page_ref
+                kept.append(add_object(annot))
+                added += 1
+
+            annots[:] = kept
+            touched_pages += 1
+
+        trailer = DictionaryObject()
+        for key in ('/Root', '/Info', '/ID'):
+            if key in reader.trailer:
+                trailer[NameObject(key)] = reader.trailer.raw_get(key)
+        trailer[NameObject('/Prev')] = NumberObject(startxref)
+
+        offsets = {}
+        with open(pdf_path, 'r+b') as out:
+            out.seek(0, os.SEEK_END)
+            try:
+                out.write(b'\n')
+                for idnum, (generation, obj) in sorted(modified.items()):
+                    offsets[idnum] = (out.tell(), generation)
+                    out.write(f"{idnum} {generation} obj\n".encode())
+                    obj.write_to_stream(out)
+                    out.write(b'\nendobj\n')
+                for idnum, obj in new_objects:
+                    offsets[idnum] = (out.tell(), 0)
+                    out.write(f"{idnum} 0 obj\n".encode())
+                    obj.write_to_stream(out)
+                    out.write(b'\nendobj\n')
+
+                if uses_xref_table:
+                    trailer[NameObject('/Size')] = NumberObject(next_id)
+                    _write_xref_table(out, offsets, trailer)
+                else:
+                    trailer[NameObject('/Size')] = NumberObject(next_id + 1)
+                    _write_xref_stream(out, offsets, trailer, next_id)
+            except Exception:
+                # 追加失败时截断回原长度，保持原文件可用
+                out.truncate(original_size)
+                raise
+
+    file_size = os.path.getsize(pdf_path)
+    return {
+        'success': True,
+        'output_path': pdf_path,
+        'output_path_absolute': os.path.abspath(pdf_path),
+        'total_pages': total_pages,
+        'processed_pages': touched_pages,
+        'forms': sorted(target_forms),
+        'removed_annotations': removed,
+        'added_annotations': added,
+        'appended_bytes': file_size - original_size,
+        'file_size': file_size
+    }
+
+
 def main():
     """
     命令行入口函数
     """
-    if len(sys.argv) != 4:
-        print("使用方法:")
-        print("python pdf_annotate.py <source_path> <rects_json> <output_path>")
-        print("")
-        print("参数说明:")
-        print("  source_path: 原始PDF文件路径")
-        print("  rects_json:  矩形数据JSON字符串或文件路径")
-        print("  output_path: 输出PDF文件路径")
-        sys.exit(1)
-    
-    source_path = sys.argv[1]
-    rects_input = sys.argv[2]
-    output_path = sys.argv[3]
-    
+    parser = argparse.ArgumentParser(description='在PDF上绘制FreeText注解')
+    parser.add_argument('source_path', help='原始PDF文件路径（--update-forms 时为已注解PDF）')
+    parser.add_argument('rects', help="矩形数据文件路径（JSON或二进制）或JSON字符串，'-' 表示从stdin读取")
+    parser.add_argument('output_path', nargs='?', help='输出PDF文件路径（--update-forms 时可省略，原地追加）')
+    parser.add_argument('--format', dest='rects_format', choices=['auto', 'json', 'binary'], default='auto',
+                        help='矩形数据格式（默认auto：按文件头识别二进制）')
+    parser.add_argument('--inline', action='store_true',
+                        help='rects 参数按JSON字符串解析（不是已存在的文件路径时也会自动按JSON解析）')
+    parser.add_argument('--update-forms', metavar='FORM_KEYS_JSON',
+                        help='增量更新：只替换这些Form（JSON数组）的注解')
+    parser.add_argument('--pages', metavar='PAGES_JSON', help='增量更新时额外检查的页码（JSON数组）')
+    parser.add_argument('--shared-resources', action='store_true',
+                        help='共享字体与外观流（单行外观流，不换行/缩小字号）；默认每个注解独立构建FreeText')
+    args = parser.parse_args()
+
+    if not args.update_forms and not args.output_path:
+        parser.error('缺少 output_path')
+
     try:
-        # 解析矩形数据
-        if os.path.exists(rects_input):
-            # 从文件读取
-            with open(rects_input, 'r', encoding='utf-8') as f:
-                rects_by_page = json.load(f)
-            print(f"📄 从文件读取矩形数据: {rects_input}")
+        # 解析矩形数据：'-' 读stdin，已存在的路径读文件，否则按JSON字符串解析（与原命令行兼容）
+        if args.inline or (args.rects != '-' and not os.path.exists(args.rects)):
+            rects = json.loads(args.rects)
         else:
-            # 直接解析JSON字符串
-            rects_by_page = json.loads(rects_input)
-        
-        # 执行注解
-        result = annotate_pdf(source_path, rects_by_page, output_path)
+            rects = load_rects(args.rects, args.rects_format)
+            if args.rects != '-':
+                print(f"📄 从文件读取矩形数据: {args.rects}")
+
+        if args.update_forms:
+            result = update_form_annotations(
+                args.source_path, merge_rect_batches(rects), json.loads(args.update_forms),
+                output_path=args.output_path,
+                page_numbers=json.loads(args.pages) if args.pages else None,
+                shared_resources=args.shared_resources
+            )
+            print(f"✅ 增量更新完成: 删除 {result['removed_annotations']}，新增 {result['added_annotations']}，追加 {result['appended_bytes']} 字节")
+        # 执行注解（数组/二进制表示按顺序处理的多个批次）
+        elif isinstance(rects, list):
+            result = annotate_pdf_batches(args.source_path, rects, args.output_path, args.shared_resources)
+            print(f"✅ 批次完成: 成功 {result['succeeded_batches']}，失败 {result['failed_batches']}，跳过 {result['skipped_batches']}")
+        else:
+            result = annotate_pdf(args.source_path, rects, args.output_path, args.shared_resources)
             
     except Exception as e:
         print(f"❌ 处理失败: {e}")
@@ -187,4 +821,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
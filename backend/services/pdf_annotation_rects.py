@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+PDF Annotation Rects - File/stdin transport for annotation rectangles
+Purpose: Load rects for pdf_annotate from JSON or a compact binary layout
+         (memory-mapped when read from a file) instead of argv/inline JSON
+Author: LLX Solutions
+
+Binary layout (little-endian, written by crf_analysis/annotationRectsFile.js):
+    header   24 bytes  magic 'CRFR', u16 version, u16 reserved,
+                       u32 record_count, u32 color_count, u32 string_count, u32 batch_count
+    records  48 bytes  u16 batch, u16 page, f64 x0, f64 y0, f64 x1, f64 y1,
+                       i32 color index (-1 = none), u32 text id, u32 form id (0xFFFFFFFF = none)
+    colors   24 bytes  f64 r, f64 g, f64 b (0-1)
+    strings            u32 byte length + UTF-8 bytes (texts and form names, interned)
+
+Records are stored in drawing order; batch indexes are ascending.
+
+JSON input is either one rects_by_page object or a list of them (batches).
+"""
+
+import sys
+import json
+import mmap
+import struct
+from typing import Any, Dict, List, Union
+
+MAGIC = b'CRFR'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIII')
+RECORD = struct.Struct('<HHddddiII')
+COLOR = struct.Struct('<ddd')
+STRING_LENGTH = struct.Struct('<I')
+NO_FORM = 0xFFFFFFFF
+
+RectsByPage = Dict[str, List[Dict[str, Any]]]
+
+
+def decode_rect_batches(buffer) -> List[RectsByPage]:
+    """
+    Decode the binary layout into an ordered list of rects_by_page batches
+
+    Args:
+        buffer: bytes, memoryview or mmap holding the whole file
+
+    Returns:
+        List of {page_key: [rect, ...]} dicts, one per batch
+    """
+    with memoryview(buffer) as view:
+        magic, version, _, record_count, color_count, string_count, batch_count = HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise ValueError('Not a binary rects file (bad magic)')
+        if version != VERSION:
+            raise ValueError(f"Unsupported binary rects version: {version}")
+
+        records_start = HEADER.size
+        offset = records_start + record_count * RECORD.size
+
+        colors = [list(COLOR.unpack_from(view, offset + i * COLOR.size)) for i in range(color_count)]
+        offset += color_count * COLOR.size
+
+        strings = []
+        for _ in range(string_count):
+            (length,) = STRING_LENGTH.unpack_from(view, offset)
+            offset += STRING_LENGTH.size
+            strings.append(str(view[offset:offset + length], 'utf-8'))
+            offset += length
+
+        batches: List[RectsByPage] = [{} for _ in range(batch_count)]
+        with view[records_start:records_start + record_count * RECORD.size] as records:
+            for batch, page, x0, y0, x1, y1, color, text_id, form_id in RECORD.iter_unpack(records):
+                rect = {'page_number': page, 'rect': [x0, y0, x1, y1], 'text': strings[text_id]}
+                if color >= 0:
+                    rect['background_color'] = colors[color]
+                if form_id != NO_FORM:
+                    rect['form_name'] = strings[form_id]
+                batches[batch].setdefault(str(page), []).append(rect)
+
+    return batches
+
+
+def encode_rect_batches(batches: List[RectsByPage]) -> bytes:
+    """Encode rects_by_page batches into the binary layout (inverse of decode_rect_batches)"""
+    string_ids: Dict[str, int] = {}
+    color_ids: Dict[tuple, int] = {}
+    records = []
+
+    def intern(value, table):
+        if value not in table:
+            table[value] = len(table)
+        return table[value]
+
+    for batch_index, rects_by_page in enumerate(batches):
+        for page_key, rects in rects_by_page.items():
+            for rect_data in rects or []:
+                color = rect_data.get('background_color')
+                color_id = intern(tuple(color), color_ids) if isinstance(color, (list, tuple)) and len(color) == 3 else -1
+                # Same interning order as annotationRectsFile.js (text, then form) so both encoders emit identical bytes
+                text_id = intern(rect_data.get('text', ''), string_ids)
+                form_name = rect_data.get('form_name')
+                form_id = intern(form_name, string_ids) if form_name else NO_FORM
+                x0, y0, x1, y1 = rect_data['rect']
+                records.append(RECORD.pack(batch_index, int(page_key), x0, y0, x1, y1, color_id, text_id, form_id))
+
+    parts = [HEADER.pack(MAGIC, VERSION, 0, len(records), len(color_ids), len(string_ids), len(batches))]
+    parts.extend(records)
+    parts.extend(COLOR.pack(*color) for color in color_ids)
+    for value in string_ids:
+        encoded = value.encode('utf-8')
+        parts.append(STRING_LENGTH.pack(len(encoded)))
+        parts.append(encoded)
+    return b''.join(parts)
+
+
+def _parse_payload(data: bytes, rects_format: str) -> Union[RectsByPage, List[RectsByPage]]:
+    if rects_format == 'binary' or (rects_format == 'auto' and data[:4] == MAGIC):
+        return decode_rect_batches(data)
+    return json.loads(data)
+
+
+def load_rects(path: str, rects_format: str = 'auto') -> Union[RectsByPage, List[RectsByPage]]:
+    """
+    Load annotation rects from a file or stdin
+
+    Args:
+        path: File path, or '-' for stdin
+        rects_format: 'json', 'binary' or 'auto' (binary when the data starts with the magic)
+
+    Returns:
+        rects_by_page dict (JSON object) or list of batches (JSON array / binary)
+    """
+    if rects_format not in ('auto', 'json', 'binary'):
+        raise ValueError(f"Unknown rects format: {rects_format}")
+
+    if path == '-':
+        return _parse_payload(sys.stdin.buffer.read(), rects_format)
+
+    with open(path, 'rb') as f:
+        if rects_format == 'json' or (rects_format == 'auto' and f.read(4) != MAGIC):
+            f.seek(0)
+            return json.load(f)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return decode_rect_batches(mapped)
+
+
+def merge_rect_batches(loaded: Union[RectsByPage, List[RectsByPage]]) -> RectsByPage:
+    """Merge a batch list into one rects_by_page in batch order (dicts pass through)"""
+    if isinstance(loaded, dict):
+        return loaded
+    merged: RectsByPage = {}
+    for rects_by_page in loaded:
+        for page_key, rects in rects_by_page.items():
+            merged.setdefault(page_key, []).extend(rects)
+    return merged
+
+
+def load_rects_by_page(path: str, rects_format: str = 'auto') -> RectsByPage:
+    """Load rects for a single annotation pass; binary/array input is merged in batch order"""
+    return merge_rect_batches(load_rects(path, rects_format))
+
+
+def load_rect_batches(path: str, rects_format: str = 'auto') -> List[RectsByPage]:
+    """Load rects as an ordered batch list; a single JSON object becomes one batch"""
+    loaded = load_rects(path, rects_format)
+    return [loaded] if isinstance(loaded, dict) else loaded
+
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+PDF Extraction Cache - On-disk cache for pdfplumber extraction results
+Purpose: Return stored results for PDFs that were already extracted, keyed by
+         file SHA-256 + extractor name/version + options, without opening the PDF
+Author: LLX Solutions
+
+Entries are JSON files (whole results) or NDJSON files (streamed record
+sequences) in the cache directory. Reads refresh the file mtime, and the
+least recently used entries are evicted once the directory exceeds its size
+budget.
+
+Environment:
+    PDF_EXTRACTION_CACHE_DIR     cache directory (default: backend/temp/extraction_cache)
+    PDF_EXTRACTION_CACHE_MAX_MB  size budget in MB (default: 512)
+"""
+
+import os
+import sys
+import json
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import pdfplumber
+
+from pdf_source import PdfSource, is_pdf_bytes
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'temp', 'extraction_cache')
+DEFAULT_MAX_MB = 512
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(file_path: str) -> str:
+    """Hash a file in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_sha256(source: PdfSource) -> str:
+    """Hash a PDF source (file path or in-memory bytes)"""
+    if is_pdf_bytes(source):
+        return hashlib.sha256(source).hexdigest()
+    return file_sha256(source)
+
+
+class ExtractionCache:
+    """Size-bounded LRU cache of extraction results stored as JSON files"""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.cache_dir = cache_dir or os.environ.get('PDF_EXTRACTION_CACHE_DIR') or DEFAULT_CACHE_DIR
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get('PDF_EXTRACTION_CACHE_MAX_MB', DEFAULT_MAX_MB)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(content_hash: str, extractor: str, version: str, options: Dict[str, Any]) -> str:
+        """Build the cache key from file hash, extractor identity and output-affecting options"""
+        identity = json.dumps({
+            'sha256': content_hash,
+            'extractor': extractor,
+            'version': version,
+            'pdfplumber': pdfplumber.__version__,
+            'options': options
+        }, sort_keys=True)
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key: str, suffix: str = '.json') -> str:
+        return os.path.join(self.cache_dir, f"{key}{suffix}")
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the stored result for key (refreshing its LRU position) or None"""
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self._count(hit=False)
+            return None
+        self._count(hit=True)
+        return result
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """Store a result atomically, then evict down to the size budget"""
+        payload = json.dumps(result, ensure_ascii=False).encode('utf-8')
+        if len(payload) > self.max_bytes:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def _entries(self):
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return entries
+        for name in names:
+            if not name.endswith(('.json', '.ndjson')):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+                total -= size
+                with self._lock:
+                    self.evictions += 1
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process plus current on-disk usage"""
+        entries = self._entries()
+        return {
+            'cache_dir': self.cache_dir,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes
+        }
+
+    def cached(self, extractor: str, version: str, file_path: PdfSource, options: Dict[str, Any],
+               compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Return the cached result for this file/extractor/options, computing and storing it on a miss
+
+        Args:
+            extractor: Extractor name (e.g. 'process_pdf_simple')
+            version: Extractor version; bump it whenever the output format changes
+            file_path: PDF file path or bytes (hashed, never opened with pdfplumber on a hit)
+            options: Options that change the output
+            compute: Callable producing the result on a miss
+
+        Returns:
+            Extraction result; only successful results are stored
+        """
+        try:
+            key = self.make_key(source_sha256(file_path), extractor, version, options)
+        except OSError:
+            # Let the extractor report missing/unreadable files in its usual format
+            return compute()
+
+        result = self.get(key)
+        if result is not None:
+            return result
+
+        result = compute()
+        if result.get('success'):
+            try:
+                self.put(key, result)
+            except OSError as e:
+                print(f"🐍 WARNING: Failed to write extraction cache entry: {str(e)}", file=sys.stderr)
+        return result
+
+    def cached_records(self, extractor: str, version: str, file_path: PdfSource, options: Dict[str, Any],
+                       compute: Callable[[], Iterator[Dict[str, Any]]]) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming counterpart of cached(): replay a stored NDJSON record stream line by
+        line on a hit, or pass computed records through while writing them to disk
+
+        The entry is only kept when the final record is a summary with success=True,
+        so memory stays flat on both hits and misses.
+        """
+        try:
+            key = self.make_key(source_sha256(file_path), extractor, version, options)
+        except OSError:
+            yield from compute()
+            return
+
+        path = self._entry_path(key, '.ndjson')
+        try:
+            cached_file = open(path, 'r', encoding='utf-8')
+        except OSError:
+            cached_file = None
+
+        if cached_file is not None:
+            self._count(hit=True)
+            with cached_file:
+                os.utime(path)
+                for line in cached_file:
+                    yield json.loads(line)
+            return
+
+        self._count(hit=False)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        complete = False
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as out:
+                for record in compute():
+                    out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    yield record
+                    if record.get('type') == 'summary':
+                        complete = bool(record.get('success'))
+            if complete and os.path.getsize(tmp_path) <= self.max_bytes:
+                os.replace(tmp_path, path)
+                self.evict()
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+_default_cache: Optional[ExtractionCache] = None
+
+
+def get_extraction_cache() -> ExtractionCache:
+    """Process-wide cache instance (counters accumulate across calls in the PDF worker)"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ExtractionCache()
+    return _default_cache
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+PDF Metrics Helper - Opt-in per-page timing and profiling for the pdfplumber extractors
+Purpose: Record per-page, per-phase timings (layout, text, tables, words) and
+         layout object counts, summarize them as a 'metrics' block, and
+         optionally dump a cProfile/pstats file for a whole extraction; also
+         reports the peak RSS of low-memory extractions
+Author: LLX Solutions
+
+Phase timings are milliseconds. 'layout' is pdfminer's page parse (the first
+access to page.objects); the later phases reuse the parsed objects, so the
+phases add up to the page total. JSON encoding is timed where the result is
+actually serialized (see dumps_with_metrics / iter_ndjson_lines).
+"""
+
+import sys
+import json
+import time
+import cProfile
+import pstats
+import resource
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# Layout object types counted per page (pdfplumber object type -> metrics key)
+COUNTED_OBJECTS = {'char': 'chars', 'line': 'lines', 'rect': 'rects', 'curve': 'curves', 'image': 'images'}
+# Pages listed in the summary's slowest_pages
+SLOWEST_PAGES = 5
+# Rows of the cumulative pstats listing printed after a profiled run
+PROFILE_PRINT_LIMIT = 25
+
+# Set by note_pool_started() when the current job starts a page pool (cleared by reset_peak_rss)
+_pool_started = False
+
+
+class PageMetrics:
+    """Timings and object counts for one page"""
+
+    def __init__(self, page_number: int):
+        self.page_number = page_number
+        self.phases: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time the enclosed block as phase `name` (repeated phases accumulate)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    def count_layout(self, page):
+        """Parse the page layout (timed as 'layout') and count its objects"""
+        with self.phase('layout'):
+            objects = page.objects
+        for object_type, key in COUNTED_OBJECTS.items():
+            self.counts[key] = len(objects.get(object_type, []))
+
+    def count(self, key: str, value: int):
+        self.counts[key] = self.counts.get(key, 0) + value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'page': self.page_number,
+            'total_ms': round(sum(self.phases.values()), 3),
+            'phases_ms': {name: round(ms, 3) for name, ms in self.phases.items()},
+            'counts': dict(self.counts)
+        }
+
+
+class _NullPageMetrics:
+    """Stand-in used when metrics are off; every call is a no-op"""
+
+    @contextmanager
+    def phase(self, name: str):
+        yield
+
+    def count_layout(self, page):
+        pass
+
+    def count(self, key: str, value: int):
+        pass
+
+
+NULL_PAGE_METRICS = _NullPageMetrics()
+
+
+def page_metrics(page_number: int, enabled: bool):
+    """PageMetrics for this page, or the shared no-op instance when disabled"""
+    return PageMetrics(page_number) if enabled else NULL_PAGE_METRICS
+
+
+def build_metrics_block(pages: List[Dict[str, Any]], wall_seconds: float) -> Dict[str, Any]:
+    """
+    Summarize per-page metrics dicts (PageMetrics.to_dict) into the result 'metrics' block
+
+    Args:
+        pages: Per-page metrics in page order
+        wall_seconds: Wall time of the whole extraction (includes opening the PDF)
+
+    Returns:
+        {'wall_ms', 'pages_measured', 'phase_totals_ms', 'count_totals',
+         'slowest_pages', 'json_encode_ms', 'pages'}
+    """
+    phase_totals: Dict[str, float] = {}
+    count_totals: Dict[str, int] = {}
+    for page in pages:
+        for name, ms in page['phases_ms'].items():
+            phase_totals[name] = phase_totals.get(name, 0.0) + ms
+        for key, value in page['counts'].items():
+            count_totals[key] = count_totals.get(key, 0) + value
+
+    slowest = sorted(pages, key=lambda p: p['total_ms'], reverse=True)[:SLOWEST_PAGES]
+    return {
+        'wall_ms': round(wall_seconds * 1000, 3),
+        'pages_measured': len(pages),
+        'phase_totals_ms': {name: round(ms, 3) for name, ms in phase_totals.items()},
+        'count_totals': count_totals,
+        'slowest_pages': [{'page': p['page'], 'total_ms': p['total_ms']} for p in slowest],
+        # Filled in by dumps_with_metrics when the result is serialized
+        'json_encode_ms': None,
+        'pages': pages
+    }
+
+
+def dumps_with_metrics(result: Dict[str, Any]) -> str:
+    """
+    json.dumps a result, timing the encode into result['metrics']['json_encode_ms']
+
+    The result is encoded without its metrics block, then the (small) block is
+    encoded and appended, so the payload is only encoded once. An existing
+    json_encode_ms value is added to.
+    """
+    metrics = result.get('metrics')
+    if not isinstance(metrics, dict):
+        return json.dumps(result, ensure_ascii=False)
+
+    payload = {key: value for key, value in result.items() if key != 'metrics'}
+    start = time.perf_counter()
+    body = json.dumps(payload, ensure_ascii=False)
+    # Streamed summaries arrive with the time already spent on their page records
+    metrics['json_encode_ms'] = round((metrics.get('json_encode_ms') or 0) + (time.perf_counter() - start) * 1000, 3)
+
+    metrics_json = json.dumps(metrics, ensure_ascii=False)
+    if body == '{}':
+        return '{"metrics": ' + metrics_json + '}'
+    return body[:-1] + ', "metrics": ' + metrics_json + '}'
+
+
+def iter_ndjson_lines(records: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    """
+    Encode a record stream as NDJSON lines; a summary record carrying a metrics
+    block gets the total encode time of the stream (page records + summary)
+    """
+    encode_seconds = 0.0
+    for record in records:
+        if record.get('type') == 'summary' and isinstance(record.get('metrics'), dict):
+            record['metrics']['json_encode_ms'] = round(encode_seconds * 1000, 3)
+            yield dumps_with_metrics(record)
+            continue
+        start = time.perf_counter()
+        line = json.dumps(record, ensure_ascii=False)
+        encode_seconds += time.perf_counter() - start
+        yield line
+
+
+def _ru_maxrss_kb(who: int) -> int:
+    """ru_maxrss in KB (Linux reports KB, macOS bytes)"""
+    peak = resource.getrusage(who).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def reset_peak_rss():
+    """
+    Reset this process's peak RSS so peak_rss_mb() covers the next job only
+    (Linux; elsewhere the peak stays the process lifetime high-water mark)
+    """
+    global _pool_started
+    _pool_started = False
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        pass
+
+
+def note_pool_started():
+    """Record that the current job started a page pool (see peak_rss_fields)"""
+    global _pool_started
+    _pool_started = True
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size in MB of this process since reset_peak_rss()"""
+    peak_kb = None
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    peak_kb = int(line.split()[1])
+                    break
+    except OSError:
+        pass
+    if peak_kb is None:
+        peak_kb = _ru_maxrss_kb(resource.RUSAGE_SELF)
+    return round(peak_kb / 1024, 1)
+
+
+def peak_rss_fields() -> Dict[str, float]:
+    """
+    'peak_rss_mb' of this process, plus 'pool_peak_rss_mb' when the job started
+    a page pool since reset_peak_rss()
+
+    The pool figure is the largest peak of any finished pool worker of this
+    process (RUSAGE_CHILDREN cannot be reset), so in a long-lived worker it may
+    come from an earlier page-parallel job.
+    """
+    fields = {'peak_rss_mb': peak_rss_mb()}
+    if _pool_started:
+        fields['pool_peak_rss_mb'] = round(_ru_maxrss_kb(resource.RUSAGE_CHILDREN) / 1024, 1)
+    return fields
+
+
+@contextmanager
+def profiled(profile_path: Optional[str]) -> Iterator[None]:
+    """
+    Run the enclosed block under cProfile and dump pstats to profile_path
+    (no-op when profile_path is empty)
+
+    The top entries by cumulative time are also printed to stderr. Only the
+    current process is profiled; page chunks run in a process pool are not.
+    """
+    if not profile_path:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(profile_path)
+        print(f"🐍 Profile written to {profile_path}", file=sys.stderr)
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(PROFILE_PRINT_LIMIT)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+PDF Page Parallel Helper - Split page ranges across a process pool
+Purpose: Let the pdfplumber extractors use several cores on long documents
+         while returning per-page results in page order
+Author: LLX Solutions
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, List, Tuple
+
+from pdf_metrics import note_pool_started
+
+# More than one chunk per worker so a few slow pages do not leave other cores idle;
+# kept small because every chunk re-opens the PDF
+CHUNKS_PER_WORKER = 2
+
+
+def effective_workers(workers: int, total_pages: int) -> int:
+    """Clamp the requested worker count to available CPUs and page count"""
+    return max(1, min(workers or 1, os.cpu_count() or 1, total_pages))
+
+
+def iter_numbered_pages(pdf, page_numbers: Iterable[int], release: bool = False) -> Iterator[Tuple[int, Any]]:
+    """
+    Yield (page_number, page) for 1-based page numbers of an open pdfplumber PDF
+
+    With release set, each page is closed once the caller asks for the next one,
+    dropping its parsed layout objects and text map; otherwise pdfplumber keeps
+    them for every page visited until the PDF is closed.
+    """
+    for page_number in page_numbers:
+        page = pdf.pages[page_number - 1]
+        yield page_number, page
+        if release:
+            page.close()
+
+
+def split_page_range(total_pages: int, workers: int, chunks_per_worker: int = CHUNKS_PER_WORKER) -> List[Tuple[int, int]]:
+    """
+    Split [0, total_pages) into contiguous 0-based [start, end) chunks
+
+    Args:
+        total_pages: Number of pages in the document
+        workers: Number of worker processes
+        chunks_per_worker: Chunks to create per worker for load balancing
+
+    Returns:
+        List of (start, end) tuples covering every page exactly once, in order
+    """
+    if total_pages <= 0:
+        return []
+    chunk_count = max(1, min(total_pages, workers * chunks_per_worker))
+    chunk_size, remainder = divmod(total_pages, chunk_count)
+
+    ranges = []
+    start = 0
+    for i in range(chunk_count):
+        end = start + chunk_size + (1 if i < remainder else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def iter_page_results(range_fn: Callable[..., List[Any]], source: Any, total_pages: int,
+                      workers: int, *args: Any) -> Iterator[Any]:
+    """
+    Run range_fn(source, start, end, *args) on page chunks in a process pool
+
+    Each worker opens the PDF itself; range_fn must be a module-level function
+    returning one result per page. Results are yielded in page order as soon as
+    every earlier chunk has finished.
+
+    Args:
+        range_fn: Picklable function extracting pages [start, end)
+        source: PDF path (or bytes) passed through to range_fn
+        total_pages: Number of pages in the document
+        workers: Maximum number of worker processes
+        *args: Extra arguments passed through to range_fn
+
+    Yields:
+        Per-page results in page order
+    """
+    ranges = split_page_range(total_pages, workers)
+    note_pool_started()
+    executor = ProcessPoolExecutor(max_workers=max(1, min(workers, len(ranges))))
+    try:
+        futures = [executor.submit(range_fn, source, start, end, *args) for start, end in ranges]
+        for future in futures:
+            for page_result in future.result():
+                yield page_result
+    finally:
+        # Drop chunks that have not started if the consumer stops early or a chunk fails
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -5,12 +5,32 @@ Purpose: Extract text and table content from PDF files using pdfplumber library
 Author: LLX Solutions
 """
 
-import pdfplumber
+from pdfplumber.table import TableSettings
+from pdfplumber.utils import filter_edges
 import json
 import sys
 import os
-from typing import Dict, Any, List
+import re
+import argparse
+from typing import Dict, Any, Callable, Iterator, List, Optional, Sequence, Union
 import datetime
+import time
+
+# Word-position helpers live with the CRF words extractor
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crf_analysis'))
+from crf_words_extractor import (build_page_words, build_words_result, empty_words_result, page_word_count,
+                                 word_payload_cache_options, WORD_FORMATS)
+from pdf_source import PdfSource, check_pdf_source, open_pdf, resolve_cli_source
+from pdf_page_parallel import effective_workers, iter_numbered_pages, iter_page_results
+from pdf_extraction_cache import get_extraction_cache
+from pdf_metrics import (page_metrics, build_metrics_block, dumps_with_metrics, iter_ndjson_lines, profiled,
+                         reset_peak_rss, peak_rss_fields)
+
+# Bump whenever the result structure or extraction logic changes (invalidates cached results)
+PDF_PROCESSOR_VERSION = '2'
+
+# Edges shorter than this are dropped by pdfplumber's table finder before merging
+TABLE_EDGE_MIN_LENGTH = TableSettings().edge_min_length_prefilter
 
 def save_debug_text(original_file_path: str, extracted_text: str):
     """
@@ -89,88 +109,612 @@ def save_debug_tables(original_file_path: str, extracted_tables: List[Dict]):
     except Exception as e:
         print(f"🐍 WARNING: Failed to save debug tables file: {str(e)}", file=sys.stderr)
 
-def process_pdf_simple(file_path: str) -> Dict[str, Any]:
+def parse_page_range(spec: Union[None, str, Sequence[int]], total_pages: int) -> List[int]:
+    """
+    Resolve a page selection into sorted, unique 1-based page numbers within the document
+    
+    Args:
+        spec: None (all pages), a string like "1-5", "3", "2,4,10-12" or "20-"
+            (open-ended), or a sequence of page numbers
+        total_pages: Number of pages in the document
+        
+    Returns:
+        Selected page numbers (out-of-range pages are dropped)
+    """
+    if spec is None or spec == '':
+        return list(range(1, total_pages + 1))
+    
+    selected = set()
+    if isinstance(spec, str):
+        for part in spec.split(','):
+            part = part.strip()
+            if not part:
+                continue
+            if '-' in part:
+                start, _, end = part.partition('-')
+                first = int(start) if start.strip() else 1
+                last = int(end) if end.strip() else total_pages
+                selected.update(range(first, last + 1))
+            else:
+                selected.add(int(part))
+    else:
+        selected.update(int(page_number) for page_number in spec)
+    
+    return sorted(page_number for page_number in selected if 1 <= page_number <= total_pages)
+
+class PageSelection:
+    """
+    Which pages process_pdf_simple visits and what it extracts from each
+    
+    Args:
+        pages: Page range (see parse_page_range); None = every page
+        text: Run extract_text() on each page
+        tables: Run extract_tables() on each page
+        stop_after: Stop once a page satisfies this predicate (that page is kept);
+            either a callable taking the page content dict, or a regex searched in
+            the page text and table cells
+        table_prefilter: Skip extract_tables() on pages without the ruling lines
+            a table needs (see page_may_contain_table)
+    """
+    
+    def __init__(self, pages: Union[None, str, Sequence[int]] = None, text: bool = True, tables: bool = True,
+                 stop_after: Union[None, str, Callable[[Dict[str, Any]], bool]] = None,
+                 table_prefilter: bool = True):
+        if not text and not tables:
+            raise ValueError('At least one of text or tables must be extracted')
+        self.pages = pages
+        self.text = text
+        self.tables = tables
+        self.stop_after = stop_after
+        self.table_prefilter = table_prefilter
+        self._stop_pattern = re.compile(stop_after) if isinstance(stop_after, str) else None
+    
+    @property
+    def is_default(self) -> bool:
+        """True when every page is fully extracted (the original process_pdf_simple behaviour)"""
+        return self.pages in (None, '') and self.text and self.tables and self.stop_after is None
+    
+    def page_numbers(self, total_pages: int) -> Optional[List[int]]:
+        """Selected page numbers, or None for every page in order"""
+        if self.pages in (None, ''):
+            return None
+        return parse_page_range(self.pages, total_pages)
+    
+    def should_stop(self, content: Dict[str, Any]) -> bool:
+        if self.stop_after is None:
+            return False
+        if self._stop_pattern is None:
+            return bool(self.stop_after(content))
+        if self._stop_pattern.search(content['text']):
+            return True
+        return any(self._stop_pattern.search(cell)
+                   for table in content['tables'] for row in table['data'] for cell in row)
+    
+    def cache_options(self) -> Optional[Dict[str, Any]]:
+        """Options identifying this selection in the extraction cache (None = not cacheable)"""
+        if callable(self.stop_after):
+            return None
+        options = {} if self.table_prefilter else {'table_prefilter': False}
+        if self.is_default:
+            return options
+        pages = self.pages if isinstance(self.pages, str) or self.pages is None else list(self.pages)
+        options.update({'pages': pages, 'text': self.text, 'tables': self.tables, 'stop_after': self.stop_after})
+        return options
+    
+    def summary_fields(self, pages_processed: List[int], stopped_at_page: Optional[int]) -> Dict[str, Any]:
+        """Extra result fields reported for non-default selections"""
+        if self.is_default:
+            return {}
+        return {'pages_processed': pages_processed, 'stopped_at_page': stopped_at_page}
+
+DEFAULT_SELECTION = PageSelection()
+
+def page_may_contain_table(page) -> bool:
+    """
+    Cheap pre-check for the default ("lines") table strategy: every table cell
+    needs two horizontal and two vertical ruling edges, and merging edges never
+    adds any, so a page with fewer edges of either orientation (after the table
+    finder's own length prefilter) cannot yield a table
+    """
+    edges = page.edges
+    return (len(filter_edges(edges, 'h', min_length=TABLE_EDGE_MIN_LENGTH)) >= 2
+            and len(filter_edges(edges, 'v', min_length=TABLE_EDGE_MIN_LENGTH)) >= 2)
+
+def extract_page_tables(page, page_number: int) -> List[Dict[str, Any]]:
+    """Run extract_tables() on one page and return the non-empty tables, cleaned"""
+    cleaned_tables = []
+    tables = page.extract_tables()
+    if tables:
+        # print(f"🐍 Page {page_number}: Found {len(tables)} tables", file=sys.stderr)
+        
+        for table_idx, table in enumerate(tables):
+            if table and len(table) > 0 and any(any(cell for cell in row) for row in table):
+                # Clean table data - remove None values and empty strings
+                cleaned_table = []
+                for row in table:
+                    cleaned_row = [str(cell).strip() if cell is not None else "" for cell in row]
+                    cleaned_table.append(cleaned_row)
+                
+                table_data = {
+                    'page': page_number,
+                    'table_index': table_idx + 1,
+                    'data': cleaned_table,
+                    'rows': len(cleaned_table),
+                    'columns': len(cleaned_table[0]) if cleaned_table else 0
+                }
+                cleaned_tables.append(table_data)
+                # print(f"🐍 Table {table_idx + 1}: {len(cleaned_table)} rows x {len(cleaned_table[0]) if cleaned_table else 0} columns", file=sys.stderr)
+    else:
+        # print(f"🐍 Page {page_number}: No tables found", file=sys.stderr)
+        pass
+    return cleaned_tables
+
+def extract_page_content(page, page_number: int, include_words: bool = False,
+                         collect_metrics: bool = False, include_text: bool = True,
+                         include_tables: bool = True, table_prefilter: bool = True,
+                         word_format: str = 'records', row_tolerance: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Extract text, tables (and optionally word boxes) from a single page
+    
+    Args:
+        page: pdfplumber Page object
+        page_number: 1-based page number
+        include_words: Also build the crf_words_extractor word payload
+        collect_metrics: Also time each phase and count layout objects
+        include_text: Run extract_text() (text stays '' otherwise)
+        include_tables: Run extract_tables() (tables stay [] otherwise)
+        table_prefilter: Skip extract_tables() when page_may_contain_table() is False
+            ('tables_skipped' is then True)
+        word_format: Word payload format, 'records' or 'columnar' (see build_page_words)
+        row_tolerance: Also group the page words into 'rows' with this Y tolerance
+        
+    Returns:
+        Dictionary with the text fragment to append to the document text,
+        the cleaned tables, and the page word payload (or its error)
+        (plus the page 'metrics' when collect_metrics is set)
+    """
+    content = {
+        'page': page_number,
+        'text': '',
+        'tables': [],
+        'words': None,
+        'words_error': None,
+        'tables_skipped': False
+    }
+    metrics = page_metrics(page_number, collect_metrics)
+    
+    try:
+        metrics.count_layout(page)
+        
+        # Extract text with visual ordering
+        if include_text:
+            with metrics.phase('text'):
+                page_text = page.extract_text()
+            
+            if page_text:
+                content['text'] += page_text + '\n\n'
+                # print(f"🐍 Page {page_number}: {len(page_text)} characters extracted", file=sys.stderr)
+        
+        # Extract tables from this page
+        if include_tables:
+            with metrics.phase('tables'):
+                if table_prefilter and not page_may_contain_table(page):
+                    content['tables_skipped'] = True
+                else:
+                    content['tables'] = extract_page_tables(page, page_number)
+        
+        # Word boxes reuse the layout objects already parsed for this page
+        if include_words:
+            try:
+                with metrics.phase('words'):
+                    content['words'] = build_page_words(page, page_number, word_format, row_tolerance)
+                metrics.count('words', page_word_count(content['words']))
+            except Exception as word_error:
+                content['words_error'] = str(word_error)
+                print(f"🐍 ERROR Page {page_number} words: {str(word_error)}", file=sys.stderr)
+            
+    except Exception as page_error:
+        # Log page processing error but continue with other pages
+        print(f"🐍 ERROR Page {page_number}: {str(page_error)}", file=sys.stderr)
+        content['text'] += f'[Page {page_number} processing failed: {str(page_error)}]\n\n'
+    
+    if collect_metrics:
+        metrics.count('tables', len(content['tables']))
+        metrics.count('tables_skipped', int(content['tables_skipped']))
+        content['metrics'] = metrics.to_dict()
+    
+    return content
+
+def _extract_page_range(file_path: PdfSource, start: int, end: int, include_words: bool,
+                        collect_metrics: bool = False, selection: PageSelection = DEFAULT_SELECTION,
+                        page_numbers: Optional[List[int]] = None,
+                        word_format: str = 'records',
+                        row_tolerance: Optional[float] = None,
+                        low_memory: bool = False) -> List[Dict[str, Any]]:
+    """
+    Process-pool entry: open the PDF independently and extract pages [start, end)
+    (positions in page_numbers when a page subset is selected)
+    """
+    with open_pdf(file_path) as pdf:
+        numbers = page_numbers[start:end] if page_numbers is not None else range(start + 1, end + 1)
+        return [extract_page_content(page, n, include_words, collect_metrics,
+                                     selection.text, selection.tables, selection.table_prefilter,
+                                     word_format, row_tolerance)
+                for n, page in iter_numbered_pages(pdf, numbers, release=low_memory)]
+
+def _iter_page_contents(pdf, file_path: PdfSource, include_words: bool, workers: int,
+                        collect_metrics: bool = False,
+                        selection: PageSelection = DEFAULT_SELECTION,
+                        word_format: str = 'records',
+                        row_tolerance: Optional[float] = None,
+                        low_memory: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Yield extract_page_content results in page order, serially or from the process pool
+    
+    Only the selected pages are visited, and iteration ends after the page that
+    satisfies the selection's stop predicate (marked with 'stopped': True).
+    With low_memory, each page is closed as soon as its content has been taken.
+    """
+    page_numbers = selection.page_numbers(len(pdf.pages))
+    page_count = len(pdf.pages) if page_numbers is None else len(page_numbers)
+    workers = effective_workers(workers, page_count)
+    if workers > 1:
+        contents = iter_page_results(_extract_page_range, file_path, page_count, workers,
+                                     include_words, collect_metrics, selection, page_numbers,
+                                     word_format, row_tolerance, low_memory)
+    else:
+        numbers = page_numbers if page_numbers is not None else range(1, page_count + 1)
+        contents = (extract_page_content(page, n, include_words, collect_metrics,
+                                         selection.text, selection.tables, selection.table_prefilter,
+                                         word_format, row_tolerance)
+                    for n, page in iter_numbered_pages(pdf, numbers, release=low_memory))
+    
+    for content in contents:
+        stop = selection.should_stop(content)
+        if stop:
+            content['stopped'] = True
+        yield content
+        if stop:
+            # Closing the pool iterator cancels chunks that have not started
+            contents.close()
+            return
+
+class LazyPdfPage:
+    """
+    One page from iter_pdf_pages; text, tables and words are extracted on first
+    access and cached, so pages (or parts) that are never read cost nothing
+    """
+    
+    def __init__(self, page, page_number: int, table_prefilter: bool = True):
+        self.page = page
+        self.page_number = page_number
+        self.table_prefilter = table_prefilter
+        self._text = None
+        self._tables = None
+        self._words = None
+    
+    @property
+    def text(self) -> str:
+        """Page text (extract_text(); '' for pages without text)"""
+        if self._text is None:
+            self._text = self.page.extract_text() or ''
+        return self._text
+    
+    @property
+    def tables(self) -> List[Dict[str, Any]]:
+        """Cleaned tables in process_pdf_simple's table format"""
+        if self._tables is None:
+            if self.table_prefilter and not page_may_contain_table(self.page):
+                self._tables = []
+            else:
+                self._tables = extract_page_tables(self.page, self.page_number)
+        return self._tables
+    
+    @property
+    def words(self) -> Dict[str, Any]:
+        """Word-position payload (crf_words_extractor format)"""
+        if self._words is None:
+            self._words = build_page_words(self.page, self.page_number)
+        return self._words
+
+def iter_pdf_pages(file_path: PdfSource, pages: Union[None, str, Sequence[int]] = None,
+                   table_prefilter: bool = True) -> Iterator[LazyPdfPage]:
+    """
+    Lazily iterate a PDF's pages; nothing is extracted until a LazyPdfPage
+    property is read, and the PDF is closed when iteration ends or is abandoned
+    
+    Example:
+        for page in iter_pdf_pages(path, pages='1-10'):
+            if 'Schedule of Assessments' in page.text:
+                tables = page.tables
+                break
+    
+    Args:
+        file_path: Path to the PDF file, or the PDF bytes
+        pages: Page range (see parse_page_range); None = every page
+        table_prefilter: Skip extract_tables() on pages without ruling lines
+        
+    Yields:
+        LazyPdfPage objects in page order
+    """
+    check_pdf_source(file_path)
+    
+    with open_pdf(file_path) as pdf:
+        # Pages already handed out are closed, releasing their parsed layout
+        for page_number, page in iter_numbered_pages(pdf, parse_page_range(pages, len(pdf.pages)), release=True):
+            yield LazyPdfPage(page, page_number, table_prefilter)
+
+def iter_pdf_records(file_path: PdfSource, include_words: bool = False, workers: int = 1,
+                     use_cache: bool = False, metrics: bool = False,
+                     pages: Union[None, str, Sequence[int]] = None, text: bool = True, tables: bool = True,
+                     stop_after: Union[None, str, Callable[[Dict[str, Any]], bool]] = None,
+                     table_prefilter: bool = True, word_format: str = 'records',
+                     row_tolerance: Optional[float] = None, low_memory: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming variant of process_pdf_simple: yield one record per page as soon as
+    it is extracted, then a final summary record
+    
+    Page records: {'type': 'page', 'page', 'text', 'tables'[, 'words']}
+        Concatenating every page 'text' and stripping the result gives the
+        'text' of process_pdf_simple; 'tables' concatenate the same way.
+    Summary record: {'type': 'summary', 'success', 'total_pages', 'total_tables',
+                     'tables_skipped_pages', 'error'[, 'words']}
+        When include_words is set, summary 'words' holds success/extraction_time/metadata;
+        page word payloads must be discarded if it reports success=False.
+        When metrics is set, the summary also carries the pdf_metrics 'metrics' block.
+        With a page selection (pages/text/tables/stop_after), the summary also has
+        'pages_processed' and 'stopped_at_page'; with low_memory, 'peak_rss_mb'
+        (plus 'pool_peak_rss_mb' when pages ran in a process pool).
+    
+    Args:
+        file_path: Path to the PDF file, or the PDF bytes
+        include_words: Also emit each page's word positions
+        workers: Number of processes to split the page range across
+        use_cache: Replay/store the record stream through the extraction cache
+            (ignored when metrics is set, which always measures a live extraction)
+        metrics: Collect per-page, per-phase timings and object counts
+        pages: Only extract these pages (see parse_page_range, e.g. "1-5")
+        text: Run extract_text() on each page (text is '' otherwise)
+        tables: Run extract_tables() on each page (tables are [] otherwise)
+        stop_after: Stop after the first page matching this predicate (callable
+            taking the page content dict) or regex (searched in page text and
+            table cells); callables bypass the cache
+        table_prefilter: Skip extract_tables() on pages that lack the ruling
+            lines a table needs; the pages skipped are listed in 'tables_skipped_pages'
+        word_format: Page word payload format, 'records' or 'columnar'
+            (crf_words_extractor.build_page_words)
+        row_tolerance: Also group each page's words into 'rows' with this Y
+            tolerance (crf_words_extractor.group_words_into_rows)
+        low_memory: Close each page once its results are recorded, so parsed
+            layout objects do not pile up across long documents, and report
+            the peak RSS of the extraction as 'peak_rss_mb'
+        
+    Yields:
+        NDJSON-ready record dictionaries
+    """
+    selection = PageSelection(pages, text, tables, stop_after, table_prefilter)
+    if low_memory:
+        reset_peak_rss()
+    cache_options = selection.cache_options()
+    if use_cache and not metrics and cache_options is not None:
+        records = get_extraction_cache().cached_records(
+            'process_pdf_simple', PDF_PROCESSOR_VERSION, file_path,
+            {'include_words': include_words, 'stream': True, **cache_options,
+             **(word_payload_cache_options(word_format, row_tolerance) if include_words else {})},
+            lambda: iter_pdf_records(file_path, include_words=include_words, workers=workers,
+                                     pages=pages, text=text, tables=tables, stop_after=stop_after,
+                                     table_prefilter=table_prefilter, word_format=word_format,
+                                     row_tolerance=row_tolerance, low_memory=low_memory)
+        )
+        for record in records:
+            if low_memory and record.get('type') == 'summary':
+                # A replayed summary carries the peak of the run that stored it
+                record.pop('pool_peak_rss_mb', None)
+                record.update(peak_rss_fields())
+            yield record
+        return
+    
+    summary = {
+        'type': 'summary',
+        'success': True,
+        'total_pages': 0,
+        'total_tables': 0,
+        'tables_skipped_pages': [],
+        'error': None
+    }
+    pages_words = 0
+    total_words = 0
+    words_failed = False
+    pages_metrics = []
+    pages_processed = []
+    stopped_at_page = None
+    start_time = time.perf_counter()
+    
+    try:
+        check_pdf_source(file_path)
+        
+        with open_pdf(file_path) as pdf:
+            summary['total_pages'] = len(pdf.pages)
+            
+            for content in _iter_page_contents(pdf, file_path, include_words, workers, metrics, selection,
+                                               word_format, row_tolerance, low_memory):
+                if metrics:
+                    pages_metrics.append(content['metrics'])
+                pages_processed.append(content['page'])
+                if content.get('stopped'):
+                    stopped_at_page = content['page']
+                record = {
+                    'type': 'page',
+                    'page': content['page'],
+                    'text': content['text'],
+                    'tables': content['tables']
+                }
+                summary['total_tables'] += len(content['tables'])
+                if content['tables_skipped']:
+                    summary['tables_skipped_pages'].append(content['page'])
+                if include_words:
+                    record['words'] = content['words']
+                    if content['words_error'] is not None:
+                        words_failed = True
+                    elif content['words'] is not None:
+                        pages_words += 1
+                        total_words += page_word_count(content['words'])
+                yield record
+                
+    except Exception as e:
+        summary['success'] = False
+        summary['error'] = str(e)
+        summary['total_pages'] = 0
+        summary['total_tables'] = 0
+        summary['tables_skipped_pages'] = []
+        print(f"🐍 ERROR: {str(e)}", file=sys.stderr)
+    
+    summary.update(selection.summary_fields(pages_processed, stopped_at_page))
+    if include_words:
+        words_ok = summary['success'] and not words_failed
+        summary['words'] = {
+            'success': words_ok,
+            'extraction_time': datetime.datetime.now().isoformat(),
+            'metadata': {
+                'total_pages': pages_words if words_ok else 0,
+                'total_words': total_words if words_ok else 0
+            }
+        }
+        if row_tolerance is not None:
+            summary['words']['y_tolerance'] = row_tolerance
+    if metrics:
+        summary['metrics'] = build_metrics_block(pages_metrics, time.perf_counter() - start_time)
+    if low_memory:
+        summary.update(peak_rss_fields())
+    
+    yield summary
+
+def process_pdf_simple(file_path: PdfSource, include_words: bool = False, workers: int = 1,
+                       use_cache: bool = False, metrics: bool = False,
+                       profile_path: str = None, pages: Union[None, str, Sequence[int]] = None,
+                       text: bool = True, tables: bool = True,
+                       stop_after: Union[None, str, Callable[[Dict[str, Any]], bool]] = None,
+                       table_prefilter: bool = True, word_format: str = 'records',
+                       row_tolerance: Optional[float] = None, low_memory: bool = False) -> Dict[str, Any]:
     """
     Enhanced PDF processing function with table extraction
     Extracts text content and tables separately from PDF file using pdfplumber
     
     Args:
-        file_path: Path to the PDF file
+        file_path: Path to the PDF file, or the PDF bytes
+        include_words: Also collect per-page word positions (same payload as
+            crf_words_extractor.extract_words_only) from the same pdfplumber pass
+        workers: Number of processes to split the page range across
+            (1 = serial; output is identical either way)
+        use_cache: Return a stored result for an identical file (by SHA-256)
+            extracted with the same options, and store new results
+            (ignored when metrics or profile_path is set)
+        metrics: Add a 'metrics' block with per-page, per-phase timings and
+            object counts (see pdf_metrics.build_metrics_block)
+        profile_path: Dump cProfile stats for the extraction to this file
+        pages: Only extract these pages (see parse_page_range, e.g. "1-5")
+        text: Run extract_text() on each page (text is '' otherwise)
+        tables: Run extract_tables() on each page (tables are [] otherwise)
+        stop_after: Stop after the first page matching this predicate (callable
+            taking the page content dict) or regex (searched in page text and
+            table cells); callables bypass the cache
+        table_prefilter: Skip extract_tables() on pages that lack the ruling
+            lines a table needs; the pages skipped are listed in 'tables_skipped_pages'
+        word_format: Page word payload format, 'records' or 'columnar'
+            (crf_words_extractor.build_page_words)
+        row_tolerance: Also group each page's words into 'rows' with this Y
+            tolerance (crf_words_extractor.group_words_into_rows)
+        low_memory: Close each page once its results are recorded, so parsed
+            layout objects do not pile up across long documents, and report
+            the peak RSS of the extraction as 'peak_rss_mb'
         
     Returns:
         Dictionary containing extracted text, tables and basic info
+        (plus 'words' when include_words is set, 'metrics' when metrics is set,
+        'pages_processed'/'stopped_at_page' when a page selection is given,
+        'peak_rss_mb' when low_memory is set, and 'pool_peak_rss_mb' if pages
+        ran in a process pool)
     """
+    selection = PageSelection(pages, text, tables, stop_after, table_prefilter)
+    if low_memory:
+        reset_peak_rss()
+    
+    if profile_path:
+        with profiled(profile_path):
+            return process_pdf_simple(file_path, include_words=include_words, workers=workers, metrics=metrics,
+                                      pages=pages, text=text, tables=tables, stop_after=stop_after,
+                                      table_prefilter=table_prefilter, word_format=word_format,
+                                      row_tolerance=row_tolerance, low_memory=low_memory)
+    
+    cache_options = selection.cache_options()
+    if use_cache and not metrics and cache_options is not None:
+        result = get_extraction_cache().cached(
+            'process_pdf_simple', PDF_PROCESSOR_VERSION, file_path,
+            {'include_words': include_words, **cache_options,
+             **(word_payload_cache_options(word_format, row_tolerance) if include_words else {})},
+            lambda: process_pdf_simple(file_path, include_words=include_words, workers=workers,
+                                       pages=pages, text=text, tables=tables, stop_after=stop_after,
+                                       table_prefilter=table_prefilter, word_format=word_format,
+                                       row_tolerance=row_tolerance, low_memory=low_memory)
+        )
+        if low_memory:
+            # A replayed result carries the peak of the run that stored it
+            result.pop('pool_peak_rss_mb', None)
+            result.update(peak_rss_fields())
+        return result
+    
     result = {
         'success': True,
         'text': '',
         'tables': [],
+        'tables_skipped_pages': [],
         'total_pages': 0,
         'error': None
     }
+    pages_metrics = []
+    pages_processed = []
+    stopped_at_page = None
+    start_time = time.perf_counter()
     
     try:
         # Check if file exists
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"PDF file not found: {file_path}")
+        check_pdf_source(file_path)
         
         # print(f"🐍 Python: Processing PDF with pdfplumber: {file_path}", file=sys.stderr)
         
         # Open PDF file with pdfplumber
-        with pdfplumber.open(file_path) as pdf:
+        with open_pdf(file_path) as pdf:
             result['total_pages'] = len(pdf.pages)
             # print(f"🐍 Python: Processing {result['total_pages']} pages", file=sys.stderr)
             
+            page_contents = _iter_page_contents(pdf, file_path, include_words, workers, metrics, selection,
+                                                word_format, row_tolerance, low_memory)
+            
             full_text = ""
             all_tables = []
+            all_pages_words = []
+            words_failed = False
             
-            # Process each page
-            for page_number, page in enumerate(pdf.pages, 1):
-                try:
-                    # Extract text with visual ordering
-                    page_text = page.extract_text()
-                    
-                    if page_text:
-                        full_text += page_text + '\n\n'
-                        # print(f"🐍 Page {page_number}: {len(page_text)} characters extracted", file=sys.stderr)
-                    else:
-                        # print(f"🐍 Page {page_number}: No text extracted", file=sys.stderr)
-                        pass
-                    
-                    # Extract tables from this page
-                    tables = page.extract_tables()
-                    if tables:
-                        # print(f"🐍 Page {page_number}: Found {len(tables)} tables", file=sys.stderr)
-                        
-                        for table_idx, table in enumerate(tables):
-                            if table and len(table) > 0 and any(any(cell for cell in row) for row in table):
-                                # Clean table data - remove None values and empty strings
-                                cleaned_table = []
-                                for row in table:
-                                    cleaned_row = [str(cell).strip() if cell is not None else "" for cell in row]
-                                    cleaned_table.append(cleaned_row)
-                                
-                                table_data = {
-                                    'page': page_number,
-                                    'table_index': table_idx + 1,
-                                    'data': cleaned_table,
-                                    'rows': len(cleaned_table),
-                                    'columns': len(cleaned_table[0]) if cleaned_table else 0
-                                }
-                                all_tables.append(table_data)
-                                # print(f"🐍 Table {table_idx + 1}: {len(cleaned_table)} rows x {len(cleaned_table[0]) if cleaned_table else 0} columns", file=sys.stderr)
-                    else:
-                        # print(f"🐍 Page {page_number}: No tables found", file=sys.stderr)
-                        pass
-                        
-                except Exception as page_error:
-                    # Log page processing error but continue with other pages
-                    print(f"🐍 ERROR Page {page_number}: {str(page_error)}", file=sys.stderr)
-                    error_text = f'[Page {page_number} processing failed: {str(page_error)}]\n\n'
-                    full_text += error_text
-                    continue
+            # Merge page results in page order
+            for content in page_contents:
+                if metrics:
+                    pages_metrics.append(content['metrics'])
+                pages_processed.append(content['page'])
+                if content.get('stopped'):
+                    stopped_at_page = content['page']
+                full_text += content['text']
+                all_tables.extend(content['tables'])
+                if content['tables_skipped']:
+                    result['tables_skipped_pages'].append(content['page'])
+                if content['words_error'] is not None:
+                    words_failed = True
+                elif content['words'] is not None:
+                    all_pages_words.append(content['words'])
             
             result['text'] = full_text.strip()
             result['tables'] = all_tables
+            if include_words:
+                result['words'] = empty_words_result() if words_failed else build_words_result(all_pages_words, row_tolerance)
             
             # 🐛 DEBUG: Save extracted data for inspection
             # save_debug_text(file_path, result['text'])
@@ -185,19 +729,56 @@ def process_pdf_simple(file_path: str) -> Dict[str, Any]:
         result['error'] = str(e)
         result['text'] = ''
         result['tables'] = []
+        result['tables_skipped_pages'] = []
         result['total_pages'] = 0
         print(f"🐍 ERROR: {str(e)}", file=sys.stderr)
     
+    result.update(selection.summary_fields(pages_processed, stopped_at_page))
+    if metrics:
+        result['metrics'] = build_metrics_block(pages_metrics, time.perf_counter() - start_time)
+    if low_memory:
+        result.update(peak_rss_fields())
+    
     return result
 
 def main():
     """
     Main function: Get file path from command line arguments and process PDF
     """
-    if len(sys.argv) != 2:
+    parser = argparse.ArgumentParser(description='Extract text and tables from a PDF file')
+    parser.add_argument('file_path', nargs='?', help='PDF file path ("-" reads the PDF bytes from stdin)')
+    parser.add_argument('--with-words', action='store_true',
+                        help='Also return per-page word positions from the same pass')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of processes to split the page range across (default: 1)')
+    parser.add_argument('--cache', action='store_true',
+                        help='Use the on-disk extraction cache (keyed by file SHA-256)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Write one NDJSON record per page as it completes, then a summary record')
+    parser.add_argument('--metrics', action='store_true',
+                        help='Add per-page, per-phase timings and object counts as a "metrics" block')
+    parser.add_argument('--profile', metavar='PSTATS_PATH',
+                        help='Dump cProfile stats for the extraction to this file')
+    parser.add_argument('--pages', help='Only extract these pages, e.g. "1-5" or "2,4,10-"')
+    content_group = parser.add_mutually_exclusive_group()
+    content_group.add_argument('--text-only', action='store_true', help='Skip table extraction')
+    content_group.add_argument('--tables-only', action='store_true', help='Skip text extraction')
+    parser.add_argument('--stop-after', metavar='REGEX',
+                        help='Stop after the first page whose text or table cells match REGEX')
+    parser.add_argument('--no-table-prefilter', action='store_true',
+                        help='Run extract_tables() on every page, even pages without ruling lines')
+    parser.add_argument('--words-format', choices=WORD_FORMATS, default='records',
+                        help='Word payload for --with-words: one dict per word (default) or compact columnar arrays')
+    parser.add_argument('--word-rows', type=float, metavar='Y_TOLERANCE',
+                        help='With --with-words, also group each page\'s words into rows with this Y tolerance (pt)')
+    parser.add_argument('--low-memory', action='store_true',
+                        help='Close each page once extracted and report the peak RSS as "peak_rss_mb"')
+    args = parser.parse_args()
+    
+    if not args.file_path:
         error_response = {
             'success': False,
-            'error': 'Usage: python pdf_processor.py <pdf_file_path>',
+            'error': 'Usage: python pdf_processor.py <pdf_file_path> [--with-words] [--workers N] [--cache] [--stream] [--metrics] [--profile PATH] [--pages RANGE] [--text-only|--tables-only] [--stop-after REGEX] [--no-table-prefilter] [--words-format records|columnar] [--word-rows Y_TOLERANCE] [--low-memory]',
             'text': '',
             'tables': [],
             'total_pages': 0
@@ -205,11 +786,33 @@ def main():
         print(json.dumps(error_response, ensure_ascii=False))
         sys.exit(1)
     
-    file_path = sys.argv[1]
-    result = process_pdf_simple(file_path)
+    source = resolve_cli_source(args.file_path)
+    
+    selection_args = {
+        'pages': args.pages,
+        'text': not args.tables_only,
+        'tables': not args.text_only,
+        'stop_after': args.stop_after,
+        'table_prefilter': not args.no_table_prefilter
+    }
+    
+    if args.stream:
+        with profiled(args.profile):
+            records = iter_pdf_records(source, include_words=args.with_words,
+                                       word_format=args.words_format, row_tolerance=args.word_rows,
+                                       workers=args.workers, use_cache=args.cache, metrics=args.metrics,
+                                       low_memory=args.low_memory, **selection_args)
+            for line in iter_ndjson_lines(records):
+                print(line, flush=True)
+        return
+    
+    result = process_pdf_simple(source, include_words=args.with_words, word_format=args.words_format,
+                                row_tolerance=args.word_rows, workers=args.workers, use_cache=args.cache,
+                                metrics=args.metrics, profile_path=args.profile, low_memory=args.low_memory,
+                                **selection_args)
     
-    # Output JSON result
-    print(json.dumps(result, ensure_ascii=False))
+    # Output JSON result (metrics, when requested, include the encode time)
+    print(dumps_with_metrics(result))
 
 if __name__ == "__main__":
     main()
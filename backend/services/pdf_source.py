@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+PDF Source Helper - Open PDFs from a file path or from in-memory bytes
+Purpose: Let the pdfplumber extractors take the uploaded PDF bytes directly
+         (PDF worker payload or stdin) instead of a temp file written by Node
+Author: LLX Solutions
+
+A "source" is either a file path or the PDF bytes themselves. Bytes are wrapped
+in a BytesIO without copying; page-pool workers receive their own copy.
+"""
+
+import os
+import sys
+from io import BytesIO
+from typing import Union
+
+import pdfplumber
+
+PdfSource = Union[str, bytes, bytearray, memoryview]
+
+# Command-line path meaning "read the PDF bytes from stdin"
+STDIN_PATH = '-'
+
+
+def is_pdf_bytes(source: PdfSource) -> bool:
+    """True when the source holds the PDF bytes rather than a path"""
+    return isinstance(source, (bytes, bytearray, memoryview))
+
+
+def check_pdf_source(source: PdfSource):
+    """Raise FileNotFoundError for a missing path (bytes are always accepted)"""
+    if not is_pdf_bytes(source) and not os.path.exists(source):
+        raise FileNotFoundError(f"PDF file not found: {source}")
+
+
+def open_pdf(source: PdfSource):
+    """pdfplumber.open() for a path or for in-memory bytes"""
+    if is_pdf_bytes(source):
+        return pdfplumber.open(BytesIO(source))
+    return pdfplumber.open(source)
+
+
+def describe_pdf_source(source: PdfSource) -> str:
+    """Short label for log messages"""
+    return f"<{len(source)} bytes>" if is_pdf_bytes(source) else str(source)
+
+
+def resolve_cli_source(path: str) -> PdfSource:
+    """Map a command-line PDF argument to a source ('-' reads all of stdin)"""
+    if path == STDIN_PATH:
+        return sys.stdin.buffer.read()
+    return path
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+PDF Worker Daemon - Long-lived Python process serving PDF jobs
+Purpose: Import pdfplumber/pypdf once and serve extraction/annotation requests
+         over a line-delimited JSON-RPC protocol (stdin/stdout or Unix socket)
+Author: LLX Solutions
+
+Protocol (one JSON object per line):
+    request:  {"id": 1, "method": "process_pdf_simple", "params": {"file_path": "..."}}
+    success:  {"id": 1, "result": {...}}
+    failure:  {"id": 1, "error": {"message": "...", "type": "..."}}
+
+    Annotation methods take rects inline (rects_by_page / batches) or from a file
+    via "rects_path" (JSON or the pdf_annotation_rects binary layout, mmap'd).
+
+    With "stream": true in params, the extraction methods first send one
+    {"id": 1, "record": {...}} line per page (annotate_pdf_batches: per batch),
+    and "result" is the summary record.
+
+    process_pdf_simple / extract_words_only accept "metrics": true (adds the
+    pdf_metrics per-page timing block to the result) and "profile_path"
+    (cProfile dump; non-streamed calls only).
+
+    process_pdf_simple also takes a page selection: "pages" ("1-5", "2,4,10-"
+    or a list), "text"/"tables" (false skips that pass) and "stop_after" (regex;
+    stop after the first matching page). "table_prefilter": false runs
+    extract_tables() even on pages without ruling lines.
+
+    Word payloads (extract_words_only, process_pdf_simple with include_words)
+    take "word_format": "columnar" for the compact crf_words_extractor layout,
+    and "row_tolerance" (pt) to also get each page's words grouped into rows.
+    "low_memory": true closes each page once extracted and adds the job's
+    "peak_rss_mb" to the result ("pool_peak_rss_mb" too when the job ran pages
+    in a process pool).
+
+    Extraction methods can take the PDF itself instead of "file_path": a request
+    with "payload_bytes": N in params is followed on the stream by exactly N raw
+    bytes (the PDF), which are opened in memory (no temp file).
+
+Usage:
+    python pdf_worker.py                    # serve on stdin/stdout
+    python pdf_worker.py --socket <path>    # serve on a Unix domain socket
+"""
+
+import sys
+import os
+import json
+import argparse
+import socketserver
+import threading
+import time
+import types
+import traceback
+from typing import Dict, Any, Callable, Optional
+
+SERVICES_DIR = os.path.dirname(os.path.abspath(__file__))
+for _path in (SERVICES_DIR, os.path.join(SERVICES_DIR, 'crf_analysis')):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+from pdf_metrics import dumps_with_metrics
+
+# Method table: name -> callable(params) -> JSON-serializable result
+METHODS: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+# Modules that failed to import (method name -> reason)
+UNAVAILABLE: Dict[str, str] = {}
+
+
+def _register(name: str, import_fn: Callable[[], Callable[[Dict[str, Any]], Any]]):
+    """Import a handler once at startup; remember the failure instead of exiting"""
+    try:
+        METHODS[name] = import_fn()
+    except (ImportError, SystemExit) as e:
+        UNAVAILABLE[name] = f"{type(e).__name__}: {e}"
+        print(f"⚠️ pdf_worker: method '{name}' unavailable ({UNAVAILABLE[name]})", file=sys.stderr)
+
+
+class InvalidParams(ValueError):
+    """Raised when a request is missing a required parameter"""
+
+
+def _require(params: Dict[str, Any], *names: str):
+    """Raise InvalidParams for any missing required parameter"""
+    missing = [name for name in names if params.get(name) in (None, '')]
+    if missing:
+        raise InvalidParams(f"Missing required parameter(s): {', '.join(missing)}")
+
+
+def _pdf_source(params: Dict[str, Any]):
+    """The request's PDF: the raw payload sent after the request line, else params['file_path']"""
+    if params.get('payload') is not None:
+        return params['payload']
+    _require(params, 'file_path')
+    return params['file_path']
+
+
+def _rects_param(params: Dict[str, Any], inline_key: str, batches: bool = False):
+    """Annotation rects from params['rects_path'] (JSON or binary file) or the inline value"""
+    from pdf_annotation_rects import load_rect_batches, load_rects_by_page
+
+    if params.get('rects_path'):
+        rects_format = params.get('rects_format') or 'auto'
+        if batches:
+            return load_rect_batches(params['rects_path'], rects_format)
+        return load_rects_by_page(params['rects_path'], rects_format)
+    return params.get(inline_key) or ([] if batches else {})
+
+
+def _load_process_pdf_simple():
+    from pdf_processor import process_pdf_simple, iter_pdf_records
+
+    def handler(params):
+        source = _pdf_source(params)
+        selection = {
+            'pages': params.get('pages'),
+            'text': params.get('text', True),
+            'tables': params.get('tables', True),
+            'stop_after': params.get('stop_after'),
+            'table_prefilter': params.get('table_prefilter', True)
+        }
+        if params.get('stream'):
+            return iter_pdf_records(
+                source,
+                include_words=bool(params.get('include_words')),
+                word_format=params.get('word_format') or 'records',
+                row_tolerance=params.get('row_tolerance'),
+                low_memory=bool(params.get('low_memory')),
+                workers=int(params.get('workers') or 1),
+                use_cache=bool(params.get('use_cache')),
+                metrics=bool(params.get('metrics')),
+                **selection
+            )
+        return process_pdf_simple(
+            source,
+            include_words=bool(params.get('include_words')),
+            word_format=params.get('word_format') or 'records',
+            row_tolerance=params.get('row_tolerance'),
+            low_memory=bool(params.get('low_memory')),
+            workers=int(params.get('workers') or 1),
+            use_cache=bool(params.get('use_cache')),
+            metrics=bool(params.get('metrics')),
+            profile_path=params.get('profile_path'),
+            **selection
+        )
+    return handler
+
+
+def _load_extract_words_only():
+    from crf_words_extractor import extract_words_only, iter_words_records
+
+    def handler(params):
+        source = _pdf_source(params)
+        if params.get('stream'):
+            return iter_words_records(
+                source,
+                workers=int(params.get('workers') or 1),
+                use_cache=bool(params.get('use_cache')),
+                metrics=bool(params.get('metrics')),
+                word_format=params.get('word_format') or 'records',
+                row_tolerance=params.get('row_tolerance'),
+                low_memory=bool(params.get('low_memory'))
+            )
+        return extract_words_only(
+            source,
+            params.get('study_id'),
+            workers=int(params.get('workers') or 1),
+            use_cache=bool(params.get('use_cache')),
+            metrics=bool(params.get('metrics')),
+            profile_path=params.get('profile_path'),
+            word_format=params.get('word_format') or 'records',
+            row_tolerance=params.get('row_tolerance'),
+            low_memory=bool(params.get('low_memory'))
+        )
+    return handler
+
+
+def _load_extract_pages():
+    from pdf_page_extractor import extract_pages
+
+    def handler(params):
+        _require(params, 'input_pdf_path', 'output_pdf_path')
+        return extract_pages(
+            params['input_pdf_path'],
+            params['output_pdf_path'],
+            params.get('start_page', 1),
+            params.get('end_page', 5)
+        )
+    return handler
+
+
+def _load_annotate_pdf():
+    from pdf_annotate import annotate_pdf
+
+    def handler(params):
+        _require(params, 'source_path', 'output_path')
+        return annotate_pdf(
+            params['source_path'],
+            _rects_param(params, 'rects_by_page'),
+            params['output_path'],
+            shared_resources=params.get('shared_resources', False)
+        )
+    return handler
+
+
+def _load_annotate_pdf_batches():
+    from pdf_annotate import annotate_pdf_batches, iter_annotate_batches
+
+    def handler(params):
+        _require(params, 'source_path', 'output_path')
+        batches = _rects_param(params, 'batches', batches=True)
+        shared_resources = params.get('shared_resources', False)
+        if params.get('stream'):
+            return iter_annotate_batches(params['source_path'], batches, params['output_path'], shared_resources)
+        return annotate_pdf_batches(params['source_path'], batches, params['output_path'], shared_resources)
+    return handler
+
+
+def _load_update_form_annotations():
+    from pdf_annotate import update_form_annotations
+
+    def handler(params):
+        _require(params, 'pdf_path', 'form_keys')
+        return update_form_annotations(
+            params['pdf_path'],
+            _rects_param(params, 'rects_by_page'),
+            params['form_keys'],
+            output_path=params.get('output_path'),
+            page_numbers=params.get('page_numbers'),
+            shared_resources=params.get('shared_resources', False)
+        )
+    return handler
+
+
+def _load_cache_stats():
+    from pdf_extraction_cache import get_extraction_cache
+
+    def handler(params):
+        return get_extraction_cache().stats()
+    return handler
+
+
+def load_methods():
+    """Import every PDF entry point once for the lifetime of the worker"""
+    _register('process_pdf_simple', _load_process_pdf_simple)
+    _register('extract_words_only', _load_extract_words_only)
+    _register('extract_pages', _load_extract_pages)
+    _register('annotate_pdf', _load_annotate_pdf)
+    _register('annotate_pdf_batches', _load_annotate_pdf_batches)
+    _register('update_form_annotations', _load_update_form_annotations)
+    _register('cache_stats', _load_cache_stats)
+    METHODS['ping'] = lambda params: {
+        'pid': os.getpid(),
+        'methods': sorted(m for m in METHODS if m != 'ping'),
+        'unavailable': UNAVAILABLE
+    }
+
+
+def _drain_records(request_id, records, emit: Optional[Callable[[Any], None]]):
+    """Send page records as they are produced; the summary record becomes the result"""
+    summary = None
+    encode_seconds = 0.0
+    for record in records:
+        if record.get('type') == 'summary':
+            summary = record
+        elif emit is not None:
+            start = time.perf_counter()
+            line = encode_message({'id': request_id, 'record': record})
+            encode_seconds += time.perf_counter() - start
+            emit(line)
+    if summary is not None and isinstance(summary.get('metrics'), dict):
+        summary['metrics']['json_encode_ms'] = round(encode_seconds * 1000, 3)
+    return summary
+
+
+def handle_request(request: Dict[str, Any], emit: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Dispatch one JSON-RPC request to its handler
+
+    Args:
+        request: Parsed request object with id, method and params
+        emit: Writes one protocol message (dict or pre-encoded line) immediately
+            (used for streamed records)
+
+    Returns:
+        Response object carrying either result or error
+    """
+    request_id = request.get('id')
+    method = request.get('method')
+    params = request.get('params') or {}
+
+    handler = METHODS.get(method)
+    if handler is None:
+        reason = UNAVAILABLE.get(method, 'unknown method')
+        return {'id': request_id, 'error': {'message': f"Method '{method}' not available: {reason}", 'type': 'MethodNotFound'}}
+
+    try:
+        result = handler(params)
+        if isinstance(result, types.GeneratorType):
+            result = _drain_records(request_id, result, emit)
+        return {'id': request_id, 'result': result}
+    except InvalidParams as e:
+        return {'id': request_id, 'error': {'message': str(e), 'type': 'InvalidParams'}}
+    except Exception as e:
+        print(f"❌ pdf_worker: {method} failed: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        return {'id': request_id, 'error': {'message': str(e), 'type': type(e).__name__}}
+
+
+def read_request(line: str, stream=None) -> Dict[str, Any]:
+    """
+    Parse one protocol line, reading its binary payload (params.payload_bytes)
+    from `stream` into params['payload']
+
+    Returns:
+        The request object, or an error response (carrying 'error') if it is malformed
+    """
+    try:
+        request = json.loads(line)
+    except json.JSONDecodeError as e:
+        return {'id': None, 'error': {'message': f"Invalid JSON request: {e}", 'type': 'ParseError'}}
+    if not isinstance(request, dict):
+        return {'id': None, 'error': {'message': 'Request must be a JSON object', 'type': 'InvalidRequest'}}
+
+    params = request.get('params')
+    size = params.get('payload_bytes') if isinstance(params, dict) else None
+    if size:
+        payload = stream.read(int(size)) if stream is not None else b''
+        if len(payload) != int(size):
+            return {'id': request.get('id'), 'error': {
+                'message': f"Payload truncated: expected {size} bytes, got {len(payload)}", 'type': 'InvalidRequest'}}
+        params['payload'] = payload
+    return request
+
+
+def handle_line(line: str, emit: Optional[Callable[[Dict[str, Any]], None]] = None, stream=None) -> Dict[str, Any]:
+    """Parse one protocol line (plus its payload from `stream`) and dispatch it"""
+    request = read_request(line, stream)
+    if 'error' in request:
+        return request
+    return handle_request(request, emit)
+
+
+def encode_message(message: Dict[str, Any]) -> str:
+    """Serialize one protocol message; a result 'metrics' block gets its JSON encode time filled in"""
+    result = message.get('result')
+    if isinstance(result, dict) and isinstance(result.get('metrics'), dict):
+        return '{"id": ' + json.dumps(message.get('id')) + ', "result": ' + dumps_with_metrics(result) + '}'
+    return json.dumps(message, ensure_ascii=False)
+
+
+def serve_stdio(protocol_out):
+    """Serve requests from stdin, writing one response line per request"""
+    def emit(message):
+        line = message if isinstance(message, str) else encode_message(message)
+        protocol_out.write(line + '\n')
+        protocol_out.flush()
+
+    # Binary stdin: request payloads are raw PDF bytes between the JSON lines
+    stdin = sys.stdin.buffer
+    for raw in stdin:
+        line = raw.decode('utf-8').strip()
+        if not line:
+            continue
+        emit(handle_line(line, emit, stdin))
+
+
+class _WorkerRequestHandler(socketserver.StreamRequestHandler):
+    """One connection; requests on it are answered in order"""
+
+    def emit(self, message):
+        line = message if isinstance(message, str) else encode_message(message)
+        self.wfile.write((line + '\n').encode('utf-8'))
+        self.wfile.flush()
+
+    def handle(self):
+        for raw in self.rfile:
+            line = raw.decode('utf-8').strip()
+            if not line:
+                continue
+            request = read_request(line, self.rfile)
+            if 'error' in request:
+                self.emit(request)
+                continue
+            # PDF libraries are not thread-safe; serialize jobs across connections
+            with self.server.job_lock:
+                response = handle_request(request, self.emit)
+            self.emit(response)
+
+
+class _WorkerSocketServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path):
+        super().__init__(socket_path, _WorkerRequestHandler)
+        self.job_lock = threading.Lock()
+
+
+def serve_socket(socket_path: str):
+    """Serve requests on a Unix domain socket until interrupted"""
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = _WorkerSocketServer(socket_path)
+    print(f"🐍 pdf_worker listening on {socket_path} (pid {os.getpid()})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def main():
+    """Main function: load handlers once, then serve until stdin closes or interrupted"""
+    parser = argparse.ArgumentParser(description='Long-lived PDF worker (line-delimited JSON-RPC)')
+    parser.add_argument('--socket', help='Serve on this Unix domain socket instead of stdin/stdout')
+    args = parser.parse_args()
+
+    # Keep the real stdout for protocol responses; handler prints go to stderr
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+
+    load_methods()
+
+    try:
+        if args.socket:
+            serve_socket(args.socket)
+        else:
+            serve_stdio(protocol_out)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,27 @@ const { execFile } = require('child_process');
 const path = require('path');
 const fs = require('fs');
 const { promisify } = require('util');
+const { pdfWorkerPool, resolvePythonCommand, EXTRACTION_WORKERS, EXTRACTION_CACHE, EXTRACTION_METRICS, EXTRACTION_LOW_MEMORY, EXTRACTION_WORDS_FORMAT } = require('./pdfWorkerPool');
 const { extractStudyNumber: extractStudyNumberWithAI, identifyAssessmentScheduleForPdfTables } = require('./openaiService');
 
 const execFileAsync = promisify(execFile);
 
+/**
+ * Log the phase totals and slowest pages of an extraction 'metrics' block (PDF_EXTRACTION_METRICS=1)
+ * @param {string} label - Extractor name
+ * @param {Object} metrics - Metrics block from the worker summary (ignored when absent)
+ */
+function logExtractionMetrics(label, metrics) {
+  if (!metrics) return;
+  const phases = Object.entries(metrics.phase_totals_ms || {})
+    .map(([name, ms]) => `${name}=${Math.round(ms)}ms`)
+    .join(' ');
+  const slowest = (metrics.slowest_pages || [])
+    .map(page => `p${page.page} ${Math.round(page.total_ms)}ms`)
+    .join(', ');
+  console.log(`⏱️ ${label}: ${metrics.pages_measured} pages in ${Math.round(metrics.wall_ms)}ms (${phases}, json=${metrics.json_encode_ms}ms); slowest: ${slowest}`);
+}
+
 /**
  * PDF processing service using Python pypdf library
  * Simplified version for text extraction only
@@ -41,31 +58,6 @@ class PypdfService {
     }
   }
 
-  /**
-   * Generate temporary file path
-   * @returns {string} Temporary file path
-   */
-  generateTempFilePath() {
-    const timestamp = Date.now();
-    const randomStr = Math.random().toString(36).substring(7);
-    return path.join(this.tempDir, `temp_pdf_${timestamp}_${randomStr}.pdf`);
-  }
-
-  /**
-   * Clean up temporary file
-   * @param {string} filePath - File path to delete
-   */
-  cleanupTempFile(filePath) {
-    try {
-      if (fs.existsSync(filePath)) {
-        fs.unlinkSync(filePath);
-        // // console.log(`🧹 Cleaned up temporary file: ${path.basename(filePath)}`);
-      }
-    } catch (error) {
-      console.warn(`⚠️ Failed to clean up temporary file: ${error.message}`);
-    }
-  }
-
   /**
    * Check Python environment availability
    * @returns {Promise<boolean>} Whether Python is available
@@ -86,41 +78,30 @@ class PypdfService {
 
   /**
    * Get Python command (use absolute path to ensure correct environment)
+   * The lookup is done once per Node process and then reused
    * @returns {Promise<string>} Python command
    */
   async getPythonCommand() {
-    // Use absolute path to Anaconda Python to ensure correct environment
-    const anacondaPython = '/opt/anaconda3/bin/python3';
-    
-    try {
-      await execFileAsync(anacondaPython, ['--version']);
-      // // console.log(`✅ Using Anaconda Python: ${anacondaPython}`);
-      return anacondaPython;
-    } catch (error) {
-      console.warn(`⚠️ Anaconda Python not found, falling back to system Python`);
-      
-      try {
-        await execFileAsync('python3', ['--version']);
-        return 'python3';
-      } catch (error2) {
-        try {
-          await execFileAsync('python', ['--version']);
-          return 'python';
-        } catch (error3) {
-          throw new Error('Python environment not found. Please ensure Python is installed and accessible from command line');
-        }
-      }
-    }
+    return resolvePythonCommand();
   }
 
   /**
    * Process PDF file using simplified pypdf approach
    * @param {Buffer} fileBuffer - PDF file buffer
-   * @returns {Promise<Object>} Processing result
+   * @param {Object} options - {
+   *   includeWords: also return per-page word positions from the same pass
+   *     (in the EXTRACTION_WORDS_FORMAT payload; expand with getPageWords),
+   *   rowTolerance: with includeWords, also group each page's words into rows with this
+   *     Y tolerance (processWordsToRows with the same tolerance reuses them),
+   *   pages: only extract these pages ("1-5", "2,4,10-" or an array of page numbers),
+   *   textOnly / tablesOnly: skip the table / text pass,
+   *   stopAfter: regex source; stop after the first page whose text or table cells match,
+   *   signal: AbortSignal cancelling the worker job (e.g. when the uploading client disconnects)
+   * }
+   * @returns {Promise<Object>} Processing result (plus pages_processed / stopped_at_page for page selections,
+   *   peak_rss_mb in low-memory mode, plus pool_peak_rss_mb when pages ran in a process pool)
    */
-  async processPdfWithPypdf(fileBuffer) {
-    let tempFilePath = null;
-    
+  async processPdfWithPypdf(fileBuffer, options = {}) {
     try {
       // // console.log('🐍 Starting simplified Python pypdf processing...');
       
@@ -128,34 +109,42 @@ class PypdfService {
       const pythonCmd = await this.getPythonCommand();
       // // console.log(`✅ Using Python command: ${pythonCmd}`);
       
-      // Create temporary file
-      tempFilePath = this.generateTempFilePath();
-      fs.writeFileSync(tempFilePath, fileBuffer);
-      // // console.log(`📄 Created temporary PDF file: ${path.basename(tempFilePath)} (${(fileBuffer.length / 1024).toFixed(1)} KB)`);
-      
-      // Call Python script
+      // Call the long-lived Python worker (pdfplumber already imported).
+      // The PDF bytes go to the worker after the request (no temp file), and pages are
+      // streamed one record at a time so no single huge JSON line is built.
       const startTime = Date.now();
-      const { stdout, stderr } = await execFileAsync(pythonCmd, [this.pythonScript, tempFilePath], {
-        maxBuffer: 10 * 1024 * 1024, // 10MB buffer for large files
-        timeout: 300000 // 5 minutes timeout for large files
+      const textParts = [];
+      const tables = [];
+      const wordPages = [];
+      const summary = await pdfWorkerPool.call('process_pdf_simple', {
+        include_words: Boolean(options.includeWords),
+        word_format: EXTRACTION_WORDS_FORMAT,
+        row_tolerance: options.includeWords && options.rowTolerance != null ? options.rowTolerance : null,
+        workers: EXTRACTION_WORKERS,
+        use_cache: EXTRACTION_CACHE,
+        metrics: EXTRACTION_METRICS,
+        low_memory: EXTRACTION_LOW_MEMORY,
+        pages: options.pages || null,
+        text: !options.tablesOnly,
+        tables: !options.textOnly,
+        stop_after: options.stopAfter || null,
+        stream: true
+      }, {
+        timeoutMs: 300000, // 5 minutes timeout for large files
+        payload: fileBuffer,
+        signal: options.signal,
+        onRecord: (record) => {
+          textParts.push(record.text || '');
+          if (Array.isArray(record.tables)) tables.push(...record.tables);
+          if (record.words) wordPages.push(record.words);
+        }
       });
+      const result = this.assemblePdfRecords(summary, textParts, tables, wordPages);
+      logExtractionMetrics('process_pdf_simple', summary && summary.metrics);
       
       const processTime = Date.now() - startTime;
       // // console.log(`⏱️ Python processing time: ${processTime}ms`);
       
-      // Check stderr output
-      if (stderr && stderr.trim()) {
-        console.warn(`⚠️ Python stderr: ${stderr}`);
-      }
-      
-      // Parse Python output
-      let result;
-      try {
-        result = JSON.parse(stdout);
-      } catch (parseError) {
-        throw new Error(`Failed to parse Python output: ${parseError.message}\nPython output: ${stdout.substring(0, 500)}`);
-      }
-      
       // Check processing result
       if (!result.success) {
         throw new Error(`Python processing failed: ${result.error}`);
@@ -166,7 +155,7 @@ class PypdfService {
         processingTime: processTime,
         pythonCommand: pythonCmd,
         tempFileSize: fileBuffer.length,
-        parseMethod: 'pdfplumber-simple'
+        parseMethod: options.includeWords ? 'pdfplumber-simple+words' : 'pdfplumber-simple'
       };
       
       // // console.log(`✅ pdfplumber processing completed: pages=${result.total_pages}, text=${result.text.length}, tables=${result.tables ? result.tables.length : 0}, time=${processTime}ms`);
@@ -190,14 +179,47 @@ class PypdfService {
           parseMethod: 'pdfplumber-failed'
         }
       };
-    } finally {
-      // Clean up temporary file
-      if (tempFilePath) {
-        this.cleanupTempFile(tempFilePath);
-      }
     }
   }
 
+  /**
+   * Rebuild the process_pdf_simple result from streamed page records
+   * @param {Object} summary - Final summary record
+   * @param {Array<string>} textParts - Page text fragments in page order
+   * @param {Array<Object>} tables - Tables in page order
+   * @param {Array<Object>} wordPages - Per-page word payloads (when words were requested)
+   * @returns {Object} Result in the same shape as process_pdf_simple
+   */
+  assemblePdfRecords(summary, textParts, tables, wordPages) {
+    const result = {
+      success: Boolean(summary && summary.success),
+      text: summary && summary.success ? textParts.join('').trim() : '',
+      tables: summary && summary.success ? tables : [],
+      total_pages: summary ? summary.total_pages : 0,
+      tables_skipped_pages: summary && summary.tables_skipped_pages ? summary.tables_skipped_pages : [],
+      error: summary ? summary.error : 'No summary record received from PDF worker'
+    };
+    if (summary && summary.peak_rss_mb != null) {
+      result.peak_rss_mb = summary.peak_rss_mb;
+    }
+    if (summary && summary.pool_peak_rss_mb != null) {
+      result.pool_peak_rss_mb = summary.pool_peak_rss_mb;
+    }
+    if (summary && summary.pages_processed) {
+      result.pages_processed = summary.pages_processed;
+      result.stopped_at_page = summary.stopped_at_page;
+    }
+    if (summary && summary.words) {
+      const { metadata, ...wordsStatus } = summary.words;
+      result.words = {
+        ...wordsStatus,
+        pages: summary.words.success ? wordPages : [],
+        metadata
+      };
+    }
+    return result;
+  }
+
   /**
    * Format simplified pypdf result for database storage
    * @param {Object} pypdfResult - pypdf processing result
@@ -1582,109 +1604,44 @@ async function extractCrfPositions(fileBuffer, studyId = null) {
 }
 
 // 🔥 新增：CRF专用词位置提取函数（简化版）
-async function extractCrfWordsOnly(fileBuffer, studyId = null) {
-  const { spawn } = require('child_process');
-  const fs = require('fs');
-  const path = require('path');
-
-  return new Promise((resolve, reject) => {
-    try {
-      // Create temporary file for PDF
-      const tempDir = path.join(__dirname, '../temp');
-      if (!fs.existsSync(tempDir)) {
-        fs.mkdirSync(tempDir, { recursive: true });
-      }
-
-      const timestamp = Date.now();
-      const randomSuffix = Math.random().toString(36).substring(7);
-      const tempFileName = `temp_crf_words_${timestamp}_${randomSuffix}.pdf`;
-      const tempFilePath = path.join(tempDir, tempFileName);
-
-      // Write buffer to temporary file
-      fs.writeFileSync(tempFilePath, fileBuffer);
-
-      // Prepare arguments for Python script
-      const pythonScript = path.join(__dirname, 'crf_analysis/crf_words_extractor.py');
-      const outputDir = tempDir;
-      const args = [pythonScript, tempFilePath, outputDir];
-      
-      if (studyId) {
-        args.push(studyId);
-      }
-
-      console.log(`🐍 Calling CRF Words Python script: python3 ${args.join(' ')}`);
-
-      // Execute Python script
-      const pythonProcess = spawn('python3', args, {
-        stdio: ['pipe', 'pipe', 'pipe'],
-        env: { ...process.env }
-      });
-
-      let stdout = '';
-      let stderr = '';
-
-      pythonProcess.stdout.on('data', (data) => {
-        stdout += data.toString();
-      });
-
-      pythonProcess.stderr.on('data', (data) => {
-        stderr += data.toString();
-      });
-
-      pythonProcess.on('close', (code) => {
-        // Clean up temporary file
-        try {
-          if (fs.existsSync(tempFilePath)) {
-            fs.unlinkSync(tempFilePath);
-          }
-        } catch (cleanupErr) {
-          console.warn('⚠️ Failed to cleanup temp file:', cleanupErr.message);
-        }
-
-        if (code === 0) {
-          try {
-            // Parse the JSON result from stdout
-            const result = JSON.parse(stdout.trim());
-            console.log(`✅ CRF words extraction completed successfully`);
-            console.log(`📊 Results: ${result.metadata?.total_words || 0} words from ${result.metadata?.total_pages || 0} pages`);
-            resolve(result);
-          } catch (parseErr) {
-            console.error('❌ Failed to parse Python script output:', parseErr.message);
-            console.error('📄 Raw stdout:', stdout);
-            reject(new Error(`Failed to parse extraction results: ${parseErr.message}`));
-          }
-        } else {
-          console.error(`❌ Python script failed with exit code ${code}`);
-          console.error('📄 stderr:', stderr);
-          console.error('📄 stdout:', stdout);
-          reject(new Error(`CRF words extraction failed: ${stderr || 'Unknown error'}`));
-        }
-      });
-
-      pythonProcess.on('error', (err) => {
-        // Clean up temporary file
-        try {
-          if (fs.existsSync(tempFilePath)) {
-            fs.unlinkSync(tempFilePath);
-          }
-        } catch (cleanupErr) {
-          console.warn('⚠️ Failed to cleanup temp file:', cleanupErr.message);
-        }
-        
-        console.error('❌ Failed to spawn Python process:', err.message);
-        reject(new Error(`Failed to start CRF words extraction: ${err.message}`));
-      });
-
-    } catch (error) {
-      console.error('❌ CRF words extraction setup failed:', error.message);
-      reject(error);
-    }
-  });
+// options.rowTolerance: also group each page's words into rows (reused by processWordsToRows)
+// options.signal: AbortSignal cancelling the worker job
+async function extractCrfWordsOnly(fileBuffer, studyId = null, options = {}) {
+  try {
+    console.log(`🐍 Calling CRF words extraction on PDF worker (${(fileBuffer.length / 1024).toFixed(1)} KB)`);
+
+    // The PDF bytes are sent to the worker after the request (no temp file)
+    const pages = [];
+    const summary = await pdfWorkerPool.call('extract_words_only', {
+      study_id: studyId,
+      word_format: EXTRACTION_WORDS_FORMAT,
+      row_tolerance: options.rowTolerance != null ? options.rowTolerance : null,
+      workers: EXTRACTION_WORKERS,
+      use_cache: EXTRACTION_CACHE,
+      metrics: EXTRACTION_METRICS,
+      low_memory: EXTRACTION_LOW_MEMORY,
+      stream: true
+    }, {
+      payload: fileBuffer,
+      signal: options.signal,
+      onRecord: ({ type, ...pageData }) => pages.push(pageData)
+    });
+    const { type, metadata, metrics, ...summaryFields } = summary;
+    logExtractionMetrics('extract_words_only', metrics);
+    const result = { ...summaryFields, pages: summaryFields.success ? pages : [], metadata };
+
+    console.log(`✅ CRF words extraction completed successfully`);
+    console.log(`📊 Results: ${result.metadata?.total_words || 0} words from ${result.metadata?.total_pages || 0} pages`);
+    return result;
+  } catch (error) {
+    console.error('❌ CRF words extraction failed:', error.message);
+    throw new Error(`CRF words extraction failed: ${error.message}`);
+  }
 }
 
 module.exports = {
   pypdfService,
-  processPdfWithPypdf: (fileBuffer) => pypdfService.processPdfWithPypdf(fileBuffer),
+  processPdfWithPypdf: (fileBuffer, options) => pypdfService.processPdfWithPypdf(fileBuffer, options),
   formatResultForDatabase: (pypdfResult) => pypdfService.formatResultForDatabase(pypdfResult),
   // 🔥 新增：CRF/SAP专用格式化函数（跳过Assessment Schedule识别）
   formatResultForCrfSap: (pypdfResult) => pypdfService.formatResultForCrfSap(pypdfResult),